@@ -1,10 +1,11 @@
 import os
 import json
-import requests
-import openai
 import re
 from dotenv import load_dotenv
 
+# requests and openai are imported when a client first needs them, so that
+# importing the advisor does not slow down the game's startup
+
 load_dotenv()
 
 class AIClient:
@@ -53,6 +54,8 @@ class OpenRouterClient(AIClient):
         }
         
         try:
+            import requests
+            
             # Make the request
             response = requests.post(self.api_url, headers=headers, json=data)
             response.raise_for_status()
@@ -202,7 +205,12 @@ class DeepSeekClient(AIClient):
     def __init__(self):
         self.api_key = os.getenv("DEEPSEEK_KEY")
         if self.api_key:
-            self.client = openai.OpenAI(api_key=self.api_key, base_url="https://api.deepseek.com")
+            try:
+                import openai
+                self.client = openai.OpenAI(api_key=self.api_key, base_url="https://api.deepseek.com")
+            except ImportError:
+                self.client = None
+                print("OpenAI package not available. DeepSeek client will use fallback prediction.")
         else:
             self.client = None
             print("DeepSeek API key not found. Client will use fallback prediction.")
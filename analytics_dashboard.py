@@ -1,12 +1,108 @@
-import matplotlib.pyplot as plt
 import numpy as np
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
-from matplotlib.figure import Figure
 import os
 import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
+# Most points drawn for the bankroll line; longer histories keep each bucket's min and max
+MAX_PLOT_POINTS = 2000
+
+
+def _decimate(values, max_points=MAX_PLOT_POINTS):
+    """
+    Shrink a series for plotting without losing its peaks and troughs.
+    
+    Parameters:
+        values (np.ndarray): Series to plot
+        max_points (int): Maximum number of points to return
+        
+    Returns:
+        tuple: (x positions, values)
+    """
+    n = len(values)
+    if n <= max_points:
+        return np.arange(n), values
+    buckets = max_points // 2
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    low = np.minimum.reduceat(values, edges[:-1])
+    high = np.maximum.reduceat(values, edges[:-1])
+    x = np.repeat(edges[:-1], 2)
+    y = np.column_stack((low, high)).ravel()
+    return x, y
+
+
+def render_plots(aggregates, paths):
+    """
+    Draw the three analytics plots from precomputed aggregates.
+    
+    Runs in the rendering worker process, so it only takes picklable data.
+    
+    Parameters:
+        aggregates (dict): Output of AnalyticsDashboard.plot_aggregates
+        paths (list): Output paths for the bankroll, win/loss and trend plots
+        
+    Returns:
+        list: The paths written
+    """
+    # Imported here so the game starts without loading matplotlib; Figure
+    # renders PNGs with the Agg canvas without going through pyplot
+    from matplotlib.figure import Figure
+    
+    bankroll_path, win_loss_path, trend_path = paths
+    
+    # Plot 1: Bankroll over time
+    fig1 = Figure(figsize=(10, 6))
+    ax1 = fig1.add_subplot(111)
+    ax1.plot(aggregates['bankroll_x'], aggregates['bankroll_y'], 'b-')
+    ax1.set_title('Bankroll Over Time')
+    ax1.set_xlabel('Round')
+    ax1.set_ylabel('Bankroll ($)')
+    ax1.grid(True)
+    fig1.savefig(bankroll_path)
+    
+    # Plot 2: Win/Loss Distribution
+    fig2 = Figure(figsize=(10, 6))
+    ax2 = fig2.add_subplot(111)
+    
+    sums = list(range(2, 13))
+    wins = aggregates['wins_by_sum']
+    losses = aggregates['losses_by_sum']
+    
+    width = 0.35
+    ax2.bar(sums, wins, width, label='Wins')
+    ax2.bar(sums, losses, width, bottom=wins, label='Losses')
+    
+    ax2.set_title('Win/Loss Distribution by Sum')
+    ax2.set_xlabel('Sum')
+    ax2.set_ylabel('Count')
+    ax2.set_xticks(sums)
+    ax2.legend()
+    
+    fig2.savefig(win_loss_path)
+    
+    # Plot 3: Market Trend Analysis
+    fig3 = Figure(figsize=(10, 6))
+    ax3 = fig3.add_subplot(111)
+    
+    labels = ['Bull Market', 'Bear Market']
+    returns = [aggregates['bull_return'], aggregates['bear_return']]
+    
+    ax3.bar(labels, returns)
+    ax3.set_title('Average Returns by Market Trend')
+    ax3.set_ylabel('Average Return')
+    
+    fig3.savefig(trend_path)
+    
+    return list(paths)
+
+
+def _report_render_failure(future):
+    """Print why a background render failed, since callers do not wait for it."""
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Could not save analytics plots: {future.exception()}")
+
+
 class AnalyticsDashboard:
     def __init__(self, save_dir=None):
         """Initialize the analytics dashboard."""
@@ -33,6 +129,12 @@ class AnalyticsDashboard:
             
         if not os.path.exists(self.save_dir):
             os.makedirs(self.save_dir)
+        
+        # Bumped on every update, so unchanged data is not rendered twice
+        self.version = 0
+        self._render_executor = None
+        self._rendered_version = None
+        self._rendered_plots = None
     
     def update(self, money, win, bet_amount, bet_sum, dice_result, trend):
         """
@@ -52,6 +154,7 @@ class AnalyticsDashboard:
         self.bet_sums.append(bet_sum)
         self.dice_results.append(dice_result)
         self.trends.append(trend)
+        self.version += 1
         
         # Update performance metrics
         self._calculate_metrics()
@@ -133,79 +236,92 @@ class AnalyticsDashboard:
         
         return report
     
-    def save_plots(self):
-        """Generate and save analytics plots."""
-        # Create timestamp for filenames
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        # Plot 1: Bankroll over time
-        fig1 = Figure(figsize=(10, 6))
-        ax1 = fig1.add_subplot(111)
-        ax1.plot(self.bankroll_history, 'b-')
-        ax1.set_title('Bankroll Over Time')
-        ax1.set_xlabel('Round')
-        ax1.set_ylabel('Bankroll ($)')
-        ax1.grid(True)
-        fig1.savefig(os.path.join(self.save_dir, f'bankroll_{timestamp}.png'))
-        
-        # Plot 2: Win/Loss Distribution
-        fig2 = Figure(figsize=(10, 6))
-        ax2 = fig2.add_subplot(111)
-        
-        # Count occurrences of each sum
-        sum_counts = {}
-        for sum_val in range(2, 13):
-            wins = sum(1 for i, s in enumerate(self.bet_sums) if s == sum_val and self.win_history[i])
-            losses = sum(1 for i, s in enumerate(self.bet_sums) if s == sum_val and not self.win_history[i])
-            sum_counts[sum_val] = (wins, losses)
-        
-        sums = list(sum_counts.keys())
-        wins = [sum_counts[s][0] for s in sums]
-        losses = [sum_counts[s][1] for s in sums]
-        
-        width = 0.35
-        ax2.bar(sums, wins, width, label='Wins')
-        ax2.bar(sums, losses, width, bottom=wins, label='Losses')
-        
-        ax2.set_title('Win/Loss Distribution by Sum')
-        ax2.set_xlabel('Sum')
-        ax2.set_ylabel('Count')
-        ax2.set_xticks(sums)
-        ax2.legend()
-        
-        fig2.savefig(os.path.join(self.save_dir, f'win_loss_{timestamp}.png'))
-        
-        # Plot 3: Market Trend Analysis
-        fig3 = Figure(figsize=(10, 6))
-        ax3 = fig3.add_subplot(111)
-        
-        bull_returns = []
-        bear_returns = []
-        
-        for i in range(1, len(self.bankroll_history)):
-            ret = (self.bankroll_history[i] - self.bankroll_history[i-1]) / self.bankroll_history[i-1]
-            if i-1 < len(self.trends):
-                if self.trends[i-1] == "bull":
-                    bull_returns.append(ret)
-                else:
-                    bear_returns.append(ret)
-        
-        labels = ['Bull Market', 'Bear Market']
-        returns = [np.mean(bull_returns) if bull_returns else 0, 
-                  np.mean(bear_returns) if bear_returns else 0]
-        
-        ax3.bar(labels, returns)
-        ax3.set_title('Average Returns by Market Trend')
-        ax3.set_ylabel('Average Return')
-        
-        fig3.savefig(os.path.join(self.save_dir, f'trend_returns_{timestamp}.png'))
+    def plot_aggregates(self):
+        """
+        Reduce the history to what the plots draw, in a single vectorized pass.
         
+        Returns:
+            dict: Decimated bankroll series, wins and losses per sum (2-12) and
+                the average return in bull and bear rounds
+        """
+        bankroll = np.asarray(self.bankroll_history, dtype=np.float64)
+        bet_sums = np.asarray(self.bet_sums, dtype=np.int64)
+        wins = np.asarray(self.win_history, dtype=bool)
+        
+        wins_by_sum = np.bincount(bet_sums[wins], minlength=13)[2:13]
+        losses_by_sum = np.bincount(bet_sums[~wins], minlength=13)[2:13]
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = np.diff(bankroll) / bankroll[:-1]
+        n = min(len(returns), len(self.trends))
+        bull = np.fromiter(map("bull".__eq__, self.trends[:n]), dtype=bool, count=n)
+        bull_returns = returns[:n][bull]
+        bear_returns = returns[:n][~bull]
+        
+        bankroll_x, bankroll_y = _decimate(bankroll)
+        return {
+            'bankroll_x': bankroll_x,
+            'bankroll_y': bankroll_y,
+            'wins_by_sum': wins_by_sum.tolist(),
+            'losses_by_sum': losses_by_sum.tolist(),
+            'bull_return': float(bull_returns.mean()) if len(bull_returns) else 0,
+            'bear_return': float(bear_returns.mean()) if len(bear_returns) else 0
+        }
+    
+    def _plot_paths(self):
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         return [
             os.path.join(self.save_dir, f'bankroll_{timestamp}.png'),
             os.path.join(self.save_dir, f'win_loss_{timestamp}.png'),
             os.path.join(self.save_dir, f'trend_returns_{timestamp}.png')
         ]
     
+    def save_plots(self):
+        """Generate and save analytics plots."""
+        return render_plots(self.plot_aggregates(), self._plot_paths())
+    
+    def save_plots_async(self):
+        """
+        Render the plots in a background process without waiting for them.
+        
+        Only the aggregates are computed here; drawing and writing the PNGs
+        happen in a worker process. If nothing was recorded since the last
+        call, that render is reused instead of starting a new one.
+        
+        Returns:
+            tuple: (plot paths, concurrent.futures.Future resolving to the paths once written)
+        """
+        if self._rendered_plots is not None:
+            paths, future = self._rendered_plots
+            if future.done() and future.exception() is not None:
+                # Start over with a fresh worker; a crashed one leaves the pool unusable
+                self.close(wait=False)
+            elif self._rendered_version == self.version:
+                return paths, future
+        
+        if self._render_executor is None:
+            # spawn: the worker must not inherit the game's threads
+            self._render_executor = ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        
+        paths = self._plot_paths()
+        future = self._render_executor.submit(render_plots, self.plot_aggregates(), paths)
+        future.add_done_callback(_report_render_failure)
+        self._rendered_version = self.version
+        self._rendered_plots = (paths, future)
+        return paths, future
+    
+    def close(self, wait=True):
+        """
+        Stop the rendering worker.
+        
+        Parameters:
+            wait (bool): Finish pending renders first
+        """
+        if self._render_executor is not None:
+            self._render_executor.shutdown(wait=wait)
+            self._render_executor = None
+    
     def save_data(self):
         """Save analytics data to JSON file."""
         data = {
@@ -0,0 +1,507 @@
+"""
+Benchmarks for the round hot path and the analytics.
+
+Microbenchmarks time the v2 game functions and every betting strategy;
+macrobenchmarks time POST /bet through an in-process ASGI client, the
+AnalyticsDashboard of the CLI game at increasing session lengths and the
+trend forecasters of the CLI MarketSimulator. Every result is a time per
+operation (lower is better) and is written to a JSON baseline that later
+runs can be compared against:
+
+    python benchmarks/run_benchmarks.py --output benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --compare benchmarks/baseline.json
+
+Comparison exits with status 1 if any benchmark got slower by more than
+--threshold (20% by default). The market group also exits with status 1 if
+the online forecaster predicts a different trend direction than ARIMA more
+often than --min-agreement allows, and the startup group if importing
+game.py or the v2 backend exceeds its time budget or loads a dependency that
+should only be imported on first use.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND = os.path.join(ROOT, 'v2', 'backend')
+
+# The v2 backend modules are flat, and its strategies package shadows the CLI one
+sys.path.insert(0, BACKEND)
+sys.path.insert(1, ROOT)
+
+DEFAULT_BET_ROUNDS = [100, 1000, 10000, 100000, 1000000]
+DEFAULT_DASHBOARD_ROUNDS = [100, 1000, 10000, 100000]
+DEFAULT_PLOT_ROUNDS = [100, 1000, 10000]
+
+# Entry points whose cold import is timed: (working directory, module, modules it must not load)
+STARTUP_TARGETS = {
+    "game": (ROOT, "game", ("pandas", "statsmodels", "matplotlib", "openai", "requests")),
+    "backend": (BACKEND, "main", ("pandas", "statsmodels", "matplotlib", "openai", "requests", "httpx",
+                                  "strategies.ai_advisor")),
+}
+
+
+def time_per_call(func, min_time=0.2, repeat=5):
+    """
+    Time a zero-argument callable.
+
+    The call count is grown until one batch takes at least min_time / repeat
+    seconds, then the best of `repeat` batches is reported, which filters out
+    scheduler noise.
+
+    Returns:
+        float: Seconds per call
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / repeat:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_time / repeat / elapsed) + 1))
+
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def latency_stats(samples):
+    """Summarize a list of per-call latencies in seconds."""
+    ordered = sorted(samples)
+    return {
+        "seconds": statistics.median(ordered),
+        "p95_seconds": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+        "mean_seconds": statistics.fmean(ordered),
+        "samples": len(ordered)
+    }
+
+
+def micro_benchmarks(min_time):
+    """Time the game functions and the strategies used on every round."""
+    import game_logic
+    import numpy as np
+    from models import Portfolio, Position, TrendType
+    from kelly_solver import solve_kelly
+    from portfolio_optimizer import PortfolioOptimizer, optimize_portfolios
+    from risk_engine import probability_vector, score_portfolios
+    from strategies.dalembert import dalembert
+    from strategies.fibonacci import fibonacci
+    from strategies.fixed import fixed
+    from strategies.kelly import kelly
+    from strategies.martingale import martingale
+    from strategies.masaniello import masaniello
+    from strategies.percentage import percentage
+
+    probabilities = game_logic.adjust_probabilities(TrendType.BULL, 0.2)
+    single = Portfolio(positions=[Position(bet_sum=7, amount=10)])
+    full = Portfolio(positions=[Position(bet_sum=s, amount=5) for s in (2, 5, 7, 9, 12)])
+
+    # Histories ending in a losing run, which is what the progressive strategies scan
+    rng = random.Random(0)
+    history = ["win" if rng.random() < 0.3 else "loss" for _ in range(1000)] + ["loss"] * 8
+    candidates = np.random.default_rng(0).choice([0, 0, 0, 1, 5], size=(10000, 11)).astype(float)
+    p = probability_vector(probabilities)
+    optimizer = PortfolioOptimizer()
+    bankrolls = np.random.default_rng(1).uniform(10, 1000, 10000)
+    vectors = np.random.default_rng(2).dirichlet(np.ones(11) * 4, 10000)
+
+    cases = {
+        "roll_dice.fair": lambda: game_logic.roll_dice(),
+        "roll_dice.biased": lambda: game_logic.roll_dice(probabilities),
+        "adjust_probabilities": lambda: game_logic.adjust_probabilities(TrendType.BEAR, 0.2),
+        "calculate_portfolio_return.1_position": lambda: game_logic.calculate_portfolio_return(single, 7),
+        "calculate_portfolio_return.5_positions": lambda: game_logic.calculate_portfolio_return(full, 7),
+        "calculate_risk_metrics.1_position": lambda: game_logic.calculate_risk_metrics(single, probabilities),
+        "calculate_risk_metrics.5_positions": lambda: game_logic.calculate_risk_metrics(full, probabilities),
+        "score_portfolios.10000_portfolios": lambda: score_portfolios(candidates, p),
+        "optimize_portfolios.uncached": lambda: optimize_portfolios(p, "log_growth"),
+        "optimize_portfolios.cached": lambda: optimizer.optimize(probabilities, "log_growth"),
+        "solve_kelly.10000_bankrolls": lambda: solve_kelly(bankrolls, p, (2, 5, 7, 9, 12), 0.5, 0.25),
+        "solve_kelly.10000_vectors": lambda: solve_kelly(bankrolls, vectors, (2, 5, 7, 9, 12), 0.5, 0.25),
+        "strategy.masaniello": lambda: masaniello(250.0, history),
+        "strategy.martingale": lambda: martingale(250.0, history),
+        "strategy.fibonacci": lambda: fibonacci(250.0, history),
+        "strategy.dalembert": lambda: dalembert(250.0, history),
+        "strategy.percentage": lambda: percentage(250.0, history),
+        "strategy.kelly": lambda: kelly(250.0, history, probabilities[7], game_logic.PAYOUTS[7]),
+        "strategy.fixed": lambda: fixed(250.0, history),
+    }
+
+    results = {}
+    for name, func in cases.items():
+        seconds = time_per_call(func, min_time=min_time)
+        results[f"micro.{name}"] = {"seconds": seconds, "ops_per_sec": 1 / seconds}
+        print(f"  {name:<45} {seconds * 1e6:>10.2f} us")
+    return results
+
+
+def _prefill_session(session, rounds):
+    """Give a session the history of `rounds` earlier bets without playing them."""
+    from models import BetResult
+
+    rng = random.Random(rounds)
+    game_state = session.game_state
+    for _ in range(rounds):
+        win = rng.random() < 1 / 6
+        game_state.bet_history.append(BetResult.WIN if win else BetResult.LOSS)
+        session.strategies.record(BetResult.WIN if win else BetResult.LOSS)
+        session.history.append(game_state.money, win, 1.0, 7, 7 if win else 6, game_state.trend)
+        session.analytics_tracker.update(game_state.money, win, 1.0)
+    game_state.round_count += rounds
+
+
+def bet_benchmarks(session_lengths, samples):
+    """Latency of POST /bet after a session has already played N rounds."""
+    from fastapi.testclient import TestClient
+    import main
+
+    results = {}
+    with TestClient(main.app) as client:
+        for rounds in session_lengths:
+            response = client.post("/init", json={"initial_bankroll": 1e12, "strategy": "fixed"})
+            response.raise_for_status()
+            session_id = response.headers["X-Session-ID"]
+            headers = {"X-Session-ID": session_id}
+            _prefill_session(main.sessions.get(session_id), rounds)
+
+            gc.collect()
+            latencies = []
+            for _ in range(samples):
+                start = time.perf_counter()
+                response = client.post("/bet", json={"bet_sum": 7, "amount": 1}, headers=headers)
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+            client.delete("/session", headers=headers)
+
+            stats = latency_stats(latencies)
+            stats["rounds_per_sec"] = 1 / stats["seconds"]
+            results[f"macro.place_bet.{rounds}_rounds"] = stats
+            print(f"  place_bet after {rounds:>9,} rounds {stats['seconds'] * 1e3:>9.3f} ms "
+                  f"(p95 {stats['p95_seconds'] * 1e3:.3f} ms)")
+    return results
+
+
+def _prefilled_dashboard(save_dir, rounds):
+    from analytics_dashboard import AnalyticsDashboard
+
+    dashboard = AnalyticsDashboard(save_dir=save_dir)
+    rng = random.Random(rounds)
+    # Large enough that the random walk never reaches zero
+    money = 1e6
+    dashboard.bankroll_history = [money]
+    for _ in range(rounds):
+        win = rng.random() < 1 / 6
+        money += 5 if win else -1
+        dashboard.bankroll_history.append(money)
+        dashboard.win_history.append(1 if win else 0)
+        dashboard.bet_amounts.append(1.0)
+        dashboard.bet_sums.append(7)
+        dashboard.dice_results.append(7 if win else 6)
+        dashboard.trends.append("bull" if rng.random() < 0.5 else "bear")
+    return dashboard
+
+
+def dashboard_benchmarks(update_lengths, plot_lengths, samples):
+    """Cost of AnalyticsDashboard.update, save_plots and save_plots_async as the history grows."""
+    results = {}
+    with tempfile.TemporaryDirectory() as save_dir:
+        for rounds in update_lengths:
+            dashboard = _prefilled_dashboard(save_dir, rounds)
+            latencies = []
+            for i in range(samples):
+                money = dashboard.bankroll_history[-1] + (5 if i % 6 == 0 else -1)
+                start = time.perf_counter()
+                dashboard.update(money, i % 6 == 0, 1.0, 7, 7 if i % 6 == 0 else 6, "bull")
+                latencies.append(time.perf_counter() - start)
+            results[f"macro.dashboard_update.{rounds}_rounds"] = latency_stats(latencies)
+            print(f"  dashboard.update after {rounds:>9,} rounds "
+                  f"{results[f'macro.dashboard_update.{rounds}_rounds']['seconds'] * 1e3:>9.3f} ms")
+
+        for rounds in plot_lengths:
+            dashboard = _prefilled_dashboard(save_dir, rounds)
+            latencies = []
+            for _ in range(max(1, samples // 100)):
+                start = time.perf_counter()
+                dashboard.save_plots()
+                latencies.append(time.perf_counter() - start)
+            results[f"macro.dashboard_save_plots.{rounds}_rounds"] = latency_stats(latencies)
+            print(f"  dashboard.save_plots at {rounds:>9,} rounds "
+                  f"{results[f'macro.dashboard_save_plots.{rounds}_rounds']['seconds'] * 1e3:>9.1f} ms")
+
+            # What the game loop waits for when rendering in the background
+            dashboard.save_plots_async()[1].result()  # Start the worker
+            latencies = []
+            for _ in range(max(1, samples // 100)):
+                dashboard.update(dashboard.bankroll_history[-1] - 1, False, 1.0, 7, 6, "bull")
+                start = time.perf_counter()
+                _, future = dashboard.save_plots_async()
+                latencies.append(time.perf_counter() - start)
+                future.result()
+            dashboard.close()
+            results[f"macro.dashboard_save_plots_async.{rounds}_rounds"] = latency_stats(latencies)
+            print(f"  dashboard.save_plots_async at {rounds:>9,} rounds "
+                  f"{results[f'macro.dashboard_save_plots_async.{rounds}_rounds']['seconds'] * 1e3:>9.1f} ms")
+    return results
+
+
+def _market_series(rounds, seed=0):
+    """Market data as the CLI game produces it: synthetic warm-up, then scaled dice sums."""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    value = 100.0
+    series = []
+    for _ in range(20):
+        value *= 1 + rng.normal(0, 0.2)
+        series.append(value)
+    dice = rng.integers(1, 7, size=(rounds, 2)).sum(axis=1)
+    series.extend((dice / 7 * 100).tolist())
+    return series
+
+
+def market_benchmarks(samples, min_time, checkpoints=200):
+    """
+    Cost of a trend prediction with each MarketSimulator backend, and how often they agree.
+
+    ARIMA is refitted on the last 50 points at every checkpoint, as on a
+    trend change in the game; the RLS forecaster sees every point once.
+
+    Returns:
+        tuple: (results, fraction of checkpoints with the same predicted direction)
+    """
+    import warnings
+
+    import numpy as np
+    from statsmodels.tsa.arima.model import ARIMA
+    from market_simulator import RecursiveARForecaster
+
+    series = _market_series(50 + checkpoints * 5)
+    points = range(50, len(series), 5)
+
+    def arima_forecast(t):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            fit = ARIMA(np.array(series[t - 50:t]), order=(1, 1, 1)).fit()
+        return np.asarray(fit.forecast(steps=1))[0]
+
+    results = {}
+    latencies = []
+    for t in list(points)[:max(5, samples // 20)]:
+        start = time.perf_counter()
+        arima_forecast(t)
+        latencies.append(time.perf_counter() - start)
+    results["macro.market_forecast.arima"] = latency_stats(latencies)
+    print(f"  ARIMA(1,1,1) refit + forecast      {results['macro.market_forecast.arima']['seconds'] * 1e3:>10.2f} ms")
+
+    forecaster = RecursiveARForecaster()
+    values = iter(series * 1000)
+
+    def rls_step():
+        forecaster.update(next(values))
+        forecaster.forecast()
+
+    seconds = time_per_call(rls_step, min_time=min_time)
+    results["micro.market_forecast.rls"] = {"seconds": seconds, "ops_per_sec": 1 / seconds}
+    print(f"  RLS AR update + forecast           {seconds * 1e6:>10.2f} us")
+
+    forecaster = RecursiveARForecaster()
+    agree = 0
+    for t, value in enumerate(series):
+        if t in points:
+            last = series[t - 1]
+            agree += (forecaster.forecast() > last) == (arima_forecast(t) > last)
+        forecaster.update(value)
+    agreement = agree / len(points)
+    print(f"  Direction agreement with ARIMA     {agreement:>10.1%} of {len(points)} forecasts")
+    return results, agreement
+
+
+def measure_import(cwd, module, repeat=3):
+    """
+    Cold import of a module in a fresh interpreter, with python -X importtime.
+
+    Returns:
+        tuple: (best cumulative import time in seconds, set of modules imported)
+    """
+    best = None
+    imported = set()
+    for _ in range(repeat):
+        completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                   cwd=cwd, capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{completed.stderr}")
+        for line in completed.stderr.splitlines():
+            # "import time: self [us] | cumulative | imported package"
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            fields = line[len("import time:"):].split("|")
+            name = fields[2].strip()
+            imported.add(name)
+            if fields[2] == " " + module and fields[1].strip().isdigit():
+                seconds = int(fields[1]) / 1e6
+                best = seconds if best is None else min(best, seconds)
+    return best, imported
+
+
+def startup_benchmarks(budgets):
+    """
+    Cold-start import time of the CLI game and the v2 backend.
+
+    Parameters:
+        budgets (dict): Target name -> maximum import time in seconds
+
+    Returns:
+        tuple: (results, list of budget violations)
+    """
+    results = {}
+    violations = []
+    for name, (cwd, module, deferred) in STARTUP_TARGETS.items():
+        seconds, imported = measure_import(cwd, module)
+        results[f"startup.import_{name}"] = {"seconds": seconds}
+        print(f"  {'import ' + module:<35} {seconds * 1e3:>10.1f} ms   budget {budgets[name] * 1e3:.0f} ms")
+        if seconds > budgets[name]:
+            violations.append(f"import {module} took {seconds * 1e3:.0f} ms")
+        loaded = sorted(m for m in deferred if m in imported)
+        if loaded:
+            violations.append(f"import {module} loaded {', '.join(loaded)}")
+    for violation in violations:
+        print(f"  Over budget: {violation}")
+    return results, violations
+
+
+def environment_info():
+    import numpy as np
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count()
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare results against a baseline.
+
+    Parameters:
+        results (dict): Benchmark name -> result of this run
+        baseline (dict): Benchmark name -> result of the baseline run
+        threshold (float): Allowed relative slowdown, e.g. 0.2 for 20%
+
+    Returns:
+        list: Names of the benchmarks that regressed
+    """
+    regressions = []
+    print(f"\n{'benchmark':<55} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name:<55} {'-':>12} {result['seconds']:>12.3e}      new")
+            continue
+        old = baseline[name]["seconds"]
+        new = result["seconds"]
+        change = new / old - 1 if old > 0 else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"{name:<55} {old:>12.3e} {new:>12.3e} {change:>+8.1%}{flag}")
+    for name in baseline:
+        if name not in results:
+            print(f"{name:<55} {'(not run)':>12}")
+    return regressions
+
+
+def _parse_sizes(value):
+    return [int(float(v)) for v in value.split(",") if v]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DiceTrader hot path and analytics benchmarks")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", metavar="BASELINE", help="Compare against a saved JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Relative slowdown reported as a regression (default 0.2)")
+    parser.add_argument("--only", choices=["micro", "bet", "dashboard", "market", "startup"], action="append",
+                        help="Run only these groups (repeatable)")
+    parser.add_argument("--bet-rounds", type=_parse_sizes, default=DEFAULT_BET_ROUNDS,
+                        help="Comma-separated session lengths for place_bet (default 1e2 to 1e6)")
+    parser.add_argument("--dashboard-rounds", type=_parse_sizes, default=DEFAULT_DASHBOARD_ROUNDS,
+                        help="Comma-separated history lengths for AnalyticsDashboard.update")
+    parser.add_argument("--plot-rounds", type=_parse_sizes, default=DEFAULT_PLOT_ROUNDS,
+                        help="Comma-separated history lengths for AnalyticsDashboard.save_plots")
+    parser.add_argument("--samples", type=int, default=300, help="Timed calls per macrobenchmark")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Seconds spent per microbenchmark")
+    parser.add_argument("--min-agreement", type=float, default=0.75,
+                        help="Lowest acceptable RLS/ARIMA trend direction agreement (default 0.75)")
+    parser.add_argument("--game-import-budget", type=float, default=0.5,
+                        help="Maximum seconds to import game.py (default 0.5)")
+    parser.add_argument("--backend-import-budget", type=float, default=2.0,
+                        help="Maximum seconds to import the v2 backend, i.e. uvicorn main:app startup (default 2.0)")
+    args = parser.parse_args(argv)
+
+    groups = args.only or ["micro", "bet", "dashboard", "market", "startup"]
+    results = {}
+    status = 0
+    if "micro" in groups:
+        print("Microbenchmarks")
+        results.update(micro_benchmarks(args.min_time))
+    if "bet" in groups:
+        print("POST /bet")
+        results.update(bet_benchmarks(args.bet_rounds, args.samples))
+    if "dashboard" in groups:
+        print("AnalyticsDashboard")
+        results.update(dashboard_benchmarks(args.dashboard_rounds, args.plot_rounds, args.samples))
+    if "market" in groups:
+        print("MarketSimulator forecasters")
+        market_results, agreement = market_benchmarks(args.samples, args.min_time)
+        results.update(market_results)
+        if agreement < args.min_agreement:
+            print(f"  Agreement below {args.min_agreement:.0%}")
+            status = 1
+    if "startup" in groups:
+        print("Startup")
+        startup_results, violations = startup_benchmarks({"game": args.game_import_budget,
+                                                          "backend": args.backend_import_budget})
+        results.update(startup_results)
+        if violations:
+            status = 1
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump({"environment": environment_info(), "results": results}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+            return 1
+        print("\nNo regressions")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
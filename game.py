@@ -191,7 +191,7 @@ def main():
     bet_history = []
     
     # Initialize market simulator
-    market_sim = MarketSimulator(volatility=0.2, trend_strength=0.6)
+    market_sim = MarketSimulator(volatility=0.2, trend_strength=0.6, model_backend="rls")
     trend = market_sim.current_trend
     
     # Initialize analytics dashboard
@@ -513,17 +513,24 @@ def main():
             print(f"\nThanks for playing! You leave with ${money}.")
             show_analytics(analytics)
             break
+    
+    # Let plots still being rendered finish before the game exits
+    analytics.close(wait=True)
 
 def show_analytics(analytics):
     """Display analytics report and save plots."""
     print(f"\n{Colors.BOLD}{Colors.CYAN}" + analytics.generate_report() + f"{Colors.RESET}")
     
-    # Save plots and data
-    plot_files = analytics.save_plots()
+    # Save data; plots are rendered by a background process so the game does not wait
+    plot_files, plots_done = analytics.save_plots_async()
     data_file = analytics.save_data()
     
-    print("\nAnalytics data and plots have been saved:")
+    print("\nAnalytics data has been saved:")
     print(f"Data: {data_file}")
+    if plots_done.done() and plots_done.exception() is None:
+        print("Plots have been saved:")
+    else:
+        print("Plots are being rendered in the background to:")
     for plot in plot_files:
         print(f"Plot: {plot}")
     
@@ -1,24 +1,100 @@
 import numpy as np
-import pandas as pd
-from statsmodels.tsa.arima.model import ARIMA
 import random
 
+MODEL_BACKENDS = ("arima", "rls")
+
+
+class RecursiveARForecaster:
+    """
+    Online AR model of the first differences of a series.
+
+    The AR coefficients are fitted by recursive least squares, so every new
+    value costs a fixed amount of work instead of a refit over the whole
+    history. The forgetting factor discounts old points, which plays the role
+    of the 50-point window the ARIMA backend is refitted on.
+    """
+
+    def __init__(self, order=3, forgetting=0.98, delta=100.0):
+        """
+        Parameters:
+            order (int): Number of lagged differences in the model
+            forgetting (float): Weight kept by past points per update (0-1]
+            delta (float): Initial variance of the coefficients
+        """
+        self.order = order
+        self.forgetting = forgetting
+        self.delta = delta
+        self.reset()
+
+    def reset(self):
+        """Forget all data and coefficients."""
+        self.coefficients = np.zeros(self.order)
+        self.covariance = np.eye(self.order) * self.delta
+        self.lags = np.zeros(self.order)  # Most recent difference first
+        self.last_value = None
+        self.n_differences = 0
+
+    def update(self, value):
+        """
+        Add the next value of the series and update the coefficients.
+        
+        Parameters:
+            value (float): Next observation
+        """
+        if self.last_value is not None:
+            difference = value - self.last_value
+            if self.n_differences >= self.order:
+                x = self.lags
+                px = self.covariance @ x
+                gain = px / (self.forgetting + x @ px)
+                self.coefficients += gain * (difference - self.coefficients @ x)
+                self.covariance = (self.covariance - np.outer(gain, px)) / self.forgetting
+            self.lags[1:] = self.lags[:-1]
+            self.lags[0] = difference
+            self.n_differences += 1
+        self.last_value = value
+
+    def forecast(self):
+        """
+        Forecast the next value of the series.
+        
+        Returns:
+            float: Predicted next value (the last value until enough data is seen)
+        """
+        if self.last_value is None:
+            return None
+        if self.n_differences < self.order:
+            return self.last_value
+        return self.last_value + self.coefficients @ self.lags
+
+
 class MarketSimulator:
-    def __init__(self, volatility=0.1, trend_strength=0.5):
+    def __init__(self, volatility=0.1, trend_strength=0.5, model_backend="arima"):
         """
         Initialize the market simulator.
         
         Parameters:
             volatility (float): Base volatility level (0-1)
             trend_strength (float): Strength of trends (0-1)
+            model_backend (str): "arima" refits ARIMA(1,1,1) on every trend change,
+                "rls" updates a RecursiveARForecaster as data arrives
         """
+        if model_backend not in MODEL_BACKENDS:
+            raise ValueError(f"Unknown model backend: {model_backend}")
         self.volatility = volatility
         self.trend_strength = trend_strength
+        self.model_backend = model_backend
         self.market_data = []
         self.current_trend = random.choice(["bull", "bear"])
         self.trend_duration = random.randint(3, 7)  # Random duration between 3-7 rounds
         self.current_round = 0
         self.model = None
+        self.forecaster = RecursiveARForecaster() if model_backend == "rls" else None
+        
+    def _add_data_point(self, value):
+        self.market_data.append(value)
+        if self.forecaster is not None:
+            self.forecaster.update(value)
         
     def generate_market_data(self, rounds=20):
         """
@@ -49,14 +125,25 @@ class MarketSimulator:
                 
             # Apply the change
             value *= (1 + change)
-            self.market_data.append(value)
+            self._add_data_point(value)
             
     def train_model(self):
         """
         Train an ARIMA model on the market data.
+        
+        The rls backend is already up to date, so only the minimum amount of
+        data is ensured.
         """
         if len(self.market_data) < 10:
             self.generate_market_data(20)
+        
+        if self.forecaster is not None:
+            self.model = self.forecaster
+            return
+        
+        # pandas and statsmodels take over a second to import, so only the ARIMA backend loads them
+        import pandas as pd
+        from statsmodels.tsa.arima.model import ARIMA
             
         # Convert to pandas Series
         data = pd.Series(self.market_data)
@@ -80,10 +167,14 @@ class MarketSimulator:
             return random.choice(["bull", "bear"])
             
         # Make a forecast
-        forecast = self.model_fit.forecast(steps=1)
+        if self.forecaster is not None:
+            forecast = self.forecaster.forecast()
+        else:
+            # Positional: the forecast is indexed after the last observation
+            forecast = np.asarray(self.model_fit.forecast(steps=1))[0]
         
         # Determine trend based on forecast
-        if forecast[0] > self.market_data[-1]:
+        if forecast > self.market_data[-1]:
             return "bull"
         else:
             return "bear"
@@ -100,7 +191,7 @@ class MarketSimulator:
         """
         # Add the dice sum to market data (normalized)
         normalized_value = dice_sum / 7 * 100  # Scale to be around 100
-        self.market_data.append(normalized_value)
+        self._add_data_point(normalized_value)
         
         # Limit market data to last 50 points
         if len(self.market_data) > 50:
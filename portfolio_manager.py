@@ -136,22 +136,21 @@ class PortfolioManager:
                 "win_probability": 0
             }
         
-        # Calculate expected return
-        expected_return = 0
-        for bet_sum, amount in self.portfolio.items():
-            # Expected value = probability * payout - (1-probability) * bet
-            expected_return += (probabilities[bet_sum] * amount * payouts[bet_sum]) - ((1 - probabilities[bet_sum]) * amount)
+        # Exactly one sum is rolled: profit/loss of the portfolio for each outcome
+        total = self.get_total_investment()
+        outcomes = sorted(probabilities)
+        pnl = np.array([self.portfolio.get(s, 0) * (payouts[s] + 1) - total for s in outcomes])
+        p = np.array([probabilities[s] for s in outcomes])
         
-        # Calculate maximum possible loss (lose all bets)
-        max_loss = -self.get_total_investment()
+        # Calculate expected return
+        expected_return = float(pnl @ p)
         
-        # Calculate maximum possible gain (win all bets)
-        max_gain = 0
-        for bet_sum, amount in self.portfolio.items():
-            max_gain += amount * payouts[bet_sum] - amount
+        # Calculate maximum possible loss and gain over the outcomes
+        max_loss = float(pnl.min())
+        max_gain = float(pnl.max())
         
-        # Calculate probability of winning at least one bet
-        win_probability = 1 - np.prod([1 - probabilities[bet_sum] for bet_sum in self.portfolio])
+        # Probability that the roll makes the portfolio profitable
+        win_probability = float(p[pnl > 0].sum())
         
         return {
             "expected_return": expected_return,
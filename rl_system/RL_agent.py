@@ -65,6 +65,28 @@ class RLAgent:
             best_actions = [a for a, q in zip(self.actions, Q_vals) if q == max_Q]
             return np.random.choice(best_actions)
 
+    def export_table(self):
+        """
+        Export the Q-table as dense arrays.
+        
+        Returns:
+            tuple: (states, actions, values) where values[i, j] is Q(states[i], actions[j])
+        """
+        states = sorted({state for state, _ in self.Q}, key=str)
+        state_index = {s: i for i, s in enumerate(states)}
+        action_index = {a: j for j, a in enumerate(self.actions)}
+        values = np.zeros((len(states), len(self.actions)))
+        for (state, action), value in self.Q.items():
+            if action in action_index:
+                values[state_index[state], action_index[action]] = value
+        return states, list(self.actions), values
+
+    def load_table(self, states, actions, values):
+        """Replace the Q-table with one exported by export_table."""
+        self.Q = {(state, action): float(values[i, j])
+                  for i, state in enumerate(states)
+                  for j, action in enumerate(actions)}
+
 if __name__ == "__main__":
     # Example usage:
     actions = ['buy', 'sell', 'hold']
@@ -0,0 +1,147 @@
+import numpy as np
+
+
+class DenseRLAgent:
+    """
+    Q-learning agent backed by a dense states x actions NumPy matrix.
+
+    Drop-in replacement for RLAgent: state keys are interned to integer
+    row ids on first use and the matrix grows by doubling, so a Q-value
+    costs 8 bytes instead of a dict entry with a tuple key, and max/argmax
+    over the actions are single array operations.
+    """
+
+    def __init__(self, actions, alpha_rl=0.1, gamma_rl=0.95, delta=1.0, initial_capacity=64):
+        """
+        Initialize the RL agent.
+
+        Parameters:
+            actions (list): List of possible actions.
+            alpha_rl (float): RL learning rate.
+            gamma_rl (float): RL discount factor.
+            delta (float): Scaling factor for incorporating Q(s,a) into the overall strategy.
+            initial_capacity (int): Number of state rows allocated up front.
+        """
+        self.alpha_rl = alpha_rl
+        self.gamma_rl = gamma_rl
+        self.delta = delta
+        self.actions = list(actions)
+        self.action_index = {a: j for j, a in enumerate(self.actions)}
+
+        self.states = []              # Row id -> state
+        self.state_ids = {}           # State -> row id
+        self._values = np.zeros((max(1, initial_capacity), len(self.actions)))
+
+    @property
+    def n_states(self):
+        return len(self.states)
+
+    @property
+    def values(self):
+        """View of the Q matrix restricted to the interned states."""
+        return self._values[:len(self.states)]
+
+    def state_id(self, state, create=True):
+        """
+        Return the row id of a state, interning it if needed.
+
+        Returns:
+            int: Row id, or -1 if the state is unknown and create is False.
+        """
+        sid = self.state_ids.get(state)
+        if sid is None:
+            if not create:
+                return -1
+            sid = len(self.states)
+            if sid == self._values.shape[0]:
+                grown = np.zeros((2 * self._values.shape[0], len(self.actions)))
+                grown[:sid] = self._values
+                self._values = grown
+            self.states.append(state)
+            self.state_ids[state] = sid
+        return sid
+
+    def get_q_value(self, state, action):
+        """Retrieve Q-value for a given state-action pair (defaulting to 0)."""
+        sid = self.state_ids.get(state)
+        if sid is None:
+            return 0.0
+        return float(self._values[sid, self.action_index[action]])
+
+    def max_q_value(self, state):
+        """Maximum Q-value over all actions for a state (0 for unseen states)."""
+        sid = self.state_ids.get(state)
+        if sid is None:
+            return 0.0
+        return float(self._values[sid].max())
+
+    def update(self, state, action, reward, next_state):
+        """
+        Update Q(s,a) using the rule:
+            Q(s,a) = Q(s,a) + alpha_rl * (reward + gamma_rl * max_a' Q(next_state, a') - Q(s,a))
+
+        Returns:
+            new_value (float): The updated Q-value.
+        """
+        sid = self.state_id(state)
+        j = self.action_index[action]
+        max_next_Q = self.max_q_value(next_state)
+        current_value = self._values[sid, j]
+        new_value = current_value + self.alpha_rl * (reward + self.gamma_rl * max_next_Q - current_value)
+        self._values[sid, j] = new_value
+        return float(new_value)
+
+    def choose_action(self, state, epsilon=0.1):
+        """
+        Choose an action using an epsilon-greedy policy.
+
+        Ties between the best actions are broken uniformly at random, as in RLAgent.
+        Draws use randint directly, which consumes the global NumPy random stream
+        exactly like np.random.choice over a list but without its overhead.
+        """
+        if np.random.rand() < epsilon:
+            return self.actions[np.random.randint(len(self.actions))]
+        sid = self.state_ids.get(state)
+        if sid is None:
+            # Every action is tied at 0 for an unseen state
+            return self.actions[np.random.randint(len(self.actions))]
+        row = self._values[sid]
+        best = np.flatnonzero(row == row.max())
+        return self.actions[best[np.random.randint(len(best))]]
+
+    @property
+    def Q(self):
+        """Dictionary view {(state, action): value}, as exposed by RLAgent."""
+        values = self.values
+        return {(state, action): float(values[i, j])
+                for i, state in enumerate(self.states)
+                for j, action in enumerate(self.actions)}
+
+    @Q.setter
+    def Q(self, q_values):
+        self.states = []
+        self.state_ids = {}
+        self._values = np.zeros_like(self._values)
+        for (state, action), value in q_values.items():
+            if action in self.action_index:
+                self._values[self.state_id(state), self.action_index[action]] = value
+
+    def export_table(self):
+        """
+        Export the Q-table as dense arrays.
+
+        Returns:
+            tuple: (states, actions, values) where values[i, j] is Q(states[i], actions[j])
+        """
+        return list(self.states), list(self.actions), self.values.copy()
+
+    def load_table(self, states, actions, values):
+        """Replace the Q-table with one exported by export_table."""
+        self.states = []
+        self.state_ids = {}
+        self._values = np.zeros((max(1, len(states)), len(self.actions)))
+        rows = [self.state_id(state) for state in states]
+        source = [j for j, a in enumerate(actions) if a in self.action_index]
+        target = [self.action_index[actions[j]] for j in source]
+        if rows and source:
+            self._values[np.ix_(rows, target)] = np.asarray(values)[:, source]
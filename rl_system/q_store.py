@@ -0,0 +1,146 @@
+import ast
+import atexit
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+
+def write_table(path, states, actions, values):
+    """
+    Atomically write a Q-table checkpoint.
+
+    Parameters:
+        path (str): Destination .npz file
+        states (list): State keys, one per row of values
+        actions (list): Actions, one per column of values
+        values (array): Dense states x actions matrix of Q-values
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, states=np.asarray(states, dtype=str), actions=np.asarray(actions),
+                     values=np.asarray(values, dtype=np.float64))
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class QTableStore:
+    """
+    Write-behind persistence for an RL agent's Q-table.
+
+    Updates only mark the table dirty; a background thread writes it out
+    once flush_every updates have accumulated or flush_interval seconds
+    have passed, so no disk I/O happens on the per-round path. The table
+    is stored as a NumPy .npz archive (state names, actions and a dense
+    states x actions value matrix) written to a temporary file and moved
+    into place atomically, and it loads without eval.
+    """
+
+    def __init__(self, path, flush_interval=30.0, flush_every=500, legacy_json_path=None):
+        """
+        Parameters:
+            path (str): Location of the .npz checkpoint
+            flush_interval (float): Maximum seconds between flushes while dirty
+            flush_every (int): Number of dirty updates that triggers an early flush
+            legacy_json_path (str): Old q_values.json to migrate from if no checkpoint exists
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_every = flush_every
+        self.legacy_json_path = legacy_json_path
+
+        # Held while the agent is updated and while a snapshot is taken
+        self.lock = threading.Lock()
+
+        self.dirty = 0
+        self.flush_count = 0
+        self.loaded_from = None
+        self._agent = None
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread = None
+        atexit.register(self.close)
+
+    def attach(self, agent):
+        """Set the agent whose table is flushed. It must provide export_table()."""
+        self._agent = agent
+
+    def load(self):
+        """
+        Read the checkpoint, migrating a legacy JSON file if needed.
+
+        Returns:
+            tuple: (states, actions, values) or None if nothing was saved
+        """
+        if os.path.exists(self.path):
+            self.loaded_from = self.path
+            with np.load(self.path, allow_pickle=False) as data:
+                return data["states"].tolist(), data["actions"].tolist(), data["values"]
+
+        if self.legacy_json_path and os.path.exists(self.legacy_json_path):
+            self.loaded_from = self.legacy_json_path
+            with open(self.legacy_json_path, 'r') as f:
+                q_values = json.load(f)
+            # Keys were written with str((state, action)); parse them as literals
+            entries = {ast.literal_eval(k): v for k, v in q_values.items()}
+            states = sorted({state for state, _ in entries})
+            actions = sorted({action for _, action in entries})
+            state_index = {s: i for i, s in enumerate(states)}
+            action_index = {a: j for j, a in enumerate(actions)}
+            values = np.zeros((len(states), len(actions)))
+            for (state, action), value in entries.items():
+                values[state_index[state], action_index[action]] = value
+            return states, actions, values
+
+        return None
+
+    def mark_dirty(self, count=1):
+        """Record that the table changed; the write happens in the background."""
+        self.dirty += count
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="q-table-writer", daemon=True)
+            self._thread.start()
+        if self.dirty >= self.flush_every:
+            self._wakeup.set()
+
+    def flush(self):
+        """Write the table now if it has unsaved changes. Returns True if written."""
+        if self._agent is None or not self.dirty:
+            return False
+
+        with self.lock:
+            states, actions, values = self._agent.export_table()
+            self.dirty = 0
+
+        write_table(self.path, states, actions, values)
+        self.flush_count += 1
+        return True
+
+    def _run(self):
+        """Background loop that flushes on the interval or when woken early."""
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error saving AI model: {e}")
+
+    def close(self):
+        """Stop the background writer and flush any remaining changes."""
+        self._closed = True
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Error saving AI model: {e}")
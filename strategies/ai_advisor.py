@@ -2,12 +2,12 @@ import sys
 import os
 import numpy as np
 import random
-import json
 import re
 
 # Add the parent directory to the path to import modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from rl_system.RL_agent import RLAgent
+from rl_system.dense_agent import DenseRLAgent
+from rl_system.q_store import QTableStore
 
 # Import the AI clients
 from ai_services.openrouter_client import OpenRouterClient, DeepSeekClient
@@ -17,11 +17,17 @@ class AIStrategyAdvisor:
         # Define possible actions (betting on different sums)
         self.actions = list(range(2, 13))  # Sums 2-12
         
-        # Initialize the RL agent for local learning
-        self.agent = RLAgent(self.actions, alpha_rl=0.1, gamma_rl=0.95, delta=1.0)
+        # Initialize the RL agent for local learning (array-backed Q-table)
+        self.agent = DenseRLAgent(self.actions, alpha_rl=0.1, gamma_rl=0.95, delta=1.0)
+        
+        # Q-values are checkpointed in the background instead of after every bet
+        data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+        self.q_store = QTableStore(os.path.join(data_dir, 'q_values.npz'),
+                                   legacy_json_path=os.path.join(data_dir, 'q_values.json'))
         
         # Load saved Q-values if they exist
         self.load_q_values()
+        self.q_store.attach(self.agent)
         
         # Initialize the AI clients with fallback mechanism
         self.openrouter = OpenRouterClient()
@@ -39,42 +45,24 @@ class AIStrategyAdvisor:
         self.predictions = []
         
     def save_q_values(self):
-        """Save the Q-values to a file for persistence between sessions."""
-        save_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
-        save_path = os.path.join(save_dir, 'q_values.json')
-        
-        # Create directory if it doesn't exist
-        os.makedirs(save_dir, exist_ok=True)
-        
-        # Convert tuple keys to strings for JSON serialization
-        # Fix: Use self.agent.Q instead of self.agent.q_values
-        serializable_q_values = {str(k): v for k, v in self.agent.Q.items()}
-        
-        # Save Q-values
+        """Write the Q-values to disk now (normally done in the background by q_store)."""
         try:
-            with open(save_path, 'w') as f:
-                json.dump(serializable_q_values, f)
-            print(f"AI model saved to {save_path}")
+            if self.q_store.flush():
+                print(f"AI model saved to {self.q_store.path}")
         except Exception as e:
             print(f"Error saving AI model: {e}")
     
     def load_q_values(self):
-        """Load Q-values from file if it exists."""
-        load_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
-        load_path = os.path.join(load_dir, 'q_values.json')
-        
-        if os.path.exists(load_path):
-            try:
-                with open(load_path, 'r') as f:
-                    q_values = json.load(f)
-                    # Convert string keys back to tuples
-                    # Fix: Use self.agent.Q instead of self.agent.q_values
-                    self.agent.Q = {eval(k): v for k, v in q_values.items()}
-                print(f"AI model loaded from {load_path}")
-            except (json.JSONDecodeError, SyntaxError, Exception) as e:
-                print(f"Error loading AI model: {e}")
-                # If file is corrupted, start with fresh Q-values
-                pass
+        """Load Q-values from the checkpoint (or a legacy q_values.json) if it exists."""
+        try:
+            table = self.q_store.load()
+            if table is not None:
+                self.agent.load_table(*table)
+                print(f"AI model loaded from {self.q_store.loaded_from}")
+        except Exception as e:
+            print(f"Error loading AI model: {e}")
+            # If file is corrupted, start with fresh Q-values
+            pass
         
     def get_state(self, money, bet_history, trend):
         """
@@ -267,7 +255,8 @@ class AIStrategyAdvisor:
             new_state (str): State after the bet
         """
         # Update local RL agent
-        self.agent.update(old_state, action, reward, new_state)
+        with self.q_store.lock:
+            self.agent.update(old_state, action, reward, new_state)
         
         # Update performance metrics
         if reward > 0:
@@ -284,12 +273,12 @@ class AIStrategyAdvisor:
                 'reward': reward
             }
         
-        # Save Q-values after update
-        self.save_q_values()
+        # Schedule a background checkpoint of the Q-values
+        self.q_store.mark_dirty()
     
     def update_q_values(self, old_state, action, reward, new_state):
         """
-        Update Q-values based on the outcome and save to disk.
+        Update Q-values based on the outcome and schedule a checkpoint.
         
         Parameters:
             old_state (str): State before the bet
@@ -298,10 +287,11 @@ class AIStrategyAdvisor:
             new_state (str): State after the bet
         """
         # Update the agent's Q-values
-        self.agent.update(old_state, action, reward, new_state)
+        with self.q_store.lock:
+            self.agent.update(old_state, action, reward, new_state)
         
-        # Save Q-values to disk
-        self.save_q_values()
+        # Written to disk by the background checkpoint writer
+        self.q_store.mark_dirty()
     
     def get_strategy_advice(self, money, bet_history, trend, probabilities=None):
         """
@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Advice entries kept and how long they stay valid, overridable from the environment
+ADVICE_CACHE_SIZE = int(os.getenv("AI_ADVICE_CACHE_SIZE", "1024"))
+ADVICE_CACHE_TTL = float(os.getenv("AI_ADVICE_CACHE_TTL", "600"))
+
+# Local RL fallbacks expire sooner so the providers are asked again once they recover
+LOCAL_ADVICE_TTL = float(os.getenv("AI_LOCAL_ADVICE_TTL", "30"))
+
+
+def probability_regime(probabilities, digits=4):
+    """
+    Hashable summary of a probability distribution over sums.
+
+    The market only moves between a few trend/volatility settings, each with
+    its own distribution, so rounding identifies the regime while ignoring
+    floating point noise.
+
+    Parameters:
+        probabilities (dict): Probability of each sum, or None
+        digits (int): Decimal places kept
+
+    Returns:
+        tuple: Rounded probabilities in sum order, or None
+    """
+    if not probabilities:
+        return None
+    return tuple(round(probabilities[s], digits) for s in sorted(probabilities, key=int))
+
+
+class AdviceCache:
+    """
+    Size-bounded LRU cache with per-entry expiry for strategy advice.
+
+    Keys are whatever identifies a decision-relevant state (the advisor uses
+    its quantized RL state plus the probability regime). Reads refresh an
+    entry's recency but not its expiry; once max_size entries are held, the
+    least recently used one is evicted. Safe to share between threads.
+    """
+
+    def __init__(self, max_size=ADVICE_CACHE_SIZE, ttl=ADVICE_CACHE_TTL, clock=time.monotonic):
+        """
+        Parameters:
+            max_size (int): Maximum number of entries
+            ttl (float): Default seconds an entry stays valid
+            clock (callable): Time source in seconds, replaceable in tests
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return the cached value for key, or None if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if self.clock() < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return None
+
+    def put(self, key, value, ttl=None):
+        """
+        Store a value, evicting the least recently used entry if the cache is full.
+
+        Parameters:
+            key: Cache key
+            value: Value to store (not None)
+            ttl (float): Seconds the entry stays valid (defaults to the cache's ttl)
+        """
+        with self._lock:
+            self._entries[key] = (self.clock() + (self.ttl if ttl is None else ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry (the counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """
+        Counters and occupancy of the cache.
+
+        Returns:
+            dict: size, max_size, ttl, hits, misses, evictions, expirations and hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
@@ -1,30 +1,172 @@
 import os
 import json
-import requests
+import asyncio
+import importlib.util
 import re
 from dotenv import load_dotenv
 
-# Try to import OpenAI, but don't fail if it's not available
-try:
-    import openai
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
+# requests, openai and httpx are only checked for here and imported when a
+# client first uses them, so importing this module stays cheap
+
+# Check for OpenAI, but don't fail if it's not available
+OPENAI_AVAILABLE = importlib.util.find_spec("openai") is not None
+if not OPENAI_AVAILABLE:
     print("OpenAI package not available. DeepSeek client will be disabled.")
 
+# httpx provides the async connection pool; without it async calls run the sync client in a thread
+HTTPX_AVAILABLE = importlib.util.find_spec("httpx") is not None
+
 load_dotenv()
 
+# Per-call timeout (seconds) and maximum number of concurrent upstream requests
+DEFAULT_TIMEOUT = float(os.getenv("AI_REQUEST_TIMEOUT", "15"))
+MAX_CONCURRENT_REQUESTS = int(os.getenv("AI_MAX_CONCURRENT_REQUESTS", "16"))
+
+# Shared keep-alive connections for all clients
+_http_session = None
+_async_http_client = None
+_async_semaphore = None
+
+
+def get_http_session():
+    """Return the shared requests session, creating it on first use."""
+    global _http_session
+    if _http_session is None:
+        import requests
+        _http_session = requests.Session()
+    return _http_session
+
+
+def get_async_http_client():
+    """Return the shared async HTTP client, creating its connection pool on first use."""
+    global _async_http_client
+    if _async_http_client is None or _async_http_client.is_closed:
+        import httpx
+        _async_http_client = httpx.AsyncClient(
+            timeout=DEFAULT_TIMEOUT,
+            limits=httpx.Limits(max_connections=MAX_CONCURRENT_REQUESTS,
+                                max_keepalive_connections=MAX_CONCURRENT_REQUESTS)
+        )
+    return _async_http_client
+
+
+def _get_async_semaphore():
+    """Semaphore bounding the number of in-flight upstream requests."""
+    global _async_semaphore
+    if _async_semaphore is None:
+        _async_semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    return _async_semaphore
+
+
+async def close_async_http_client():
+    """Close the shared async connection pool (call on application shutdown)."""
+    global _async_http_client
+    if _async_http_client is not None:
+        await _async_http_client.aclose()
+        _async_http_client = None
+
+
 class AIClient:
     """Base class for AI API clients"""
+    name = "ai"
+    model = None
+    
     def get_prediction(self, game_state):
         """Get prediction from AI model - to be implemented by subclasses"""
         raise NotImplementedError("Subclasses must implement get_prediction")
+    
+    def _build_request(self, game_state):
+        """Build the headers and JSON body of a chat completion request."""
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        
+        data = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": "You are an AI strategy advisor for a dice betting game."},
+                {"role": "user", "content": self._format_prompt(game_state)}
+            ],
+            "temperature": 0.7,
+            "max_tokens": 500
+        }
+        return headers, data
+    
+    def request_prediction(self, game_state, timeout=None):
+        """
+        Call the API, raising errors to the caller (unlike get_prediction).
+        
+        Parameters:
+            game_state (dict): Current game state
+            timeout (float): Per-call timeout in seconds (defaults to the client timeout)
+            
+        Returns:
+            dict: Prediction including recommended sum and strategy
+        """
+        headers, data = self._build_request(game_state)
+        response = get_http_session().post(self.api_url, headers=headers, json=data,
+                                           timeout=timeout if timeout is not None else self.timeout)
+        response.raise_for_status()
+        
+        content = response.json()["choices"][0]["message"]["content"]
+        return self._parse_recommendation(content)
+    
+    async def request_prediction_async(self, game_state, timeout=None):
+        """
+        Call the API without blocking the event loop.
+        
+        Unlike get_prediction_async, errors are raised to the caller.
+        
+        Parameters:
+            game_state (dict): Current game state
+            timeout (float): Per-call timeout in seconds (defaults to the client timeout)
+            
+        Returns:
+            dict: Prediction including recommended sum and strategy
+        """
+        if not HTTPX_AVAILABLE:
+            return await asyncio.to_thread(self.request_prediction, game_state, timeout)
+        
+        headers, data = self._build_request(game_state)
+        async with _get_async_semaphore():
+            response = await get_async_http_client().post(
+                self.api_url, headers=headers, json=data,
+                timeout=timeout if timeout is not None else self.timeout)
+        response.raise_for_status()
+        
+        content = response.json()["choices"][0]["message"]["content"]
+        return self._parse_recommendation(content)
+    
+    async def get_prediction_async(self, game_state, timeout=None):
+        """
+        Async counterpart of get_prediction, sharing a keep-alive connection pool.
+        
+        Parameters:
+            game_state (dict): Current game state
+            timeout (float): Per-call timeout in seconds (defaults to the client timeout)
+            
+        Returns:
+            dict: Prediction including recommended sum and strategy
+        """
+        if not self.api_key:
+            return self._fallback_prediction(game_state)
+        
+        try:
+            return await self.request_prediction_async(game_state, timeout)
+        except Exception as e:
+            print(f"Error getting prediction from {self.name}: {e!r}")
+            return self._fallback_prediction(game_state)
 
 class OpenRouterClient(AIClient):
     """Client for OpenRouter API"""
-    def __init__(self):
-        self.api_key = os.getenv("OPENROUTER_API_KEY")
-        self.api_url = "https://openrouter.ai/api/v1/chat/completions"
+    name = "OpenRouter"
+    model = "google/gemini-2.0-flash-lite-preview-02-05:free"
+    
+    def __init__(self, api_key=None, api_url=None, timeout=None):
+        self.api_key = api_key or os.getenv("OPENROUTER_API_KEY")
+        self.api_url = api_url or os.getenv("OPENROUTER_API_URL", "https://openrouter.ai/api/v1/chat/completions")
+        self.timeout = timeout if timeout is not None else DEFAULT_TIMEOUT
         
     def get_prediction(self, game_state):
         """
@@ -40,28 +182,12 @@ class OpenRouterClient(AIClient):
             print("OpenRouter API key not found. Using fallback prediction.")
             return self._fallback_prediction(game_state)
             
-        # Format the prompt
-        prompt = self._format_prompt(game_state)
-        
-        # Prepare the request
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        data = {
-            "model": "google/gemini-2.0-flash-lite-preview-02-05:free",
-            "messages": [
-                {"role": "system", "content": "You are an AI strategy advisor for a dice betting game."},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.7,
-            "max_tokens": 500
-        }
+        # Format the prompt and prepare the request
+        headers, data = self._build_request(game_state)
         
         try:
             # Make the request
-            response = requests.post(self.api_url, headers=headers, json=data)
+            response = get_http_session().post(self.api_url, headers=headers, json=data, timeout=self.timeout)
             response.raise_for_status()
             
             # Parse the response
@@ -206,9 +332,13 @@ class OpenRouterClient(AIClient):
 
 class DeepSeekClient(AIClient):
     """Client for DeepSeek API - using requests instead of OpenAI client"""
-    def __init__(self):
-        self.api_key = os.getenv("DEEPSEEK_KEY")
-        self.api_url = "https://api.deepseek.com/v1/chat/completions"
+    name = "DeepSeek"
+    model = "deepseek-chat"
+    
+    def __init__(self, api_key=None, api_url=None, timeout=None):
+        self.api_key = api_key or os.getenv("DEEPSEEK_KEY")
+        self.api_url = api_url or os.getenv("DEEPSEEK_API_URL", "https://api.deepseek.com/v1/chat/completions")
+        self.timeout = timeout if timeout is not None else DEFAULT_TIMEOUT
         
     def get_prediction(self, game_state):
         """
@@ -224,30 +354,14 @@ class DeepSeekClient(AIClient):
             print("DeepSeek API key not found. Using fallback prediction.")
             return self._fallback_prediction(game_state)
             
-        # Format the prompt
-        prompt = self._format_prompt(game_state)
-        
         try:
             print("Attempting to use DeepSeek API...")
             
-            # Prepare the request
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            data = {
-                "model": "deepseek-chat",
-                "messages": [
-                    {"role": "system", "content": "You are an AI strategy advisor for a dice betting game."},
-                    {"role": "user", "content": prompt}
-                ],
-                "temperature": 0.7,
-                "max_tokens": 500
-            }
+            # Format the prompt and prepare the request
+            headers, data = self._build_request(game_state)
             
             # Make direct HTTP request
-            response = requests.post(self.api_url, headers=headers, json=data)
+            response = get_http_session().post(self.api_url, headers=headers, json=data, timeout=self.timeout)
             response.raise_for_status()
             
             # Parse the response
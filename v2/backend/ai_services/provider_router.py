@@ -0,0 +1,503 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from ai_services.openrouter_client import DEFAULT_TIMEOUT
+
+# Circuit breaker settings, overridable from the environment: the breaker
+# opens when at least BREAKER_MIN_CALLS of the last BREAKER_WINDOW calls
+# were made and the share that failed, or took BREAKER_SLOW_SECONDS or
+# longer, reaches its threshold; it lets a probe call through after
+# BREAKER_OPEN_SECONDS
+BREAKER_WINDOW = int(os.getenv("AI_BREAKER_WINDOW", "20"))
+BREAKER_MIN_CALLS = int(os.getenv("AI_BREAKER_MIN_CALLS", "5"))
+BREAKER_FAILURE_RATE = float(os.getenv("AI_BREAKER_FAILURE_RATE", "0.5"))
+BREAKER_SLOW_SECONDS = float(os.getenv("AI_BREAKER_SLOW_SECONDS", "8"))
+BREAKER_SLOW_RATE = float(os.getenv("AI_BREAKER_SLOW_RATE", "0.5"))
+BREAKER_OPEN_SECONDS = float(os.getenv("AI_BREAKER_OPEN_SECONDS", "30"))
+
+# Hedging: the next provider is asked once the first one has taken its p95
+# latency (HEDGE_DELAY until HEDGE_MIN_SAMPLES latencies are known)
+HEDGE_DELAY = float(os.getenv("AI_HEDGE_DELAY", "2"))
+HEDGE_MIN_DELAY = float(os.getenv("AI_HEDGE_MIN_DELAY", "0.05"))
+HEDGE_MIN_SAMPLES = int(os.getenv("AI_HEDGE_MIN_SAMPLES", "10"))
+LATENCY_SAMPLES = 200
+
+
+class ProvidersUnavailable(Exception):
+    """No provider could answer: every circuit is open or every call failed."""
+
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker with failure-rate and latency thresholds.
+
+    Closed, calls go through and their outcomes fill a rolling window; when
+    too many of them failed or were slow the breaker opens and calls are
+    rejected without being made. After open_seconds it turns half-open and
+    lets a single probe through: a fast success closes it again, anything
+    else reopens it. Successful latencies are also kept to estimate the
+    provider's p95, which sets the hedging delay.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, window=BREAKER_WINDOW, min_calls=BREAKER_MIN_CALLS,
+                 failure_rate=BREAKER_FAILURE_RATE, slow_seconds=BREAKER_SLOW_SECONDS,
+                 slow_rate=BREAKER_SLOW_RATE, open_seconds=BREAKER_OPEN_SECONDS, clock=time.monotonic):
+        """
+        Parameters:
+            window (int): Recent calls the rates are computed over
+            min_calls (int): Calls needed in the window before the breaker can open
+            failure_rate (float): Share of failed calls that opens the breaker
+            slow_seconds (float): Latency from which a call counts as slow
+            slow_rate (float): Share of slow calls that opens the breaker
+            open_seconds (float): Seconds the breaker stays open before a probe
+            clock (callable): Time source in seconds, replaceable in tests
+        """
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_seconds = slow_seconds
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.clock = clock
+        self.state = self.CLOSED
+        self.opened_at = None
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self.opened = 0
+        self._outcomes = deque(maxlen=window)
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Whether a call may be made now. A True from a half-open breaker
+        reserves its single probe, so it must be followed by record() or release().
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                if self.clock() - self.opened_at < self.open_seconds:
+                    self.rejected += 1
+                    return False
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    self.rejected += 1
+                    return False
+                self._probing = True
+            return True
+
+    def record(self, latency, failed, sample=True):
+        """
+        Record the outcome of a call.
+
+        Parameters:
+            latency (float): Seconds the call took
+            failed (bool): Whether it raised or timed out
+            sample (bool): Add a successful call's latency to the p95 estimate
+        """
+        slow = latency >= self.slow_seconds
+        with self._lock:
+            self.calls += 1
+            if failed:
+                self.failures += 1
+            elif sample:
+                self._latencies.append(latency)
+
+            if self.state == self.HALF_OPEN:
+                self._probing = False
+                if failed or slow:
+                    self._trip()
+                else:
+                    self.state = self.CLOSED
+                    self._outcomes.clear()
+            elif self.state == self.CLOSED:
+                self._outcomes.append((failed, slow))
+                if len(self._outcomes) >= self.min_calls:
+                    failure_rate, slow_rate = self._rates()
+                    if failure_rate >= self.failure_rate or slow_rate >= self.slow_rate:
+                        self._trip()
+
+    def release(self):
+        """Give back a half-open probe whose call was abandoned before finishing."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probing = False
+
+    def p95(self):
+        """95th percentile of recent successful latencies, or None with too few samples."""
+        with self._lock:
+            if len(self._latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def _rates(self):
+        count = len(self._outcomes)
+        if not count:
+            return 0.0, 0.0
+        return (sum(failed for failed, _ in self._outcomes) / count,
+                sum(slow for _, slow in self._outcomes) / count)
+
+    def _trip(self):
+        self.state = self.OPEN
+        self.opened_at = self.clock()
+        self.opened += 1
+        self._outcomes.clear()
+
+    def stats(self):
+        """
+        Returns:
+            dict: state, calls, failures, rejected, opened (times tripped),
+                failure_rate and slow_rate over the window, and p95_latency
+        """
+        p95 = self.p95()
+        with self._lock:
+            failure_rate, slow_rate = self._rates()
+            return {
+                "state": self.state,
+                "calls": self.calls,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "opened": self.opened,
+                "failure_rate": failure_rate,
+                "slow_rate": slow_rate,
+                "p95_latency": p95
+            }
+
+
+class ProviderRouter:
+    """
+    Sends prediction requests to a list of providers behind circuit breakers.
+
+    Providers are anything with a name and the request_prediction /
+    request_prediction_async methods of the API clients, which raise on
+    failure, so FakeProvider can stand in for them. Providers are tried in
+    the configured order. Asynchronously, if the first has not answered after
+    its p95 latency the next provider is asked as well (a hedged request)
+    and the first answer wins; a provider that fails hands over to the next
+    at once. Every call is cut off after timeout seconds, and a call that
+    lost a hedge race is left to finish so that a hanging provider still
+    trips its breaker. Providers with an open breaker are skipped without
+    waiting, which is what moves traffic to the next one, and when none is
+    left ProvidersUnavailable is raised right away.
+    """
+
+    def __init__(self, providers, timeout=DEFAULT_TIMEOUT, hedge_delay=HEDGE_DELAY,
+                 min_hedge_delay=HEDGE_MIN_DELAY, breaker_factory=CircuitBreaker, clock=time.monotonic):
+        """
+        Parameters:
+            providers (list): Providers in order of preference
+            timeout (float): Seconds before a call is abandoned and counted as failed
+            hedge_delay (float): Hedging delay until a provider's p95 latency is known
+            min_hedge_delay (float): Shortest hedging delay
+            breaker_factory (callable): Creates the breaker of each provider
+            clock (callable): Time source in seconds for latencies
+        """
+        self.providers = list(providers)
+        self.timeout = timeout
+        self.hedge_delay = hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.clock = clock
+        self.breakers = {provider.name: breaker_factory() for provider in self.providers}
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.unavailable = 0
+
+    def delay_for(self, provider):
+        """Seconds to wait on a provider before hedging: its p95 latency, within bounds."""
+        p95 = self.breakers[provider.name].p95()
+        delay = self.hedge_delay if p95 is None else p95
+        return min(max(delay, self.min_hedge_delay), self.timeout)
+
+    def request(self, game_state):
+        """
+        Ask the providers one after the other until one answers (no hedging).
+
+        Parameters:
+            game_state (dict): Current game state
+
+        Returns:
+            tuple: (provider name, prediction)
+
+        Raises:
+            ProvidersUnavailable: If every circuit is open or every call failed
+        """
+        errors = []
+        for provider in self.providers:
+            breaker = self.breakers[provider.name]
+            if not breaker.allow():
+                continue
+            start = self.clock()
+            try:
+                prediction = provider.request_prediction(game_state, self.timeout)
+            except Exception as e:
+                breaker.record(self.clock() - start, failed=True)
+                errors.append(f"{provider.name}: {e!r}")
+                continue
+            breaker.record(self.clock() - start, failed=False)
+            return provider.name, prediction
+
+        self.unavailable += 1
+        raise ProvidersUnavailable("; ".join(errors) or "All provider circuits are open")
+
+    async def _attempt(self, provider, game_state, answered=None):
+        """
+        One call to a provider with a timeout, recorded in its breaker.
+
+        Parameters:
+            provider: Provider to call
+            game_state (dict): Current game state
+            answered (asyncio.Event): Set once another call of the same request won
+        """
+        breaker = self.breakers[provider.name]
+        start = self.clock()
+        try:
+            prediction = await asyncio.wait_for(
+                provider.request_prediction_async(game_state, self.timeout), self.timeout)
+        except asyncio.CancelledError:
+            # The caller went away; says nothing about the provider
+            breaker.release()
+            raise
+        except Exception:
+            breaker.record(self.clock() - start, failed=True)
+            raise
+        # A call that lost a hedge race is a straggler; sampling it would push the
+        # hedging delay up to the stragglers' latency
+        breaker.record(self.clock() - start, failed=False, sample=answered is None or not answered.is_set())
+        return prediction
+
+    async def request_async(self, game_state):
+        """
+        Ask the providers with hedging and return the first answer.
+
+        Parameters:
+            game_state (dict): Current game state
+
+        Returns:
+            tuple: (provider name, prediction)
+
+        Raises:
+            ProvidersUnavailable: If every circuit is open or every call failed
+        """
+        queue = list(self.providers)
+        names = {}
+        answered = asyncio.Event()
+
+        def launch():
+            # Start the next provider whose breaker lets a call through
+            while queue:
+                provider = queue.pop(0)
+                if self.breakers[provider.name].allow():
+                    task = asyncio.ensure_future(self._attempt(provider, game_state, answered))
+                    names[task] = provider.name
+                    return task
+            return None
+
+        first = launch()
+        if first is None:
+            self.unavailable += 1
+            raise ProvidersUnavailable("All provider circuits are open")
+
+        pending = {first}
+        # Tasks started by the hedge timer, which fires at most once and not after a failover
+        hedged = set()
+        hedging = True
+        hedge_at = self.clock() + self.delay_for(next(p for p in self.providers if p.name == names[first]))
+        errors = []
+        try:
+            while pending:
+                wait = max(0.0, hedge_at - self.clock()) if hedging and queue else None
+                done, pending = await asyncio.wait(pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Slower than its p95: ask the next provider too
+                    hedging = False
+                    task = launch()
+                    if task is not None:
+                        pending.add(task)
+                        hedged.add(task)
+                        self.hedges += 1
+                    continue
+
+                for task in done:
+                    if task.exception() is None:
+                        if task in hedged:
+                            self.hedge_wins += 1
+                        answered.set()
+                        return names[task], task.result()
+                    errors.append(f"{names[task]}: {task.exception()!r}")
+
+                if not pending:
+                    # Everything in flight failed: hand over to the next provider now
+                    hedging = False
+                    task = launch()
+                    if task is not None:
+                        pending.add(task)
+        finally:
+            for task in pending:
+                if answered.is_set():
+                    # Lost the race: let it finish within the timeout so its breaker hears how it went
+                    task.add_done_callback(_retrieve_outcome)
+                else:
+                    task.cancel()
+
+        self.unavailable += 1
+        raise ProvidersUnavailable("; ".join(errors) or "All provider circuits are open")
+
+    def stats(self):
+        """
+        Returns:
+            dict: hedges fired, hedge_wins (hedges that answered first),
+                unavailable (requests no provider answered) and each provider's breaker stats
+        """
+        return {
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "unavailable": self.unavailable,
+            "providers": {name: breaker.stats() for name, breaker in self.breakers.items()}
+        }
+
+
+def _retrieve_outcome(task):
+    """Mark a finished background call's outcome as seen; its breaker already recorded it."""
+    if not task.cancelled():
+        task.exception()
+
+
+class FakeProvider:
+    """
+    Local stand-in for an LLM provider, for tests and offline runs.
+
+    Answers with a fixed prediction after latency (plus up to jitter)
+    seconds, fails with probability failure_rate, or never answers if hang
+    is set, exercising timeouts, breakers and hedging without any network.
+    """
+
+    def __init__(self, name, latency=0.05, jitter=0.0, failure_rate=0.0, hang=False, prediction=None, seed=None):
+        """
+        Parameters:
+            name (str): Provider name
+            latency (float): Base seconds per call
+            jitter (float): Extra seconds, drawn uniformly from [0, jitter]
+            failure_rate (float): Probability that a call raises
+            hang (bool): Never answer
+            prediction (dict): Answer returned on success
+            seed (int): Seed for latency and failures
+        """
+        self.name = name
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.hang = hang
+        self.prediction = prediction or {
+            "recommended_sum": 7,
+            "recommended_strategy": "kelly",
+            "reasoning": f"Fake advice from {name}."
+        }
+        self.calls = 0
+        self._rng = random.Random(seed)
+
+    def _outcome(self):
+        self.calls += 1
+        return self.latency + self._rng.uniform(0, self.jitter), self._rng.random() < self.failure_rate
+
+    def request_prediction(self, game_state, timeout=None):
+        delay, failed = self._outcome()
+        if self.hang:
+            time.sleep(timeout if timeout is not None else DEFAULT_TIMEOUT)
+            raise TimeoutError(f"{self.name} did not answer")
+        time.sleep(delay)
+        if failed:
+            raise RuntimeError(f"{self.name} failed")
+        return dict(self.prediction)
+
+    async def request_prediction_async(self, game_state, timeout=None):
+        delay, failed = self._outcome()
+        if self.hang:
+            await asyncio.Event().wait()
+        await asyncio.sleep(delay)
+        if failed:
+            raise RuntimeError(f"{self.name} failed")
+        return dict(self.prediction)
+
+
+if __name__ == "__main__":
+    async def scenario(title, providers, requests=60, **router_options):
+        router = ProviderRouter(providers, **router_options)
+        start = time.perf_counter()
+        latencies, answers = [], {}
+        for _ in range(requests):
+            t = time.perf_counter()
+            try:
+                name, _ = await router.request_async({})
+            except ProvidersUnavailable:
+                name = "local RL"
+            latencies.append(time.perf_counter() - t)
+            answers[name] = answers.get(name, 0) + 1
+        latencies.sort()
+        stats = router.stats()
+        print(f"{title}: {time.perf_counter() - start:.2f}s, p50 {latencies[len(latencies) // 2] * 1e3:.0f} ms, "
+              f"p95 {latencies[int(0.95 * (len(latencies) - 1))] * 1e3:.0f} ms, answers {answers}, "
+              f"hedges {stats['hedges']} (won {stats['hedge_wins']}), "
+              f"breakers {[(n, s['state']) for n, s in stats['providers'].items()]}")
+        return router, answers
+
+    async def main():
+        # Every tenth primary call straggles: the hedge to the other provider answers instead
+        class Straggler(FakeProvider):
+            def _outcome(self):
+                delay, failed = super()._outcome()
+                return (0.3 if self.calls % 10 == 0 else delay), failed
+        _, answers = await scenario("10% stragglers", [Straggler("OpenRouter", 0.01, seed=3),
+                                                       FakeProvider("DeepSeek", 0.02, seed=4)])
+        # Winning hedges do not make the slower provider the primary
+        assert answers["OpenRouter"] > answers["DeepSeek"]
+
+        # A hanging provider is hedged around, then avoided once its abandoned calls time out
+        router, _ = await scenario("hanging primary", [FakeProvider("OpenRouter", hang=True),
+                                              FakeProvider("DeepSeek", 0.01, seed=5)],
+                                   requests=20, timeout=0.1, hedge_delay=0.05)
+        assert router.breakers["OpenRouter"].state == CircuitBreaker.OPEN
+
+        # With nothing to hedge to, timeouts trip the breaker and later requests fail fast
+        router, _ = await scenario("hanging alone", [FakeProvider("OpenRouter", hang=True)],
+                                   requests=20, timeout=0.05)
+        assert router.breakers["OpenRouter"].state == CircuitBreaker.OPEN
+
+        # A failing primary fails over to the other provider, which is not a hedge
+        router, _ = await scenario("failing primary", [FakeProvider("OpenRouter", 0.01, failure_rate=1),
+                                                       FakeProvider("DeepSeek", 0.01, seed=6)], requests=20)
+        assert router.hedges == 0 and router.hedge_wins == 0
+
+        # Both down: the breakers open and later requests fall back immediately
+        router, _ = await scenario("both failing", [FakeProvider("OpenRouter", 0.01, failure_rate=1),
+                                                    FakeProvider("DeepSeek", 0.01, failure_rate=1)], requests=20)
+        start = time.perf_counter()
+        try:
+            await router.request_async({})
+        except ProvidersUnavailable as e:
+            print(f"  both open: gave up in {(time.perf_counter() - start) * 1e6:.0f} us ({e})")
+
+    asyncio.run(main())
+
+    # Half-open probing with a fake clock
+    now = [0.0]
+    breaker = CircuitBreaker(window=4, min_calls=4, open_seconds=10, clock=lambda: now[0])
+    for _ in range(4):
+        assert breaker.allow()
+        breaker.record(0.1, failed=True)
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+    now[0] = 10
+    assert breaker.allow() and not breaker.allow()
+    breaker.record(0.1, failed=False)
+    assert breaker.state == CircuitBreaker.CLOSED
+    print("Breaker opens, probes and closes as expected")
@@ -0,0 +1,119 @@
+import asyncio
+import threading
+
+
+class _Call:
+    """A call in progress on some thread, and its outcome once it finishes."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one.
+
+    The first caller for a key runs the function; callers arriving with the
+    same key while it is still running wait for it and get the same result
+    (or exception) instead of running it again. Nothing is remembered once
+    the call finishes, so this complements a cache rather than replacing
+    one. do() is for threads and do_async() for coroutines on an event loop;
+    the two keep separate in-flight tables.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._calls = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """
+        Run fn() once for all concurrent callers with this key.
+
+        Parameters:
+            key: Identifies identical requests
+            fn (callable): Zero-argument function doing the actual work
+
+        Returns:
+            The value fn returned, for the caller that ran it and all that waited
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key, coro_fn):
+        """
+        Await coro_fn() once for all concurrent callers with this key.
+
+        The shared call runs as its own task, so a caller that is cancelled
+        (e.g. a client disconnecting) does not cancel it for the others.
+
+        Parameters:
+            key: Identifies identical requests
+            coro_fn (callable): Zero-argument function returning the awaitable doing the work
+
+        Returns:
+            The value the shared call produced
+        """
+        loop = asyncio.get_running_loop()
+        task = self._tasks.get(key)
+        if task is not None and task.get_loop() is loop:
+            self.coalesced += 1
+        else:
+            task = loop.create_task(coro_fn())
+            self._tasks[key] = task
+            self.calls += 1
+            task.add_done_callback(lambda t: self._finished(key, t))
+        return await asyncio.shield(task)
+
+    def _finished(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # Mark the outcome as seen even if every caller was cancelled meanwhile
+        if not task.cancelled():
+            task.exception()
+
+    @property
+    def in_flight(self):
+        return len(self._calls) + len(self._tasks)
+
+    def stats(self):
+        """
+        Counters of the coalescing layer.
+
+        Returns:
+            dict: calls (actually run), coalesced (callers that waited on one),
+                in_flight and coalesced_rate (share of callers that were coalesced)
+        """
+        requests = self.calls + self.coalesced
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": self.in_flight,
+            "coalesced_rate": self.coalesced / requests if requests else 0.0
+        }
@@ -0,0 +1,96 @@
+import math
+
+from models import AnalyticsData
+
+
+class AnalyticsAccumulator:
+    """
+    Streaming performance metrics for a game session.
+
+    Every statistic exposed by AnalyticsData is maintained incrementally,
+    so recording a round costs O(1) regardless of session length:
+    Welford's algorithm for the mean/variance of per-round returns, a
+    running peak for the maximum drawdown and running sums for wins and
+    losses.
+    """
+
+    def __init__(self, initial_bankroll: float = 100.0):
+        """
+        Args:
+            initial_bankroll: Bankroll before the first round
+        """
+        self.rounds = 0
+        self.wins = 0
+        self.win_amount_total = 0.0
+        self.loss_amount_total = 0.0
+
+        # Welford state for per-round returns
+        self.return_count = 0
+        self.return_mean = 0.0
+        self.return_m2 = 0.0
+
+        self.last_bankroll = initial_bankroll
+        self.peak = initial_bankroll
+        self.max_drawdown = 0.0
+
+    def update(self, bankroll: float, win: bool, bet_amount: float) -> None:
+        """
+        Record one settled round.
+
+        Args:
+            bankroll: Bankroll after the round
+            win: Whether the round was a win
+            bet_amount: Amount bet in the round
+        """
+        self.rounds += 1
+        if win:
+            self.wins += 1
+            self.win_amount_total += bet_amount
+        else:
+            self.loss_amount_total += bet_amount
+
+        if self.last_bankroll != 0:
+            ret = (bankroll - self.last_bankroll) / self.last_bankroll
+            self.return_count += 1
+            delta = ret - self.return_mean
+            self.return_mean += delta / self.return_count
+            self.return_m2 += delta * (ret - self.return_mean)
+        self.last_bankroll = bankroll
+
+        if bankroll > self.peak:
+            self.peak = bankroll
+        if self.peak > 0:
+            drawdown = (self.peak - bankroll) / self.peak
+            if drawdown > self.max_drawdown:
+                self.max_drawdown = drawdown
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.rounds if self.rounds else 0
+
+    @property
+    def avg_win(self) -> float:
+        return self.win_amount_total / self.wins if self.wins else 0
+
+    @property
+    def avg_loss(self) -> float:
+        losses = self.rounds - self.wins
+        return self.loss_amount_total / losses if losses else 0
+
+    @property
+    def sharpe_ratio(self) -> float:
+        """Mean over population standard deviation of returns (risk-free rate of 0)."""
+        if not self.return_count:
+            return 0
+        std_return = math.sqrt(self.return_m2 / self.return_count)
+        # Same convention as before: a flat series is divided by 1
+        return self.return_mean / (std_return if std_return > 0 else 1)
+
+    def apply(self, analytics: AnalyticsData) -> None:
+        """Copy the current metrics onto an AnalyticsData instance."""
+        analytics.win_rate = self.win_rate
+        analytics.avg_win = self.avg_win
+        analytics.avg_loss = self.avg_loss
+        if self.return_count:
+            analytics.sharpe_ratio = self.sharpe_ratio
+            analytics.max_drawdown = self.max_drawdown
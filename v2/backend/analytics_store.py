@@ -0,0 +1,313 @@
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from models import AnalyticsBucket, AnalyticsData, AnalyticsDelta, AnalyticsRounds, TrendType
+from analytics_engine import AnalyticsAccumulator
+
+# Retention policy, overridable from the environment
+ANALYTICS_RECENT_ROUNDS = int(os.getenv("ANALYTICS_RECENT_ROUNDS", "10000"))
+ANALYTICS_BUCKET_ROUNDS = int(os.getenv("ANALYTICS_BUCKET_ROUNDS", "100"))
+ANALYTICS_MAX_BUCKETS = int(os.getenv("ANALYTICS_MAX_BUCKETS", "1024"))
+
+# Integer codes stored for trends (same as simulation.TREND_CODES)
+TREND_CODES = {TrendType.BULL: 0, TrendType.BEAR: 1}
+TREND_VALUES = [trend.value for trend in sorted(TREND_CODES, key=TREND_CODES.get)]
+
+ROUND_COLUMNS = {
+    "bankroll": np.float64,
+    "win": np.uint8,
+    "bet_amount": np.float64,
+    "bet_sum": np.uint8,
+    "dice_result": np.uint8,
+    "trend": np.uint8,
+}
+
+BUCKET_COLUMNS = {
+    "start_round": np.int64,
+    "rounds": np.int64,
+    "wins": np.int64,
+    "bet_total": np.float64,
+    "bankroll_close": np.float64,
+    "bankroll_min": np.float64,
+    "bankroll_max": np.float64,
+    "bull_rounds": np.int64,
+}
+
+
+class AnalyticsHistory:
+    """
+    Bounded per-round history of a session in typed columns.
+
+    At least the most recent `recent_rounds` rounds are kept at full
+    resolution in a ring buffer of NumPy columns. Older rounds are evicted
+    `bucket_rounds` at a time and folded into buckets of aggregates (wins,
+    amount bet, closing/min/max bankroll, bull rounds). When `max_buckets`
+    buckets exist, neighbouring buckets are merged pairwise and the bucket
+    size doubles, so the whole session stays covered while memory is bounded
+    by the two capacities no matter how many rounds are played.
+    """
+
+    def __init__(self, initial_bankroll: float = 100.0,
+                 recent_rounds: int = ANALYTICS_RECENT_ROUNDS,
+                 bucket_rounds: int = ANALYTICS_BUCKET_ROUNDS,
+                 max_buckets: int = ANALYTICS_MAX_BUCKETS):
+        """
+        Args:
+            initial_bankroll: Bankroll before the first round
+            recent_rounds: Rounds kept at full resolution
+            bucket_rounds: Rounds per aggregate bucket for older history
+            max_buckets: Aggregate buckets kept before they are merged pairwise
+        """
+        if recent_rounds < 1 or bucket_rounds < 1 or max_buckets < 2:
+            raise ValueError("Retention sizes must be positive (and max_buckets at least 2)")
+
+        self.initial_bankroll = initial_bankroll
+        self.recent_rounds = recent_rounds
+        self.evict_rounds = bucket_rounds
+        self.bucket_rounds = bucket_rounds
+        self.max_buckets = max_buckets
+
+        self.total_rounds = 0
+        # Bankroll before the oldest round still held at full resolution
+        self.window_open_bankroll = initial_bankroll
+
+        # Ring buffer, grown by doubling up to recent_rounds plus one eviction batch
+        self._max_capacity = recent_rounds + bucket_rounds
+        capacity = min(self._max_capacity, 64)
+        self._columns = {name: np.zeros(capacity, dtype=dtype) for name, dtype in ROUND_COLUMNS.items()}
+        self._start = 0
+        self._count = 0
+
+        # Aggregates of evicted rounds, oldest first. Bucket sizes are always a
+        # multiple of the eviction batch, so a batch never straddles two buckets.
+        self._buckets = {name: np.zeros(max_buckets, dtype=dtype) for name, dtype in BUCKET_COLUMNS.items()}
+        self._bucket_count = 0
+        self._open_bucket = False
+
+    @property
+    def first_round(self) -> int:
+        """Index of the oldest round held at full resolution."""
+        return self.total_rounds - self._count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, bankroll: float, win: bool, bet_amount: float, bet_sum: int,
+               dice_result: int, trend: TrendType) -> None:
+        """Record one settled round."""
+        columns = self._columns
+        capacity = len(columns["bankroll"])
+        if self._count == capacity:
+            if capacity < self._max_capacity:
+                self._grow(min(2 * capacity, self._max_capacity))
+                columns = self._columns
+                capacity = len(columns["bankroll"])
+            else:
+                self._evict()
+
+        i = (self._start + self._count) % capacity
+        columns["bankroll"][i] = bankroll
+        columns["win"][i] = win
+        columns["bet_amount"][i] = bet_amount
+        columns["bet_sum"][i] = bet_sum
+        columns["dice_result"][i] = dice_result
+        columns["trend"][i] = TREND_CODES[trend]
+        self._count += 1
+        self.total_rounds += 1
+
+    def _grow(self, capacity: int) -> None:
+        # Only reached before the buffer has wrapped, so the data starts at 0
+        for name, column in self._columns.items():
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self._count] = column[:self._count]
+            self._columns[name] = grown
+
+    def _evict(self) -> None:
+        """Fold the oldest batch of full-resolution rounds into the aggregates."""
+        evicted = self.columns(self.first_round, self.first_round + self.evict_rounds)
+        bankroll = evicted["bankroll"]
+
+        buckets = self._buckets
+        if not self._open_bucket:
+            if self._bucket_count == self.max_buckets:
+                self._merge_buckets()
+            b = self._bucket_count
+            self._bucket_count += 1
+            self._open_bucket = True
+            buckets["start_round"][b] = self.first_round
+            for name in ("rounds", "wins", "bet_total", "bull_rounds"):
+                buckets[name][b] = 0
+            buckets["bankroll_min"][b] = np.inf
+            buckets["bankroll_max"][b] = -np.inf
+
+        b = self._bucket_count - 1
+        buckets["rounds"][b] += len(bankroll)
+        buckets["wins"][b] += int(evicted["win"].sum())
+        buckets["bet_total"][b] += evicted["bet_amount"].sum()
+        buckets["bull_rounds"][b] += int((evicted["trend"] == TREND_CODES[TrendType.BULL]).sum())
+        buckets["bankroll_close"][b] = bankroll[-1]
+        buckets["bankroll_min"][b] = min(buckets["bankroll_min"][b], bankroll.min())
+        buckets["bankroll_max"][b] = max(buckets["bankroll_max"][b], bankroll.max())
+        if buckets["rounds"][b] >= self.bucket_rounds:
+            self._open_bucket = False
+
+        self.window_open_bankroll = float(bankroll[-1])
+        self._start = (self._start + len(bankroll)) % len(self._columns["bankroll"])
+        self._count -= len(bankroll)
+
+    def _merge_buckets(self) -> None:
+        """Halve the number of buckets by merging neighbours, doubling the bucket size."""
+        n = self._bucket_count
+        pairs = n // 2
+        buckets = self._buckets
+        first = slice(0, 2 * pairs, 2)
+        second = slice(1, 2 * pairs, 2)
+
+        merged = {
+            "start_round": buckets["start_round"][first],
+            "rounds": buckets["rounds"][first] + buckets["rounds"][second],
+            "wins": buckets["wins"][first] + buckets["wins"][second],
+            "bet_total": buckets["bet_total"][first] + buckets["bet_total"][second],
+            "bankroll_close": buckets["bankroll_close"][second],
+            "bankroll_min": np.minimum(buckets["bankroll_min"][first], buckets["bankroll_min"][second]),
+            "bankroll_max": np.maximum(buckets["bankroll_max"][first], buckets["bankroll_max"][second]),
+            "bull_rounds": buckets["bull_rounds"][first] + buckets["bull_rounds"][second],
+        }
+        for name, values in merged.items():
+            column = buckets[name]
+            column[:pairs] = values.copy()
+            if n % 2:
+                # An odd bucket out is kept as is after the merged ones
+                column[pairs] = column[n - 1]
+        self._bucket_count = pairs + n % 2
+        self.bucket_rounds *= 2
+
+    def columns(self, start: Optional[int] = None, stop: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        Full-resolution rounds in order, as typed arrays.
+
+        Args:
+            start: First round index (clamped to first_round)
+            stop: Round index to stop before (clamped to total_rounds)
+
+        Returns:
+            Dictionary of column name -> array
+        """
+        start = self.first_round if start is None else min(max(start, self.first_round), self.total_rounds)
+        stop = self.total_rounds if stop is None else min(max(stop, start), self.total_rounds)
+
+        capacity = len(self._columns["bankroll"])
+        offsets = (self._start + np.arange(start - self.first_round, stop - self.first_round)) % capacity
+        return {name: column[offsets] for name, column in self._columns.items()}
+
+    def bankroll_before(self, round_index: int) -> float:
+        """Bankroll just before a full-resolution round (or after the last round)."""
+        if round_index <= self.first_round:
+            return self.window_open_bankroll
+        capacity = len(self._columns["bankroll"])
+        i = (self._start + round_index - 1 - self.first_round) % capacity
+        return float(self._columns["bankroll"][i])
+
+    def buckets(self) -> List[AnalyticsBucket]:
+        """Aggregates of the rounds older than the full-resolution window."""
+        n = self._bucket_count
+        rows = zip(*(self._buckets[name][:n].tolist() for name in BUCKET_COLUMNS))
+        return [AnalyticsBucket.model_construct(**dict(zip(BUCKET_COLUMNS, row))) for row in rows]
+
+    def to_analytics(self, tracker: AnalyticsAccumulator) -> AnalyticsData:
+        """
+        Build the /analytics payload.
+
+        The list fields cover the full-resolution window; bankroll_history
+        starts with the bankroll before its first round, as before.
+        """
+        columns = self.columns()
+        analytics = AnalyticsData.model_construct(
+            bankroll_history=[self.window_open_bankroll] + columns["bankroll"].tolist(),
+            win_history=columns["win"].tolist(),
+            bet_amounts=columns["bet_amount"].tolist(),
+            bet_sums=columns["bet_sum"].tolist(),
+            dice_results=columns["dice_result"].tolist(),
+            trends=[TREND_VALUES[code] for code in columns["trend"].tolist()],
+            first_round=self.first_round,
+            total_rounds=self.total_rounds,
+            downsampled=self.buckets(),
+        )
+        tracker.apply(analytics)
+        return analytics
+
+    def to_rounds(self, start: Optional[int] = None, stop: Optional[int] = None,
+                  limit: Optional[int] = None, model=AnalyticsRounds, **extra) -> AnalyticsRounds:
+        """
+        Build a columnar page of full-resolution rounds.
+
+        Args:
+            start: First round index (clamped to first_round)
+            stop: Round index to stop before (clamped to total_rounds)
+            limit: Maximum number of rounds in the page
+            model: Response model to build (AnalyticsRounds or a subclass)
+            extra: Additional fields for the model
+
+        Returns:
+            The page; next_start is set when limit cut it short
+        """
+        start = self.first_round if start is None else min(max(start, self.first_round), self.total_rounds)
+        stop = self.total_rounds if stop is None else min(max(stop, start), self.total_rounds)
+        next_start = None
+        if limit is not None and stop - start > limit:
+            stop = start + limit
+            next_start = stop
+
+        columns = self.columns(start, stop)
+        return model.model_construct(
+            start_round=start,
+            stop_round=stop,
+            bankroll_before=self.bankroll_before(start),
+            bankroll=columns["bankroll"].tolist(),
+            win=columns["win"].tolist(),
+            bet_amount=columns["bet_amount"].tolist(),
+            bet_sum=columns["bet_sum"].tolist(),
+            dice_result=columns["dice_result"].tolist(),
+            trend=[TREND_VALUES[code] for code in columns["trend"].tolist()],
+            first_round=self.first_round,
+            total_rounds=self.total_rounds,
+            next_start=next_start,
+            **extra
+        )
+
+    def to_delta(self, since: int, tracker: AnalyticsAccumulator) -> AnalyticsDelta:
+        """Rounds appended since a cursor (a previous total_rounds) plus the current metrics."""
+        since = max(since, 0)
+        delta = self.to_rounds(since, model=AnalyticsDelta, cursor=self.total_rounds,
+                               truncated=since < self.first_round)
+        tracker.apply(delta)
+        return delta
+
+    def nbytes(self) -> int:
+        """Memory held by the columns."""
+        return (sum(c.nbytes for c in self._columns.values())
+                + sum(c.nbytes for c in self._buckets.values()))
+
+
+if __name__ == "__main__":
+    import random
+    import time
+
+    history = AnalyticsHistory(100.0, recent_rounds=1000, bucket_rounds=10, max_buckets=16)
+    rounds = [random.random() < 1 / 6 for _ in range(1_000_000)]
+    money = 100.0
+    start = time.perf_counter()
+    for win in rounds:
+        money += 5 if win else -1
+        history.append(money, win, 1.0, 7, 7 if win else 6, TrendType.BULL if win else TrendType.BEAR)
+    elapsed = time.perf_counter() - start
+
+    buckets = history.buckets()
+    assert 1000 <= len(history) <= 1000 + history.evict_rounds
+    assert history.first_round + len(history) == history.total_rounds == 1_000_000
+    assert sum(b.rounds for b in buckets) == history.first_round
+    assert buckets[-1].bankroll_close == history.window_open_bankroll
+    print(f"Appended 1,000,000 rounds in {elapsed:.2f}s; {len(buckets)} buckets of "
+          f"{history.bucket_rounds} rounds, {history.nbytes():,} bytes held")
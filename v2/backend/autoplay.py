@@ -0,0 +1,210 @@
+import os
+import random
+import threading
+import uuid
+from datetime import datetime
+from typing import Optional
+
+import game_logic
+import rounds
+from models import AutoplayRequest, AutoplayState, AutoplayStatus, BetResult, Strategy, SumPolicy
+from sessions import GameSession, SessionStore
+
+# Autoplay jobs allowed to run at once across all sessions, overridable from the environment
+AUTOPLAY_MAX_JOBS = int(os.getenv("AUTOPLAY_MAX_JOBS", "64"))
+
+_running_jobs = 0
+_running_lock = threading.Lock()
+
+
+def choose_sum(policy: SumPolicy, bet_sum: int, probabilities: dict, rng: random.Random) -> int:
+    """
+    Sum to bet on next under a sum selection policy.
+
+    Args:
+        policy: Selection policy
+        bet_sum: Sum used by the fixed policy
+        probabilities: Current market-adjusted probabilities
+        rng: Random source for the random policy
+
+    Returns:
+        Sum between 2 and 12
+    """
+    if policy == SumPolicy.MOST_LIKELY:
+        return max(probabilities, key=probabilities.get)
+    if policy == SumPolicy.BEST_VALUE:
+        # Highest expected return per unit staked: p * payout - (1 - p)
+        return max(probabilities, key=lambda s: probabilities[s] * (game_logic.PAYOUTS[s] + 1))
+    if policy == SumPolicy.RANDOM:
+        return rng.randint(2, 12)
+    return bet_sum
+
+
+def guarded_stake(session: GameSession, strategy: Strategy, bet_sum: int) -> float:
+    """
+    Next stake of a strategy, with the same guards as game.py.
+
+    A stake that is zero or negative becomes 5% of the bankroll (at least 1),
+    and no stake is more than 25% of the bankroll.
+    """
+    game_state = session.game_state
+    kwargs = {}
+    if strategy == Strategy.KELLY:
+        kwargs = {"probability": game_state.probabilities[bet_sum], "payout": game_logic.PAYOUTS[bet_sum]}
+    stake = session.strategies.stake(strategy, game_state.money, **kwargs)
+    if stake <= 0:
+        stake = max(1, game_state.money * 0.05)
+    return min(stake, game_state.money * 0.25)
+
+
+class AutoplayJob:
+    """
+    Strategy-driven play of one session on a background thread.
+
+    Every round picks a sum with the job's policy, sizes the stake with the
+    session's strategy instances and plays it through rounds.play_round, so
+    the market, analytics and event stream behave exactly as if a client had
+    sent the same bets to /bet. The session lock is taken per round, so
+    other requests for the session interleave with the job.
+    """
+
+    def __init__(self, session: GameSession, settings: AutoplayRequest, seed: Optional[int] = None,
+                 store: Optional[SessionStore] = None):
+        """
+        Args:
+            session: Session to play in
+            settings: Strategy, sum policy, stop rules and round rate
+            seed: Seed for the random sum policy
+            store: Store holding the session, kept informed that it is in use
+        """
+        self.session = session
+        self.store = store
+        self.settings = settings.model_copy(
+            update={"strategy": settings.strategy or session.game_state.current_strategy})
+        self.job_id = uuid.uuid4().hex[:12]
+        self.state = AutoplayState.RUNNING
+        self.rounds_played = 0
+        self.wins = 0
+        self.start_bankroll = session.game_state.money
+        self.stop_reason: Optional[str] = None
+        self.started_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+        self._rng = random.Random(seed)
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"autoplay-{self.job_id}", daemon=True)
+
+    @property
+    def running(self) -> bool:
+        return self.state == AutoplayState.RUNNING
+
+    def start(self) -> None:
+        """
+        Start playing.
+
+        Raises:
+            RuntimeError: If AUTOPLAY_MAX_JOBS jobs are already running
+        """
+        global _running_jobs
+        with _running_lock:
+            if _running_jobs >= AUTOPLAY_MAX_JOBS:
+                raise RuntimeError("Too many autoplay jobs running")
+            _running_jobs += 1
+        self._thread.start()
+
+    def cancel(self) -> None:
+        """Ask the job to stop after the current round."""
+        self._cancelled.set()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        self._thread.join(timeout)
+
+    def status(self) -> AutoplayStatus:
+        bankroll = self.session.game_state.money
+        return AutoplayStatus(
+            job_id=self.job_id,
+            state=self.state,
+            settings=self.settings,
+            rounds_played=self.rounds_played,
+            wins=self.wins,
+            start_bankroll=self.start_bankroll,
+            bankroll=bankroll,
+            profit_loss=bankroll - self.start_bankroll,
+            stop_reason=self.stop_reason,
+            started_at=self.started_at,
+            finished_at=self.finished_at
+        )
+
+    def _stop_rule(self) -> Optional[str]:
+        """Reason to stop before the next round, if any."""
+        settings = self.settings
+        money = self.session.game_state.money
+        if self.rounds_played >= settings.max_rounds:
+            return "Reached max_rounds"
+        if settings.stop_loss is not None and money <= self.start_bankroll - settings.stop_loss:
+            return "Reached stop_loss"
+        if settings.take_profit is not None and money >= self.start_bankroll + settings.take_profit:
+            return "Reached take_profit"
+        if money < 1:
+            # Below the strategies' minimum bet the 25% cap would only shrink stakes forever
+            return "Bankroll exhausted"
+        return None
+
+    def _play_one(self) -> Optional[str]:
+        """Play one round; returns a stop reason instead if the job must end."""
+        settings = self.settings
+        session = self.session
+        with session.lock:
+            reason = self._stop_rule()
+            if reason:
+                return reason
+
+            game_state = session.game_state
+            bet_sum = choose_sum(settings.sum_policy, settings.bet_sum, game_state.probabilities, self._rng)
+            stake = guarded_stake(session, settings.strategy, bet_sum)
+            try:
+                rounds.validate_bet(session, bet_sum, stake)
+            except ValueError as e:
+                return str(e)
+
+            outcome = rounds.play_round(session, bet_sum, stake)
+            self.rounds_played += 1
+            if outcome.result == BetResult.WIN:
+                self.wins += 1
+        # Keep the session from expiring or being evicted while it plays unattended
+        if self.store is not None:
+            self.store.touch(session.session_id)
+        else:
+            session.touch()
+        return None
+
+    def _run(self) -> None:
+        global _running_jobs
+        interval = 1 / self.settings.rounds_per_second if self.settings.rounds_per_second else 0
+        state = AutoplayState.STOPPED
+        try:
+            while True:
+                if self._cancelled.is_set():
+                    state, self.stop_reason = AutoplayState.CANCELLED, "Cancelled"
+                    break
+                reason = self._play_one()
+                if reason:
+                    self.stop_reason = reason
+                    state = AutoplayState.COMPLETED if reason == "Reached max_rounds" else AutoplayState.STOPPED
+                    break
+                if interval and self._cancelled.wait(interval):
+                    continue
+        except Exception as e:
+            state, self.stop_reason = AutoplayState.FAILED, f"Autoplay failed: {str(e)}"
+        finally:
+            self.finished_at = datetime.now()
+            self.state = state
+            with _running_lock:
+                _running_jobs -= 1
+
+        self.session.events.publish("autoplay", {
+            "job_id": self.job_id,
+            "state": self.state.value,
+            "rounds": self.rounds_played,
+            "bankroll": self.session.game_state.money,
+            "reason": self.stop_reason
+        })
@@ -0,0 +1,180 @@
+import random
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+from models import DiceRoll, TrendType
+
+SUMS = tuple(range(2, 13))
+
+# For a given sum, dice1 ranges over [low, low + count) and dice2 is the remainder
+_PAIR_LOW = np.array([max(1, s - 6) for s in SUMS], dtype=np.uint8)
+_PAIR_COUNT = np.array([6 - abs(s - 7) for s in SUMS], dtype=np.uint8)
+
+
+class AliasTable:
+    """Walker alias table over the eleven dice sums."""
+
+    def __init__(self, probabilities: Dict[int, float]):
+        """
+        Build the table with Vose's method.
+
+        Args:
+            probabilities: Probability of each sum (2-12); normalized here
+        """
+        weights = np.array([probabilities.get(s, 0.0) for s in SUMS], dtype=np.float64)
+        total = weights.sum()
+        if total <= 0 or np.any(weights < 0):
+            raise ValueError("Probabilities must be non-negative and not all zero")
+
+        n = len(SUMS)
+        scaled = weights * n / total
+        prob = np.ones(n)
+        alias = np.arange(n)
+
+        small = [i for i in range(n) if scaled[i] < 1.0]
+        large = [i for i in range(n) if scaled[i] >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            prob[s] = scaled[s]
+            alias[s] = l
+            scaled[l] = scaled[l] + scaled[s] - 1.0
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+        # Anything left over is 1 up to rounding error
+
+        self.probabilities = weights / total
+        self.prob = prob
+        self.alias = alias
+
+        # Plain lists make single draws cheaper than NumPy scalar indexing
+        self._prob_list = prob.tolist()
+        self._alias_list = [SUMS[i] for i in alias.tolist()]
+
+    def draw(self) -> int:
+        """Draw a single dice sum in O(1)."""
+        i = int(random.random() * 11)
+        return SUMS[i] if random.random() < self._prob_list[i] else self._alias_list[i]
+
+    def draw_many(self, size: Union[int, Tuple[int, ...]], rng: np.random.Generator) -> np.ndarray:
+        """Draw an array of dice sums in O(1) per element."""
+        idx = rng.integers(0, 11, size=size)
+        keep = rng.random(size) < self.prob[idx]
+        return (np.where(keep, idx, self.alias[idx]) + 2).astype(np.uint8)
+
+
+def pair_for_sum(dice_sum: int) -> Tuple[int, int]:
+    """Pick one of the ordered dice pairs that add up to dice_sum, uniformly."""
+    i = dice_sum - 2
+    dice1 = int(_PAIR_LOW[i]) + int(random.random() * int(_PAIR_COUNT[i]))
+    return dice1, dice_sum - dice1
+
+
+def pairs_for_sums(dice_sums: np.ndarray, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorized pair_for_sum: returns (dice1, dice2) arrays for the given sums."""
+    i = dice_sums.astype(np.intp) - 2
+    offset = (rng.random(dice_sums.shape) * _PAIR_COUNT[i]).astype(np.uint8)
+    dice1 = _PAIR_LOW[i] + offset
+    return dice1, (dice_sums - dice1).astype(np.uint8)
+
+
+class DiceSampler:
+    """
+    Biased dice roller backed by cached alias tables.
+
+    Tables are cached per (trend, volatility) regime and per explicit
+    probability vector, so after the first roll of a regime every draw
+    is O(1). Safe to share between threads.
+    """
+
+    def __init__(self, max_tables: int = 256):
+        """
+        Args:
+            max_tables: Maximum number of cached probability vectors
+        """
+        self.max_tables = max_tables
+        self._tables: "OrderedDict[tuple, AliasTable]" = OrderedDict()
+        self._regimes: Dict[Tuple[str, float], AliasTable] = {}
+        self._lock = threading.Lock()
+
+    def table_for(self, probabilities: Dict[int, float]) -> AliasTable:
+        """Return the (cached) alias table for a probability dictionary."""
+        key = tuple(probabilities.get(s, 0.0) for s in SUMS)
+        with self._lock:
+            table = self._tables.get(key)
+            if table is not None:
+                self._tables.move_to_end(key)
+                return table
+
+        # Built outside the lock; a concurrent miss just builds it twice
+        table = AliasTable(probabilities)
+        with self._lock:
+            self._tables[key] = table
+            if len(self._tables) > self.max_tables:
+                self._tables.popitem(last=False)
+        return table
+
+    def table_for_regime(self, trend: Union[TrendType, str], volatility: float) -> AliasTable:
+        """Return the (cached) alias table for a trend and volatility."""
+        trend = TrendType(trend)
+        key = (trend.value, float(volatility))
+        table = self._regimes.get(key)
+        if table is None:
+            # Imported here because game_logic rolls dice through this module
+            from game_logic import adjust_probabilities
+            table = AliasTable(adjust_probabilities(trend, volatility))
+            self._regimes[key] = table
+        return table
+
+    def roll(self, probabilities: Dict[int, float]) -> DiceRoll:
+        """Roll the dice once using the given sum distribution."""
+        dice_sum = self.table_for(probabilities).draw()
+        dice1, dice2 = pair_for_sum(dice_sum)
+        return DiceRoll(dice_sum=dice_sum, dice1=dice1, dice2=dice2)
+
+    def roll_many(self, probabilities: Dict[int, float], size: int,
+                  rng: Optional[np.random.Generator] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Roll the dice many times using the given sum distribution.
+
+        Returns:
+            Tuple of (dice sums, dice1, dice2) uint8 arrays
+        """
+        rng = rng if rng is not None else np.random.default_rng()
+        dice_sums = self.table_for(probabilities).draw_many(size, rng)
+        dice1, dice2 = pairs_for_sums(dice_sums, rng)
+        return dice_sums, dice1, dice2
+
+    def sample_regimes(self, trend_codes: np.ndarray, trends: Sequence[TrendType],
+                       volatility: float, rng: np.random.Generator) -> np.ndarray:
+        """
+        Draw one dice sum per element of a matrix of regime codes.
+
+        Args:
+            trend_codes: Integer array; each value indexes into trends
+            trends: Trend for each code
+            volatility: Market volatility shared by all regimes
+            rng: NumPy generator
+
+        Returns:
+            uint8 array of dice sums with the same shape as trend_codes
+        """
+        tables = [self.table_for_regime(trend, volatility) for trend in trends]
+        prob = np.stack([t.prob for t in tables])
+        alias = np.stack([t.alias for t in tables])
+
+        idx = rng.integers(0, 11, size=trend_codes.shape)
+        keep = rng.random(trend_codes.shape) < prob[trend_codes, idx]
+        return (np.where(keep, idx, alias[trend_codes, idx]) + 2).astype(np.uint8)
+
+
+_default_sampler = DiceSampler()
+
+
+def get_sampler() -> DiceSampler:
+    """Return the process-wide sampler shared by the game and simulations."""
+    return _default_sampler
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import threading
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Optional, Set, Tuple
+
+# Events kept per session so a reconnecting client can resume with Last-Event-ID
+EVENT_REPLAY_SIZE = 256
+# Events buffered per subscriber before the slowest ones start losing the oldest
+SUBSCRIBER_QUEUE_SIZE = 1024
+# Seconds between keep-alive comments on an idle stream
+HEARTBEAT_INTERVAL = 15.0
+
+
+class _Subscriber:
+    """Queue of a single stream, bound to the event loop that reads it."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: "asyncio.Queue[Optional[Tuple[int, str, str]]]" = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+
+    def deliver(self, item: Optional[Tuple[int, str, str]]) -> None:
+        # Runs on the subscriber's loop; a full queue drops its oldest event
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(item)
+
+
+class EventChannel:
+    """
+    Push channel for the events of one game session.
+
+    Endpoints run in a threadpool, so publish() is thread-safe: events are
+    serialized once and handed to every subscriber's event loop with
+    call_soon_threadsafe. Each event gets an increasing id and the last
+    EVENT_REPLAY_SIZE are kept for clients that reconnect.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self._replay: "deque[Tuple[int, str, str]]" = deque(maxlen=EVENT_REPLAY_SIZE)
+        self._subscribers: Set[_Subscriber] = set()
+        self.closed = False
+
+    def publish(self, event: str, data: Dict[str, Any]) -> int:
+        """
+        Send an event to every subscriber.
+
+        Args:
+            event: Event type (the SSE event name)
+            data: JSON-serializable payload
+
+        Returns:
+            The event id
+        """
+        payload = json.dumps(data, separators=(",", ":"))
+        with self._lock:
+            event_id = self._next_id
+            self._next_id += 1
+            item = (event_id, event, payload)
+            self._replay.append(item)
+            subscribers = list(self._subscribers)
+
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.deliver, item)
+            except RuntimeError:
+                # The subscriber's loop has shut down
+                self._unsubscribe(subscriber)
+        return event_id
+
+    def close(self) -> None:
+        """End every open stream (the session is gone)."""
+        with self._lock:
+            self.closed = True
+            subscribers = list(self._subscribers)
+            self._subscribers.clear()
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.deliver, None)
+            except RuntimeError:
+                pass
+
+    def _unsubscribe(self, subscriber: _Subscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    async def stream(self, last_event_id: Optional[int] = None,
+                     initial: Optional[Tuple[str, Dict[str, Any]]] = None) -> AsyncIterator[str]:
+        """
+        Yield Server-Sent Events frames until the channel closes.
+
+        Args:
+            last_event_id: Resume after this event id, replaying what is still buffered
+            initial: Optional (event, data) sent first to this subscriber only
+        """
+        subscriber = _Subscriber(asyncio.get_running_loop())
+        with self._lock:
+            if self.closed:
+                return
+            backlog = [item for item in self._replay if last_event_id is not None and item[0] > last_event_id]
+            self._subscribers.add(subscriber)
+
+        try:
+            yield "retry: 3000\n\n"
+            if initial is not None:
+                event, data = initial
+                yield f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+            for item in backlog:
+                yield _format(item)
+
+            while True:
+                try:
+                    item = await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if item is None:
+                    break
+                yield _format(item)
+        finally:
+            self._unsubscribe(subscriber)
+
+
+def _format(item: Tuple[int, str, str]) -> str:
+    event_id, event, payload = item
+    return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n"
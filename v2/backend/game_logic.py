@@ -1,7 +1,7 @@
 import random
-import numpy as np
 from typing import Dict, List, Tuple, Optional
 from models import GameState, BetResult, TrendType, DiceRoll, Portfolio, Position, RiskMetrics
+from dice_sampler import get_sampler
 
 # Payout multipliers based on the probability of the sum
 PAYOUTS = {
@@ -42,8 +42,18 @@ MARKET_NEWS = {
 }
 
 
-def roll_dice() -> DiceRoll:
-    """Roll two dice and return the sum and individual dice values"""
+def roll_dice(probabilities: Optional[Dict[int, float]] = None) -> DiceRoll:
+    """
+    Roll two dice and return the sum and individual dice values.
+    
+    Args:
+        probabilities: Optional distribution over sums (e.g. from adjust_probabilities).
+            When given, the sum is drawn from it and a matching dice pair is picked;
+            otherwise two fair dice are rolled.
+    """
+    if probabilities:
+        return get_sampler().roll(probabilities)
+    
     dice1 = random.randint(1, 6)
     dice2 = random.randint(1, 6)
     return DiceRoll(dice_sum=dice1 + dice2, dice1=dice1, dice2=dice2)
@@ -155,46 +165,20 @@ def calculate_risk_metrics(portfolio: Portfolio, probabilities: Dict[int, float]
     """
     Calculate risk metrics for a portfolio.
     
+    Exactly one sum is rolled, so the metrics come from the portfolio's
+    profit/loss over the 11 mutually exclusive outcomes (see risk_engine).
+    
     Args:
         portfolio: Player's betting portfolio
         probabilities: Current probabilities for each sum
         
     Returns:
-        Risk metrics including expected return, max loss, etc.
+        Risk metrics including expected return, max loss, VaR, CVaR, etc.
     """
-    if not portfolio.positions:
-        return RiskMetrics(
-            expected_return=0,
-            max_loss=0,
-            max_gain=0,
-            win_probability=0
-        )
-    
-    # Calculate expected return
-    expected_return = 0
-    for position in portfolio.positions:
-        # Expected value = probability * payout - (1-probability) * bet
-        expected_return += (probabilities[position.bet_sum] * position.amount * PAYOUTS[position.bet_sum]) - \
-                           ((1 - probabilities[position.bet_sum]) * position.amount)
+    # Imported here because risk_engine builds on this module's payouts
+    from risk_engine import risk_engine
     
-    # Calculate maximum possible loss (lose all bets)
-    max_loss = -sum(position.amount for position in portfolio.positions)
-    
-    # Calculate maximum possible gain (win all bets)
-    max_gain = 0
-    for position in portfolio.positions:
-        max_gain += position.amount * PAYOUTS[position.bet_sum] - position.amount
-    
-    # Calculate probability of winning at least one bet
-    win_probability = 1 - np.prod([1 - probabilities[position.bet_sum] 
-                                 for position in portfolio.positions])
-    
-    return RiskMetrics(
-        expected_return=expected_return,
-        max_loss=max_loss,
-        max_gain=max_gain,
-        win_probability=win_probability
-    )
+    return risk_engine.metrics(portfolio, probabilities)
 
 
 def add_position(portfolio: Portfolio, bet_sum: int, amount: float) -> bool:
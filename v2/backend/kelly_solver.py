@@ -0,0 +1,191 @@
+"""
+Joint Kelly sizing of bets on several sums.
+
+strategies.kelly sizes one bet from its own win probability and payout.
+Bets on different sums are mutually exclusive, so their sizes interact: the
+stakes that maximize the expected log bankroll have to be found together over
+the 11 outcomes. With f the bankroll fractions staked on the chosen sums,
+c = 1 - sum(f) the fraction kept back and d = payout + 1, the optimum is
+
+    f_i = max(0, p_i / A - c / d_i)
+
+with A = 1 when the total stake is free and c = 1 - cap when a cap on the
+total binds. The sums bet on are always the ones with the highest p * d, so
+trying each prefix of the sums sorted by p * d and keeping the one whose
+solution is consistent gives the exact optimum with a few array operations
+per batch, no iteration needed.
+"""
+from typing import Iterable, NamedTuple, Tuple
+
+import numpy as np
+
+from risk_engine import PAYOUT_VECTOR, SUMS, payoff_matrix
+
+DECIMAL_ODDS = PAYOUT_VECTOR + 1
+
+
+class KellyAllocation(NamedTuple):
+    """Joint Kelly stakes, one row per bankroll; columns are the sums 2-12."""
+    fractions: np.ndarray
+    stakes: np.ndarray
+    expected_return: np.ndarray
+    log_growth: np.ndarray
+
+
+def sum_mask(sums: Iterable[int]) -> np.ndarray:
+    """(11,) boolean mask of the sums that may be bet on."""
+    mask = np.zeros(len(SUMS), dtype=bool)
+    for s in sums:
+        if s < 2 or s > 12:
+            raise ValueError("Invalid bet sum. Must be between 2 and 12")
+        mask[s - 2] = True
+    return mask
+
+
+def _prefixes(p: np.ndarray, mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Candidate bet sets: the first k allowed sums by p * d, for k = 0..11.
+
+    Returns:
+        (P, D, last, following), each (n, 12): total probability and total 1/d
+        of the first k sums, and p * d of the k-th and (k+1)-th sum
+        (+inf and -inf where there is none; disallowed sums count as -inf)
+    """
+    value = np.where(mask, p * DECIMAL_ODDS, -np.inf)
+    order = np.argsort(-value, axis=1)
+    value = np.take_along_axis(value, order, axis=1)
+    allowed = np.isfinite(value)
+    zero = np.zeros((len(p), 1))
+    P = np.hstack([zero, np.cumsum(np.take_along_axis(p, order, axis=1) * allowed, axis=1)])
+    D = np.hstack([zero, np.cumsum((1 / DECIMAL_ODDS)[order] * allowed, axis=1)])
+    last = np.hstack([np.full((len(p), 1), np.inf), value])
+    following = np.hstack([value, np.full((len(p), 1), -np.inf)])
+    return P, D, last, following
+
+
+def kelly_fractions(probabilities: np.ndarray, mask: np.ndarray, max_total_fraction: float = 1.0) -> np.ndarray:
+    """
+    Full Kelly bankroll fractions for a batch of probability vectors.
+
+    Args:
+        probabilities: (n, 11) or (11,) probabilities of the sums 2-12
+        mask: (11,) or (n, 11) sums that may be bet on
+        max_total_fraction: Cap on the total fraction staked per row
+
+    Returns:
+        (n, 11) fractions of the bankroll to stake on each sum
+    """
+    p = np.atleast_2d(np.asarray(probabilities, dtype=np.float64))
+    mask = np.broadcast_to(mask, p.shape)
+    rows = np.arange(len(p))
+    P, D, last, following = _prefixes(p, mask)
+
+    # Free total: c = (1 - P) / (1 - D), and the set is consistent when its
+    # last sum has p * d above c and the next one does not (1 - D > 0 since
+    # the payouts' 1/d add up to less than 1)
+    reserve = (1 - P) / (1 - D)
+    k = np.argmax((last > reserve) & (following <= reserve), axis=1)
+    c = reserve[rows, k]
+    fractions = np.where(mask, np.maximum(0.0, p - c[:, None] / DECIMAL_ODDS), 0.0)
+
+    capped = fractions.sum(axis=1) > max_total_fraction
+    if capped.any():
+        # Binding cap: c = 1 - cap and sum(f) = cap gives A = P / (cap + c * D)
+        c = 1 - max_total_fraction
+        Pc, Dc, lc, fc = P[capped], D[capped], last[capped], following[capped]
+        with np.errstate(invalid="ignore"):
+            threshold = c * Pc / (max_total_fraction + c * Dc)
+        valid = (lc > threshold) & (fc <= threshold)
+        valid[:, 0] = False
+        k = np.argmax(valid, axis=1)
+        a = Pc[np.arange(len(k)), k] / (max_total_fraction + c * Dc[np.arange(len(k)), k])
+        fractions[capped] = np.where(mask[capped],
+                                     np.maximum(0.0, p[capped] / a[:, None] - c / DECIMAL_ODDS), 0.0)
+    return fractions
+
+
+def solve_kelly(bankrolls: np.ndarray, probabilities: np.ndarray, sums: Iterable[int],
+                kelly_fraction: float = 0.5, max_total_fraction: float = 1.0) -> KellyAllocation:
+    """
+    Joint Kelly stakes on a set of sums for many bankrolls.
+
+    The full Kelly fractions are scaled by kelly_fraction (0.5 is Half Kelly,
+    the default of strategies.kelly). If the scaled total still exceeds
+    max_total_fraction, the log-optimal stakes under that cap are used.
+
+    Args:
+        bankrolls: (n,) bankrolls
+        probabilities: (11,) probabilities shared by all rows, or (n, 11)
+        sums: Sums that may be bet on
+        kelly_fraction: Multiplier on the full Kelly fractions
+        max_total_fraction: Largest total stake as a bankroll fraction
+
+    Returns:
+        KellyAllocation with one row per bankroll
+    """
+    bankrolls = np.atleast_1d(np.asarray(bankrolls, dtype=np.float64))
+    p = np.broadcast_to(np.atleast_2d(np.asarray(probabilities, dtype=np.float64)), (len(bankrolls), len(SUMS)))
+    mask = sum_mask(sums)
+
+    # One probability vector for all rows needs a single solve
+    shared = np.ndim(probabilities) == 1
+    fractions = kelly_fractions(p[:1] if shared else p, mask) * kelly_fraction
+    over = fractions.sum(axis=1) > max_total_fraction
+    if over.any():
+        fractions[over] = kelly_fractions((p[:1] if shared else p)[over], mask, max_total_fraction)
+    if shared:
+        fractions = np.repeat(fractions, len(bankrolls), axis=0)
+
+    pnl = payoff_matrix(fractions)
+    return KellyAllocation(
+        fractions=fractions,
+        stakes=fractions * bankrolls[:, None],
+        expected_return=(pnl * p).sum(axis=1) * bankrolls,
+        log_growth=(np.log1p(pnl) * p).sum(axis=1)
+    )
+
+
+if __name__ == "__main__":
+    import time
+
+    from game_logic import adjust_probabilities
+    from models import TrendType
+    from risk_engine import probability_vector
+    from strategies.kelly import kelly
+
+    # A single sum reduces to the textbook formula (b p - q) / b with b = payout
+    p = probability_vector(adjust_probabilities(TrendType.BULL, 0.5))
+    for s in SUMS:
+        q, b = p[s - 2], PAYOUT_VECTOR[s - 2]
+        f = kelly_fractions(p, sum_mask([s]))[0, s - 2]
+        assert np.isclose(f, max(0.0, (b * q - (1 - q)) / b)), s
+
+    # Compare with a brute-force grid search over two and three sums
+    rng = np.random.default_rng(1)
+    for sums in ([6, 8], [2, 3, 4], [7, 11, 12]):
+        for cap in (1.0, 0.1):
+            q = rng.dirichlet(np.ones(11) * 3)
+            q[[s - 2 for s in sums]] *= 2
+            q /= q.sum()
+            best = solve_kelly([1.0], q, sums, 1.0, cap)
+            grid = np.linspace(0, 0.3, 61)
+            mesh = np.stack(np.meshgrid(*[grid] * len(sums)), -1).reshape(-1, len(sums))
+            mesh = mesh[mesh.sum(axis=1) <= cap]
+            candidates = np.zeros((len(mesh), 11))
+            candidates[:, [s - 2 for s in sums]] = mesh
+            growth = np.log1p(payoff_matrix(candidates)) @ q
+            assert best.log_growth[0] >= growth.max() - 1e-12, (sums, cap)
+            assert best.fractions[0].sum() <= cap + 1e-9
+    print("Joint Kelly matches the closed form and beats grid search")
+
+    # Half Kelly vs strategies.kelly on one sum
+    allocation = solve_kelly([250.0], p, [2])
+    print(f"Sum 2, bankroll 250: joint {allocation.stakes[0, 0]:.2f}, "
+          f"strategies.kelly {kelly(250.0, [], p[0], PAYOUT_VECTOR[0]):.2f} (net odds payout - 1)")
+
+    n = 100_000
+    bankrolls = rng.uniform(10, 1000, n)
+    vectors = rng.dirichlet(np.ones(11) * 4, n)
+    start = time.perf_counter()
+    allocation = solve_kelly(bankrolls, vectors, [2, 5, 7, 9, 12], 0.5, 0.25)
+    print(f"{n} bankrolls x probability vectors in {(time.perf_counter() - start) * 1e3:.0f} ms")
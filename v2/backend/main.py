@@ -1,29 +1,38 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict, List, Optional
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Callable, Dict, List, Optional, Union
 import importlib
+import numpy as np
 
 from models import (
     GameState, Bet, BetResponse, BetResult, TrendType, 
     Position, Portfolio, RiskMetrics, AIAdvice, Strategy,
-    InitGameRequest, DiceRoll, AnalyticsData
+    InitGameRequest, DiceRoll, AnalyticsData, StakeSuggestion,
+    AnalyticsRounds, AnalyticsDelta, BatchBetRequest, BatchBetResponse,
+    AutoplayRequest, AutoplayStatus, RiskScoreRequest, PortfolioRiskScores,
+    OptimizeRequest, OptimizeResponse, PortfolioCandidate, KellyRequest,
+    KellyRecommendation, KellyBatchRequest, KellyBatchResponse, AdviceMetrics
 )
 import game_logic
+import kelly_solver
+import risk_engine
+from portfolio_optimizer import portfolio_optimizer
+import rounds
+from autoplay import AutoplayJob
+from sessions import GameSession, SessionStore
 
 import sys
 import random
 import os
-import numpy as np
+import threading
+
+sys.path.append("../")  # Add parent directory to path to import original modules
 
-# Import AI Advisor if available
-try:
-    sys.path.append("../")  # Add parent directory to path to import original modules
-    from ai_services.openrouter_client import OpenRouterClient, DeepSeekClient
-    from strategies.ai_advisor import AIStrategyAdvisor
-    AI_AVAILABLE = True
-except ImportError:
-    print("Warning: AI modules not found. AI features will be disabled.")
-    AI_AVAILABLE = False
+# The AI advisor and its clients are imported on the first advice request so
+# they do not slow down startup; None until that import has been attempted
+AI_AVAILABLE = None
 
 app = FastAPI(title="DiceTrader API", version="2.0")
 
@@ -34,26 +43,58 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Session-ID", "ETag", "X-Analytics-Version"],
 )
 
-# In-memory storage for the game state
+# In-memory storage for game sessions, keyed by the X-Session-ID header
 # In a production app, this would be stored in a database
-game_state = None
-analytics = AnalyticsData()
+sessions = SessionStore()
+
+# The advisor's Q-table and caches are shared by all sessions
 ai_advisor = None
+_ai_advisor_lock = threading.Lock()
+
+
+def get_ai_advisor():
+    """Import the AI modules and create the shared advisor on first use (None if unavailable)"""
+    global AI_AVAILABLE, ai_advisor
+    with _ai_advisor_lock:
+        if AI_AVAILABLE is None:
+            try:
+                from strategies.ai_advisor import AIStrategyAdvisor
+                ai_advisor = AIStrategyAdvisor()
+                AI_AVAILABLE = True
+            except ImportError:
+                print("Warning: AI modules not found. AI features will be disabled.")
+                AI_AVAILABLE = False
+    return ai_advisor
+
+
+@app.on_event("shutdown")
+async def close_ai_clients():
+    """Release pooled upstream connections"""
+    # Only if the clients were ever imported
+    client_module = sys.modules.get("ai_services.openrouter_client")
+    if client_module is not None:
+        await client_module.close_async_http_client()
+
+
+def get_session(x_session_id: Optional[str] = Header(None)) -> GameSession:
+    """Resolve the session addressed by the X-Session-ID header"""
+    session = sessions.get(x_session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Game not initialized")
+    return session
 
 
 @app.post("/init", response_model=GameState)
-def initialize_game(request: InitGameRequest):
-    """Initialize a new game with the given settings"""
-    global game_state, ai_advisor
-    
-    # Initialize AI advisor if available
-    if AI_AVAILABLE:
-        ai_advisor = AIStrategyAdvisor()
-    else:
-        ai_advisor = None
+def initialize_game(request: InitGameRequest, response: Response,
+                    x_session_id: Optional[str] = Header(None)):
+    """Initialize a new game with the given settings.
     
+    Reuses the session id from the X-Session-ID header if one is sent,
+    otherwise starts a new session. The id is returned in the same header.
+    """
     # Create new game state
     game_state = GameState(
         money=request.initial_bankroll,
@@ -65,256 +106,439 @@ def initialize_game(request: InitGameRequest):
     # Initialize probabilities based on trend
     game_state.probabilities = game_logic.adjust_probabilities(game_state.trend, game_state.volatility)
     
-    # Reset analytics
-    global analytics
-    analytics = AnalyticsData(bankroll_history=[request.initial_bankroll])
+    # Register the session (this also resets its analytics)
+    session = GameSession(x_session_id or SessionStore.new_session_id(), game_state, request.initial_bankroll)
+    sessions.put(session)
+    response.headers["X-Session-ID"] = session.session_id
     
     return game_state
 
 
 @app.get("/state", response_model=GameState)
-def get_game_state():
+def get_game_state(session: GameSession = Depends(get_session)):
     """Get the current game state"""
-    if not game_state:
-        raise HTTPException(status_code=404, detail="Game not initialized")
-    return game_state
+    return session.game_state
+
+
+@app.delete("/session")
+def end_session(session: GameSession = Depends(get_session)):
+    """End the current session and free its memory"""
+    sessions.remove(session.session_id)
+    return {"status": "Session ended"}
 
 
 @app.post("/bet", response_model=BetResponse)
-def place_bet(bet: Bet):
+def place_bet(bet: Bet, session: GameSession = Depends(get_session)):
     """Place a bet on a specific sum"""
-    if not game_state:
-        raise HTTPException(status_code=404, detail="Game not initialized")
-    
-    # Check if player has enough money
-    if bet.amount > game_state.money:
-        raise HTTPException(status_code=400, detail="Not enough money to place bet")
-    
-    # Check if bet sum is valid
-    if bet.bet_sum < 2 or bet.bet_sum > 12:
-        raise HTTPException(status_code=400, detail="Invalid bet sum. Must be between 2 and 12")
-    
-    # Clear portfolio for single bet
-    game_state.portfolio.positions = []
-    
-    # Add bet to portfolio
-    game_logic.add_position(game_state.portfolio, bet.bet_sum, bet.amount)
-    
-    # Roll the dice
-    dice_roll = game_logic.roll_dice()
-    
-    # Calculate returns
-    profit_loss, winning_positions = game_logic.calculate_portfolio_return(
-        game_state.portfolio, dice_roll.dice_sum)
-    
-    # Update money and bet history
-    old_money = game_state.money
-    game_state.money += profit_loss
-    
-    # Determine if this was a win or loss
-    if profit_loss > 0:
-        result = BetResult.WIN
-        game_state.bet_history.append(BetResult.WIN)
+    with session.lock:
+        try:
+            rounds.validate_bet(session, bet.bet_sum, bet.amount)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        outcome = rounds.play_round(session, bet.bet_sum, bet.amount)
+        
+        # Prepare response
+        response = BetResponse(
+            dice_roll=outcome.dice_roll,
+            profit_loss=outcome.profit_loss,
+            new_bankroll=session.game_state.money,
+            result=outcome.result,
+            winning_positions=outcome.winning_positions,
+            trend_changed=outcome.trend_changed,
+            new_trend=outcome.new_trend if outcome.trend_changed else None,
+            market_news=outcome.market_news if outcome.trend_changed else None
+        )
+        
+        # Clear portfolio after bet
+        session.game_state.portfolio.positions = []
+        
+        return response
+
+
+@app.post("/bet/batch", response_model=BatchBetResponse)
+def place_bet_batch(request: BatchBetRequest, session: GameSession = Depends(get_session)):
+    """Play many rounds in one request, returning the results column by column"""
+    if request.bets is not None:
+        if request.rounds is not None:
+            raise HTTPException(status_code=400, detail="Send either bets or rounds, not both")
+        count = len(request.bets)
+        bets = ((bet.bet_sum, bet.amount) for bet in request.bets)
+    elif request.rounds is not None:
+        if request.bet_sum is None or request.amount is None:
+            raise HTTPException(status_code=400, detail="rounds requires bet_sum and amount")
+        count = request.rounds
+        bets = ((request.bet_sum, request.amount) for _ in range(request.rounds))
     else:
-        result = BetResult.LOSS
-        game_state.bet_history.append(BetResult.LOSS)
-    
-    # Update market based on dice roll
-    new_trend, trend_changed, market_news = game_logic.update_market(dice_roll.dice_sum, game_state)
-    if trend_changed:
-        game_state.trend = new_trend
-        # Update probabilities when trend changes
-        game_state.probabilities = game_logic.adjust_probabilities(game_state.trend, game_state.volatility)
-    
-    # Update analytics
-    global analytics
-    analytics.bankroll_history.append(game_state.money)
-    analytics.win_history.append(1 if result == BetResult.WIN else 0)
-    analytics.bet_amounts.append(bet.amount)
-    analytics.bet_sums.append(bet.bet_sum)
-    analytics.dice_results.append(dice_roll.dice_sum)
-    analytics.trends.append(game_state.trend.value)
-    _update_analytics_metrics()
-    
-    # Prepare response
-    response = BetResponse(
-        dice_roll=dice_roll,
-        profit_loss=profit_loss,
-        new_bankroll=game_state.money,
-        result=result,
-        winning_positions=winning_positions,
-        trend_changed=trend_changed,
-        new_trend=new_trend if trend_changed else None,
-        market_news=market_news if trend_changed else None
-    )
-    
-    # Clear portfolio after bet
-    game_state.portfolio.positions = []
-    
-    return response
+        raise HTTPException(status_code=400, detail="Send bets or rounds")
+    if count > rounds.BATCH_MAX_ROUNDS:
+        raise HTTPException(status_code=400,
+                            detail=f"At most {rounds.BATCH_MAX_ROUNDS} rounds per batch")
+    
+    with session.lock:
+        result = rounds.play_batch(session, bets)
+    # Thousands of rounds: skip re-validating the columns on the way out
+    return Response(content=result.model_dump_json(), media_type="application/json")
+
+
+@app.post("/autoplay", response_model=AutoplayStatus)
+def start_autoplay(request: AutoplayRequest, session: GameSession = Depends(get_session)):
+    """Start playing the session unattended with a strategy and stop rules"""
+    with session.lock:
+        if session.autoplay is not None and session.autoplay.running:
+            raise HTTPException(status_code=409, detail="An autoplay job is already running")
+        job = AutoplayJob(session, request, store=sessions)
+        try:
+            job.start()
+        except RuntimeError as e:
+            raise HTTPException(status_code=429, detail=str(e))
+        session.autoplay = job
+        return job.status()
+
+
+@app.get("/autoplay", response_model=AutoplayStatus)
+def get_autoplay(session: GameSession = Depends(get_session)):
+    """Status and progress of the session's latest autoplay job"""
+    if session.autoplay is None:
+        raise HTTPException(status_code=404, detail="No autoplay job")
+    return session.autoplay.status()
+
+
+@app.delete("/autoplay", response_model=AutoplayStatus)
+def cancel_autoplay(session: GameSession = Depends(get_session)):
+    """Cancel the session's autoplay job after its current round"""
+    job = session.autoplay
+    if job is None:
+        raise HTTPException(status_code=404, detail="No autoplay job")
+    job.cancel()
+    job.join(timeout=5)
+    return job.status()
 
 
 @app.post("/portfolio/add", response_model=bool)
-def add_to_portfolio(position: Position):
+def add_to_portfolio(position: Position, session: GameSession = Depends(get_session)):
     """Add a position to the portfolio"""
-    if not game_state:
-        raise HTTPException(status_code=404, detail="Game not initialized")
-    
-    # Check if player has enough money
-    total_invested = game_logic.get_total_investment(game_state.portfolio)
-    if position.amount > (game_state.money - total_invested):
-        raise HTTPException(status_code=400, detail="Not enough available funds")
-    
-    # Add position to portfolio
-    success = game_logic.add_position(game_state.portfolio, position.bet_sum, position.amount)
-    return success
+    with session.lock:
+        game_state = session.game_state
+        
+        # Check if player has enough money
+        total_invested = game_logic.get_total_investment(game_state.portfolio)
+        if position.amount > (game_state.money - total_invested):
+            raise HTTPException(status_code=400, detail="Not enough available funds")
+        
+        # Add position to portfolio
+        success = game_logic.add_position(game_state.portfolio, position.bet_sum, position.amount)
+        return success
 
 
 @app.post("/portfolio/remove/{bet_sum}", response_model=float)
-def remove_from_portfolio(bet_sum: int):
+def remove_from_portfolio(bet_sum: int, session: GameSession = Depends(get_session)):
     """Remove a position from the portfolio"""
-    if not game_state:
-        raise HTTPException(status_code=404, detail="Game not initialized")
-    
-    amount = game_logic.remove_position(game_state.portfolio, bet_sum)
-    return amount
+    with session.lock:
+        amount = game_logic.remove_position(session.game_state.portfolio, bet_sum)
+        return amount
 
 
 @app.post("/portfolio/clear")
-def clear_portfolio():
+def clear_portfolio(session: GameSession = Depends(get_session)):
     """Clear all positions from the portfolio"""
-    if not game_state:
-        raise HTTPException(status_code=404, detail="Game not initialized")
-    
-    game_logic.clear_portfolio(game_state.portfolio)
-    return {"status": "Portfolio cleared"}
+    with session.lock:
+        game_logic.clear_portfolio(session.game_state.portfolio)
+        return {"status": "Portfolio cleared"}
 
 
 @app.get("/portfolio", response_model=Portfolio)
-def get_portfolio():
+def get_portfolio(session: GameSession = Depends(get_session)):
     """Get the current portfolio"""
-    if not game_state:
-        raise HTTPException(status_code=404, detail="Game not initialized")
-    
-    return game_state.portfolio
+    return session.game_state.portfolio
 
 
 @app.get("/portfolio/risk", response_model=RiskMetrics)
-def get_risk_metrics():
+def get_risk_metrics(session: GameSession = Depends(get_session)):
     """Get risk metrics for the current portfolio"""
-    if not game_state:
-        raise HTTPException(status_code=404, detail="Game not initialized")
-    
-    metrics = game_logic.calculate_risk_metrics(
-        game_state.portfolio, game_state.probabilities)
-    return metrics
+    with session.lock:
+        game_state = session.game_state
+        metrics = game_logic.calculate_risk_metrics(
+            game_state.portfolio, game_state.probabilities)
+        return metrics
+
+
+@app.post("/portfolio/risk/batch", response_model=PortfolioRiskScores)
+def score_portfolios(request: RiskScoreRequest, session: GameSession = Depends(get_session)):
+    """Score many candidate portfolios against the current probabilities in one call"""
+    with session.lock:
+        probabilities = dict(session.game_state.probabilities)
+    stakes = risk_engine.stake_matrix(request.portfolios)
+    scores = risk_engine.risk_engine.score(stakes, probabilities, request.confidence)
+    return PortfolioRiskScores(confidence=request.confidence,
+                               **{name: values.tolist() for name, values in scores._asdict().items()})
+
+
+@app.post("/portfolio/optimize", response_model=OptimizeResponse)
+def optimize_portfolio(request: OptimizeRequest, session: GameSession = Depends(get_session)):
+    """Search every portfolio on a stake grid for the best ones under the current probabilities"""
+    with session.lock:
+        probabilities = dict(session.game_state.probabilities)
+        bankroll = session.game_state.money
+    if bankroll <= 0:
+        raise HTTPException(status_code=400, detail="No bankroll left to stake")
+    try:
+        best = portfolio_optimizer.optimize(
+            probabilities, request.objective.value, request.top_k, request.stake_fractions,
+            request.max_positions, request.max_total_fraction, request.confidence)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # The search is in bankroll fractions; scale money amounts to the bankroll
+    candidates = []
+    for i, stakes in enumerate(best.stakes):
+        candidates.append(PortfolioCandidate(
+            positions=[Position(bet_sum=s, amount=float(f * bankroll))
+                       for s, f in zip(risk_engine.SUMS, stakes) if f],
+            expected_return=float(best.expected_return[i] * bankroll),
+            log_growth=float(best.log_growth[i]) if np.isfinite(best.log_growth[i]) else None,
+            win_probability=float(best.win_probability[i]),
+            value_at_risk=float(best.value_at_risk[i] * bankroll),
+            conditional_value_at_risk=float(best.conditional_value_at_risk[i] * bankroll)
+        ))
+    return OptimizeResponse(objective=request.objective, bankroll=bankroll, candidates=candidates)
+
+
+def _advice_snapshot(session: GameSession) -> dict:
+    """Copy what advice needs from the session; waits for session.lock, so call it off the event loop"""
+    with session.lock:
+        game_state = session.game_state
+        return {
+            "money": game_state.money,
+            "bet_history": [r.value for r in game_state.bet_history],
+            "trend": game_state.trend.value,
+            "probabilities": dict(game_state.probabilities),
+            "strategy": game_state.current_strategy
+        }
 
 
 @app.get("/strategy/advice", response_model=AIAdvice)
-def get_ai_advice():
+async def get_ai_advice(session: GameSession = Depends(get_session)):
     """Get AI strategy advice"""
-    if not game_state:
-        raise HTTPException(status_code=404, detail="Game not initialized")
-    
-    if not AI_AVAILABLE:
+    # The first call imports the AI modules and loads the Q-table, off the event loop
+    advisor = await run_in_threadpool(get_ai_advisor)
+    # Batches and autoplay can hold the session lock for a while, so wait for it in the threadpool
+    state = await run_in_threadpool(_advice_snapshot, session)
+    if advisor is None:
         # Provide a fallback recommendation if AI is not available
         # Find the sum with highest expected value
         payouts = {
             2: 36, 3: 18, 4: 12, 5: 9, 6: 7, 7: 6, 8: 7, 9: 9, 10: 12, 11: 18, 12: 36
         }
-        expected_values = {s: p * payouts[s] for s, p in game_state.probabilities.items()}
+        expected_values = {s: p * payouts[s] for s, p in state["probabilities"].items()}
         recommended_sum = max(expected_values, key=expected_values.get)
         
         return AIAdvice(
             recommended_sum=recommended_sum,
-            recommended_strategy=game_state.current_strategy,
+            recommended_strategy=state["strategy"],
             reasoning="AI advisor not available. Recommendation based on expected value calculation."
         )
-        
-    if not ai_advisor:
-        raise HTTPException(status_code=500, detail="AI advisor not initialized")
     
     try:
-        advice = ai_advisor.get_strategy_advice(
-            game_state.money, 
-            [r.value for r in game_state.bet_history], 
-            game_state.trend.value, 
-            game_state.probabilities
-        )
+        # The advisor only looks at the most recent results
+        advice = await advisor.get_strategy_advice_async(
+            state["money"], state["bet_history"][-advisor.RECENT_RESULTS:], state["trend"], state["probabilities"])
         
-        return AIAdvice(
+        result = AIAdvice(
             recommended_sum=advice["recommended_sum"],
             recommended_strategy=advice["recommended_strategy"],
             reasoning=advice["reasoning"]
         )
+        session.events.publish("advice", result.model_dump(mode="json"))
+        return result
     except Exception as e:
         # Fallback if AI advisor fails
         return AIAdvice(
             recommended_sum=7,  # Most common outcome
-            recommended_strategy=game_state.current_strategy,
+            recommended_strategy=state["strategy"],
             reasoning=f"AI advisor encountered an error. Using statistical recommendation. Error: {str(e)}"
         )
 
 
-@app.post("/strategy/change/{strategy}", response_model=GameState)
-def change_strategy(strategy: Strategy):
-    """Change the current betting strategy"""
-    if not game_state:
-        raise HTTPException(status_code=404, detail="Game not initialized")
-    
-    game_state.current_strategy = strategy
-    return game_state
+@app.get("/strategy/advice/metrics", response_model=AdviceMetrics)
+def get_advice_metrics():
+    """Cache, request coalescing and provider circuit counters of the shared AI advisor"""
+    # Reads the advisor without loading it; there are no counters before the first advice request
+    if ai_advisor is None:
+        raise HTTPException(status_code=404, detail="AI advisor not loaded")
+    return AdviceMetrics(cache=ai_advisor.advice_cache.stats(),
+                         coalescing=ai_advisor.single_flight.stats(),
+                         routing=ai_advisor.router.stats() if ai_advisor.router else None)
+
+
+@app.get("/strategy/stake", response_model=StakeSuggestion)
+def get_strategy_stake(bet_sum: Optional[int] = None, strategy: Optional[Strategy] = None,
+                       session: GameSession = Depends(get_session)):
+    """Get the next stake of the current (or given) strategy"""
+    with session.lock:
+        game_state = session.game_state
+        strategy = strategy or game_state.current_strategy
+        
+        kwargs = {}
+        if strategy == Strategy.KELLY:
+            # Kelly sizes the stake for a specific sum
+            if bet_sum is None or bet_sum < 2 or bet_sum > 12:
+                raise HTTPException(status_code=400, detail="Kelly requires a bet_sum between 2 and 12")
+            kwargs = {"probability": game_state.probabilities[bet_sum], "payout": game_logic.PAYOUTS[bet_sum]}
+        
+        stake = session.strategies.stake(strategy, game_state.money, **kwargs)
+        return StakeSuggestion(strategy=strategy, stake=stake, bet_sum=bet_sum)
 
 
-@app.get("/analytics", response_model=AnalyticsData)
-def get_analytics():
-    """Get game analytics data"""
-    global analytics
-    if not analytics:
-        raise HTTPException(status_code=404, detail="No analytics data available")
-    
-    return analytics
+@app.post("/strategy/kelly", response_model=KellyRecommendation)
+def get_kelly_stakes(request: KellyRequest, session: GameSession = Depends(get_session)):
+    """Size bets on several sums together to maximize the expected log bankroll"""
+    with session.lock:
+        bankroll = session.game_state.money
+        p = risk_engine.probability_vector(session.game_state.probabilities)
+    try:
+        allocation = kelly_solver.solve_kelly([bankroll], p, request.sums,
+                                              request.kelly_fraction, request.max_total_fraction)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    stakes = allocation.stakes[0]
+    return KellyRecommendation(
+        positions=[Position(bet_sum=s, amount=float(amount))
+                   for s, amount in zip(risk_engine.SUMS, stakes) if amount > 0],
+        bankroll=bankroll,
+        total_stake=float(stakes.sum()),
+        expected_return=float(allocation.expected_return[0]),
+        log_growth=float(allocation.log_growth[0])
+    )
 
 
-def _update_analytics_metrics():
-    """Update performance metrics in analytics"""
-    global analytics
-    
-    # Win rate
-    if analytics.win_history:
-        analytics.win_rate = sum(analytics.win_history) / len(analytics.win_history)
-    
-    # Average win and loss
-    wins = [amt for amt, win in zip(analytics.bet_amounts, analytics.win_history) if win]
-    losses = [amt for amt, win in zip(analytics.bet_amounts, analytics.win_history) if not win]
-    
-    analytics.avg_win = sum(wins) / len(wins) if wins else 0
-    analytics.avg_loss = sum(losses) / len(losses) if losses else 0
-    
-    # Calculate Sharpe ratio and max drawdown from bankroll history
-    if len(analytics.bankroll_history) > 1:
-        # Calculate returns
-        returns = []
-        for i in range(1, len(analytics.bankroll_history)):
-            ret = (analytics.bankroll_history[i] - analytics.bankroll_history[i-1]) / analytics.bankroll_history[i-1]
-            returns.append(ret)
-        
-        # Sharpe ratio (using risk-free rate of 0)
-        mean_return = np.mean(returns)
-        std_return = np.std(returns) if np.std(returns) > 0 else 1
-        analytics.sharpe_ratio = mean_return / std_return
-        
-        # Maximum drawdown
-        peak = analytics.bankroll_history[0]
-        drawdown = 0
-        
-        for value in analytics.bankroll_history:
-            if value > peak:
-                peak = value
-            current_drawdown = (peak - value) / peak
-            drawdown = max(drawdown, current_drawdown)
-        
-        analytics.max_drawdown = drawdown
+@app.post("/strategy/kelly/batch", response_model=KellyBatchResponse)
+def get_kelly_stakes_batch(request: KellyBatchRequest):
+    """Joint Kelly stakes for many bankrolls and probability vectors at once"""
+    if len(request.probabilities) not in (1, len(request.bankrolls)):
+        raise HTTPException(status_code=400, detail="Send one probability vector or one per bankroll")
+    if any(bankroll < 0 for bankroll in request.bankrolls):
+        raise HTTPException(status_code=400, detail="Bankrolls cannot be negative")
+    try:
+        vectors = [risk_engine.probability_vector(p) for p in request.probabilities]
+    except KeyError:
+        raise HTTPException(status_code=400, detail="Probabilities must cover every sum from 2 to 12")
+    p = np.array(vectors) if len(vectors) > 1 else vectors[0]
+    if (p < 0).any() or not np.allclose(np.atleast_2d(p).sum(axis=1), 1):
+        raise HTTPException(status_code=400, detail="Probabilities must be non-negative and sum to 1")
+    try:
+        allocation = kelly_solver.solve_kelly(request.bankrolls, p, request.sums,
+                                              request.kelly_fraction, request.max_total_fraction)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    result = KellyBatchResponse.model_construct(
+        stakes=allocation.stakes.tolist(),
+        total_stake=allocation.stakes.sum(axis=1).tolist(),
+        expected_return=allocation.expected_return.tolist(),
+        log_growth=allocation.log_growth.tolist()
+    )
+    # Up to 100000 rows: skip re-validating the columns on the way out
+    return Response(content=result.model_dump_json(), media_type="application/json")
+
+
+@app.post("/strategy/change/{strategy}", response_model=GameState)
+def change_strategy(strategy: Strategy, session: GameSession = Depends(get_session)):
+    """Change the current betting strategy"""
+    with session.lock:
+        session.game_state.current_strategy = strategy
+        return session.game_state
+
+
+def _versioned_response(session: GameSession, if_none_match: Optional[str], build: Callable) -> Response:
+    """
+    Serialize analytics with a version tag, or answer 304 if the client has it.
+    
+    The version is the number of rounds played, so it changes on every bet.
+    """
+    version = session.history.total_rounds
+    etag = f'"{session.instance_id}-{version}"'
+    headers = {"ETag": etag, "X-Analytics-Version": str(version), "Cache-Control": "no-cache"}
+    
+    if if_none_match:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if etag in tags or "*" in tags:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    # Built from trusted arrays, so the payload is serialized without re-validation
+    return Response(content=build().model_dump_json(), media_type="application/json", headers=headers)
+
+
+@app.get("/analytics", response_model=Union[AnalyticsData, AnalyticsDelta])
+def get_analytics(since: Optional[int] = Query(None, ge=0, description="Cursor from a previous delta"),
+                  if_none_match: Optional[str] = Header(None),
+                  session: GameSession = Depends(get_session)):
+    """Get game analytics data.
+    
+    Without since, returns the full analytics. With since (the cursor of a
+    previous response, or 0), returns only the rounds appended since then
+    plus the current metrics.
+    """
+    with session.lock:
+        if since is None:
+            return _versioned_response(session, if_none_match,
+                                       lambda: session.history.to_analytics(session.analytics_tracker))
+        return _versioned_response(session, if_none_match,
+                                   lambda: session.history.to_delta(since, session.analytics_tracker))
+
+
+@app.get("/analytics/rounds", response_model=AnalyticsRounds)
+def get_analytics_rounds(start: Optional[int] = Query(None, ge=0, description="First round index"),
+                         stop: Optional[int] = Query(None, ge=0, description="Round index to stop before"),
+                         last: Optional[int] = Query(None, ge=1, description="Only the most recent N rounds"),
+                         limit: int = Query(1000, ge=1, le=10000, description="Page size"),
+                         if_none_match: Optional[str] = Header(None),
+                         session: GameSession = Depends(get_session)):
+    """Get a page or window of the full-resolution round history.
+    
+    Follow next_start to page through a range; use last for a trailing window.
+    """
+    with session.lock:
+        history = session.history
+        if last is not None:
+            start = max(history.total_rounds - last, 0)
+        return _versioned_response(session, if_none_match,
+                                   lambda: history.to_rounds(start, stop, limit))
+
+
+def _stream_snapshot(session: GameSession) -> dict:
+    """Initial state event of a stream; waits for session.lock, so call it off the event loop"""
+    with session.lock:
+        game_state = session.game_state
+        return {
+            "round": session.history.total_rounds,
+            "bankroll": game_state.money,
+            "trend": game_state.trend.value,
+            "strategy": game_state.current_strategy.value
+        }
+
+
+@app.get("/events")
+async def stream_events(session_id: Optional[str] = Query(None, description="Session id, for clients that cannot set headers"),
+                        x_session_id: Optional[str] = Header(None),
+                        last_event_id: Optional[int] = Header(None)):
+    """Stream game events to the client as Server-Sent Events.
+    
+    Events: state (snapshot on connect), round (dice, result and new
+    bankroll), trend (regime change with market news) and advice. Browsers'
+    EventSource cannot send headers, so the session id may also be given as
+    the session_id query parameter; reconnects resume after Last-Event-ID.
+    """
+    session = get_session(session_id or x_session_id)
+    # Batches and autoplay can hold the session lock for a while, so wait for it in the threadpool
+    snapshot = await run_in_threadpool(_stream_snapshot, session)
+    
+    return StreamingResponse(
+        session.events.stream(last_event_id, initial=("state", snapshot)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 if __name__ == "__main__":
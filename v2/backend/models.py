@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Dict, List, Optional, Union, Literal
+from typing import Annotated, Dict, List, Optional, Union, Literal
 from enum import Enum
 from datetime import datetime
 
@@ -24,6 +24,27 @@ class Strategy(str, Enum):
     FIXED = "fixed"
 
 
+class SumPolicy(str, Enum):
+    FIXED = "fixed"
+    MOST_LIKELY = "most_likely"
+    BEST_VALUE = "best_value"
+    RANDOM = "random"
+
+
+class PortfolioObjective(str, Enum):
+    EXPECTED_VALUE = "expected_value"
+    LOG_GROWTH = "log_growth"
+    CVAR = "cvar"
+
+
+class AutoplayState(str, Enum):
+    RUNNING = "running"
+    COMPLETED = "completed"
+    STOPPED = "stopped"
+    CANCELLED = "cancelled"
+    FAILED = "failed"
+
+
 class Bet(BaseModel):
     bet_sum: int = Field(..., ge=2, le=12, description="Sum to bet on (2-12)")
     amount: float = Field(..., gt=0, description="Amount to bet")
@@ -44,12 +65,97 @@ class RiskMetrics(BaseModel):
     max_loss: float
     max_gain: float
     win_probability: float
+    std_dev: float = 0
+    value_at_risk: float = Field(0, description="Loss exceeded with probability at most 1 - confidence")
+    conditional_value_at_risk: float = Field(0, description="Expected loss in the worst 1 - confidence of outcomes")
+    confidence: float = 0.95
+    pnl_by_sum: Dict[int, float] = Field({}, description="Profit/loss if each sum is rolled")
+
+
+class RiskScoreRequest(BaseModel):
+    """Candidate portfolios to score against the current probabilities"""
+    portfolios: List[List[Position]] = Field(..., min_length=1, max_length=10000,
+                                             description="Positions of each candidate")
+    confidence: float = Field(0.95, gt=0, lt=1, description="Confidence level of VaR and CVaR")
+
+
+class PortfolioRiskScores(BaseModel):
+    """Exact risk metrics of each candidate portfolio, column by column"""
+    expected_return: List[float]
+    std_dev: List[float]
+    win_probability: List[float]
+    max_loss: List[float]
+    max_gain: List[float]
+    value_at_risk: List[float]
+    conditional_value_at_risk: List[float]
+    confidence: float
+
+
+class OptimizeRequest(BaseModel):
+    """Search settings for the best portfolios under the current probabilities"""
+    objective: PortfolioObjective = PortfolioObjective.EXPECTED_VALUE
+    top_k: int = Field(5, ge=1, le=50, description="Number of portfolios returned")
+    max_positions: int = Field(5, ge=1, le=5, description="Most sums in one portfolio")
+    stake_fractions: List[Annotated[float, Field(gt=0, le=1)]] = Field(
+        [0.01, 0.02, 0.05], min_length=1, max_length=6,
+        description="Stake levels each position may take, as bankroll fractions")
+    max_total_fraction: float = Field(0.25, gt=0, le=1, description="Largest total stake as a bankroll fraction")
+    confidence: float = Field(0.95, gt=0, lt=1, description="Confidence level of VaR and CVaR")
+
+
+class PortfolioCandidate(BaseModel):
+    positions: List[Position]
+    expected_return: float
+    log_growth: Optional[float] = Field(..., description="Expected log of the bankroll ratio after the round "
+                                                      "(null if the portfolio can lose the whole bankroll)")
+    win_probability: float
+    value_at_risk: float
+    conditional_value_at_risk: float
+
+
+class OptimizeResponse(BaseModel):
+    """Best portfolios found, best first, with stakes for the current bankroll"""
+    objective: PortfolioObjective
+    bankroll: float
+    candidates: List[PortfolioCandidate]
+
+
+class KellyRequest(BaseModel):
+    """Sums to size together with the Kelly criterion"""
+    sums: List[int] = Field(..., min_length=1, max_length=5, description="Sums that may be bet on (2-12)")
+    kelly_fraction: float = Field(0.5, gt=0, le=1, description="Multiplier on full Kelly (0.5 is Half Kelly)")
+    max_total_fraction: float = Field(0.25, gt=0, le=1, description="Largest total stake as a bankroll fraction")
+
+
+class KellyRecommendation(BaseModel):
+    """Joint Kelly stakes for the current bankroll and probabilities"""
+    positions: List[Position]
+    bankroll: float
+    total_stake: float
+    expected_return: float
+    log_growth: float = Field(..., description="Expected log of the bankroll ratio after the round")
+
+
+class KellyBatchRequest(KellyRequest):
+    """Joint Kelly sizing for many bankrolls and probability vectors"""
+    bankrolls: List[float] = Field(..., min_length=1, max_length=100000)
+    probabilities: List[Dict[int, float]] = Field(..., min_length=1, max_length=100000,
+                                                  description="One distribution over sums 2-12 for all bankrolls, "
+                                                              "or one per bankroll")
+
+
+class KellyBatchResponse(BaseModel):
+    """Joint Kelly stakes per bankroll, column by column"""
+    stakes: List[List[float]] = Field(..., description="Stakes on the sums 2-12 for each bankroll")
+    total_stake: List[float]
+    expected_return: List[float]
+    log_growth: List[float]
 
 
 class GameState(BaseModel):
     """Represents the current state of the game"""
     money: float = Field(100.0, description="Current bankroll")
-    bet_history: List[BetResult] = Field([], description="History of bet results")
+    bet_history: List[BetResult] = Field([], description="Most recent bet results (see BET_HISTORY_ROUNDS)")
     trend: TrendType = Field(TrendType.BULL, description="Current market trend")
     volatility: float = Field(0.1, ge=0, le=1, description="Current market volatility")
     round_count: int = Field(0, ge=0, description="Number of rounds played")
@@ -77,6 +183,62 @@ class BetResponse(BaseModel):
     market_news: Optional[str] = None
 
 
+class BatchBetRequest(BaseModel):
+    """Rounds to play in one request: an explicit list of bets, or N identical ones"""
+    bets: Optional[List[Bet]] = Field(None, description="Bets to place in order")
+    rounds: Optional[int] = Field(None, gt=0, description="Number of identical bets")
+    bet_sum: Optional[int] = Field(None, ge=2, le=12, description="Sum for every round when using rounds")
+    amount: Optional[float] = Field(None, gt=0, description="Amount for every round when using rounds")
+
+
+class TrendChange(BaseModel):
+    """Market trend change during a batch"""
+    round: int
+    trend: TrendType
+    news: Optional[str] = None
+
+
+class BatchBetResponse(BaseModel):
+    """Columnar results of a batch, one entry per round played"""
+    start_round: int = Field(..., description="Round index of the first round played")
+    rounds_played: int
+    dice_sum: List[int] = []
+    profit_loss: List[float] = []
+    win: List[int] = []
+    bankroll: List[float] = []
+    trend_changes: List[TrendChange] = []
+    total_profit_loss: float = 0
+    wins: int = 0
+    new_bankroll: float
+    stopped_reason: Optional[str] = Field(None, description="Why the batch ended before its last bet")
+
+
+class AutoplayRequest(BaseModel):
+    """Settings of a server-side autoplay job"""
+    strategy: Optional[Strategy] = Field(None, description="Stake strategy (default: the session's current one)")
+    sum_policy: SumPolicy = Field(SumPolicy.FIXED, description="How the sum is picked each round")
+    bet_sum: int = Field(7, ge=2, le=12, description="Sum bet on with the fixed policy")
+    stop_loss: Optional[float] = Field(None, gt=0, description="Stop once this much of the starting bankroll is lost")
+    take_profit: Optional[float] = Field(None, gt=0, description="Stop once this much has been won")
+    max_rounds: int = Field(1000, gt=0, description="Stop after this many rounds")
+    rounds_per_second: Optional[float] = Field(None, gt=0, description="Round rate; unset plays as fast as possible")
+
+
+class AutoplayStatus(BaseModel):
+    """Status and progress of an autoplay job"""
+    job_id: str
+    state: AutoplayState
+    settings: AutoplayRequest
+    rounds_played: int = 0
+    wins: int = 0
+    start_bankroll: float
+    bankroll: float
+    profit_loss: float = 0
+    stop_reason: Optional[str] = None
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+
+
 class AIAdvice(BaseModel):
     """AI strategy recommendation"""
     recommended_sum: int = Field(..., ge=2, le=12)
@@ -84,6 +246,70 @@ class AIAdvice(BaseModel):
     reasoning: str
 
 
+class AdviceCacheStats(BaseModel):
+    """Occupancy and hit/miss/eviction counters of the AI advice cache"""
+    size: int
+    max_size: int
+    ttl: float
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    hit_rate: float
+
+
+class CoalescingStats(BaseModel):
+    """Counters of the layer sharing one provider call among identical concurrent lookups"""
+    calls: int = Field(..., description="Lookups that ran a provider call")
+    coalesced: int = Field(..., description="Lookups that waited on another's call instead")
+    in_flight: int
+    coalesced_rate: float
+
+
+class ProviderStats(BaseModel):
+    """Circuit breaker of one AI provider"""
+    state: Literal["closed", "open", "half_open"]
+    calls: int
+    failures: int
+    rejected: int = Field(..., description="Calls skipped while the circuit was open")
+    opened: int = Field(..., description="Times the circuit opened")
+    failure_rate: float
+    slow_rate: float
+    p95_latency: Optional[float] = Field(None, description="Seconds; also the hedging delay")
+
+
+class RoutingStats(BaseModel):
+    hedges: int = Field(..., description="Requests also sent to the second provider")
+    hedge_wins: int = Field(..., description="Hedges that answered first")
+    unavailable: int = Field(..., description="Requests answered by the local RL fallback")
+    providers: Dict[str, ProviderStats]
+
+
+class AdviceMetrics(BaseModel):
+    cache: AdviceCacheStats
+    coalescing: CoalescingStats
+    routing: Optional[RoutingStats] = Field(None, description="Absent when no provider is configured")
+
+
+class StakeSuggestion(BaseModel):
+    """Stake the selected strategy would place next"""
+    strategy: Strategy
+    stake: float
+    bet_sum: Optional[int] = Field(None, ge=2, le=12)
+
+
+class AnalyticsBucket(BaseModel):
+    """Aggregate of consecutive older rounds"""
+    start_round: int
+    rounds: int
+    wins: int
+    bet_total: float
+    bankroll_close: float
+    bankroll_min: float
+    bankroll_max: float
+    bull_rounds: int
+
+
 class AnalyticsData(BaseModel):
     """Game analytics data"""
     bankroll_history: List[float] = []
@@ -97,9 +323,39 @@ class AnalyticsData(BaseModel):
     avg_loss: float = 0
     sharpe_ratio: float = 0
     max_drawdown: float = 0
+    first_round: int = Field(0, description="Round index of the first entry in the history lists")
+    total_rounds: int = 0
+    downsampled: List[AnalyticsBucket] = Field([], description="Aggregates of rounds before first_round")
     timestamp: datetime = Field(default_factory=datetime.now)
 
 
+class AnalyticsRounds(BaseModel):
+    """Columnar slice of the full-resolution round history"""
+    start_round: int = Field(..., description="Round index of the first entry")
+    stop_round: int = Field(..., description="Round index after the last entry")
+    bankroll_before: float = Field(..., description="Bankroll before start_round")
+    bankroll: List[float] = []
+    win: List[int] = []
+    bet_amount: List[float] = []
+    bet_sum: List[int] = []
+    dice_result: List[int] = []
+    trend: List[str] = []
+    first_round: int = Field(0, description="Oldest round still held at full resolution")
+    total_rounds: int = 0
+    next_start: Optional[int] = Field(None, description="start for the next page, if any")
+
+
+class AnalyticsDelta(AnalyticsRounds):
+    """Rounds appended since a cursor, with the current metrics"""
+    cursor: int = Field(..., description="Pass as since on the next poll")
+    truncated: bool = Field(False, description="Some rounds after since were already downsampled")
+    win_rate: float = 0
+    avg_win: float = 0
+    avg_loss: float = 0
+    sharpe_ratio: float = 0
+    max_drawdown: float = 0
+
+
 class InitGameRequest(BaseModel):
     """Request to initialize a new game"""
     initial_bankroll: float = Field(100.0, gt=0)
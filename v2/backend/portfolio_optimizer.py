@@ -0,0 +1,225 @@
+"""
+Exhaustive search for good bet portfolios.
+
+Every portfolio of up to Portfolio.max_positions sums with stakes from a grid
+is enumerated as a row of stakes over the sums 2-12, then all of them are
+scored against the payoff matrix in chunks. Stakes are fractions of the
+bankroll, so expected values and tail losses scale linearly with it and log
+growth does not depend on it at all: a search only depends on the
+probability vector and the search settings, and is cached per vector.
+"""
+import itertools
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from risk_engine import (DEFAULT_CONFIDENCE, SUMS, RegimeCache, payoff_matrix,
+                         probability_vector, read_only, risk_engine, tail_risk)
+
+OBJECTIVES = ("expected_value", "log_growth", "cvar")
+
+# Stake levels as fractions of the bankroll, and the largest total stake
+DEFAULT_STAKE_FRACTIONS = (0.01, 0.02, 0.05)
+DEFAULT_MAX_TOTAL_FRACTION = 0.25
+
+# Largest search allowed, and rows scored at once
+MAX_CANDIDATES = 1_000_000
+CHUNK_SIZE = 65536
+
+
+class OptimizedPortfolios(NamedTuple):
+    """Best portfolios of a search, best first; money amounts are bankroll fractions."""
+    stakes: np.ndarray
+    expected_return: np.ndarray
+    log_growth: np.ndarray
+    win_probability: np.ndarray
+    value_at_risk: np.ndarray
+    conditional_value_at_risk: np.ndarray
+
+
+def candidate_count(n_levels: int, max_positions: int) -> int:
+    """Number of portfolios with 1 to max_positions sums and n_levels stake levels."""
+    return sum(len(list(itertools.combinations(SUMS, k))) * n_levels ** k
+               for k in range(1, max_positions + 1))
+
+
+@lru_cache(maxsize=8)
+def candidate_stakes(stake_fractions: Tuple[float, ...], max_positions: int) -> np.ndarray:
+    """
+    Stakes of every portfolio of 1 to max_positions distinct sums on the grid.
+
+    Args:
+        stake_fractions: Stake levels (bankroll fractions) each position may take
+        max_positions: Most sums in one portfolio
+
+    Returns:
+        Read-only (n, 11) array of stakes
+    """
+    levels = np.asarray(stake_fractions, dtype=np.float64)
+    blocks = []
+    for k in range(1, max_positions + 1):
+        combos = np.array(list(itertools.combinations(range(len(SUMS)), k)))
+        grid = np.array(list(itertools.product(levels, repeat=k)))
+        block = np.zeros((len(combos) * len(grid), len(SUMS)))
+        rows = np.arange(len(block))[:, None]
+        block[rows, np.repeat(combos, len(grid), axis=0)] = np.tile(grid, (len(combos), 1))
+        blocks.append(block)
+    stakes = np.vstack(blocks)
+    stakes.flags.writeable = False
+    return stakes
+
+
+def optimize_portfolios(probabilities: np.ndarray, objective: str = "expected_value", top_k: int = 5,
+                        stake_fractions: Sequence[float] = DEFAULT_STAKE_FRACTIONS,
+                        max_positions: int = 5,
+                        max_total_fraction: float = DEFAULT_MAX_TOTAL_FRACTION,
+                        confidence: float = DEFAULT_CONFIDENCE) -> OptimizedPortfolios:
+    """
+    Score every candidate portfolio and keep the best.
+
+    Objectives:
+        expected_value  highest expected profit
+        log_growth      highest expected log of the bankroll after the round (Kelly);
+                        not betting (no stakes, growth 0) is a candidate too, so it
+                        ranks first when no portfolio grows the bankroll
+        cvar            lowest CVaR among portfolios with a positive expected value
+                        (among all of them if none has one), ties to the higher EV
+
+    Args:
+        probabilities: (11,) probabilities of the sums 2-12
+        objective: One of OBJECTIVES
+        top_k: Number of portfolios returned
+        stake_fractions: Stake levels as bankroll fractions
+        max_positions: Most sums in one portfolio
+        max_total_fraction: Largest total stake as a bankroll fraction
+        confidence: Confidence level of VaR and CVaR
+
+    Returns:
+        OptimizedPortfolios, best first
+
+    Raises:
+        ValueError: For an unknown objective, stake fractions outside (0, 1] or a
+            search larger than MAX_CANDIDATES
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective: {objective}")
+    levels = tuple(sorted(set(float(f) for f in stake_fractions)))
+    if not levels or levels[0] <= 0 or levels[-1] > 1:
+        raise ValueError("Stake fractions must be in (0, 1]")
+    if candidate_count(len(levels), max_positions) > MAX_CANDIDATES:
+        raise ValueError(f"Search space exceeds {MAX_CANDIDATES} portfolios; use fewer stake levels or positions")
+
+    stakes = candidate_stakes(levels, max_positions)
+    stakes = stakes[stakes.sum(axis=1) <= max_total_fraction + 1e-12]
+    if len(stakes) == 0:
+        raise ValueError("No stake level fits within max_total_fraction")
+    if objective == "log_growth":
+        # The no-bet baseline: without it a losing portfolio could come out best
+        stakes = np.vstack([np.zeros((1, len(SUMS))), stakes])
+
+    p = np.asarray(probabilities, dtype=np.float64)
+    n = len(stakes)
+    expected = np.empty(n)
+    growth = np.empty(n)
+    win_probability = np.empty(n)
+    var = np.empty(n)
+    cvar = np.empty(n)
+    for start in range(0, n, CHUNK_SIZE):
+        stop = min(start + CHUNK_SIZE, n)
+        pnl = payoff_matrix(stakes[start:stop])
+        expected[start:stop] = pnl @ p
+        # -inf for portfolios that can lose the whole bankroll
+        with np.errstate(divide="ignore"):
+            growth[start:stop] = np.log1p(pnl) @ p
+        win_probability[start:stop] = (pnl > 0) @ p
+        var[start:stop], cvar[start:stop] = tail_risk(pnl, p, confidence)
+
+    if objective == "expected_value":
+        order = np.lexsort((stakes.sum(axis=1), -expected))
+    elif objective == "log_growth":
+        order = np.lexsort((-expected, -growth))
+    else:
+        eligible = expected > 0
+        if not eligible.any():
+            eligible[:] = True
+        order = np.lexsort((-expected, np.where(eligible, cvar, np.inf)))
+    best = order[:top_k]
+
+    return OptimizedPortfolios(
+        stakes=stakes[best],
+        expected_return=expected[best],
+        log_growth=growth[best],
+        win_probability=win_probability[best],
+        value_at_risk=var[best],
+        conditional_value_at_risk=cvar[best]
+    )
+
+
+class PortfolioOptimizer:
+    """optimize_portfolios with results cached per probability vector (as read-only arrays)."""
+
+    def __init__(self, cache: Optional[RegimeCache] = None):
+        """
+        Args:
+            cache: Memo tables to use (defaults to the risk engine's)
+        """
+        self.cache = cache or risk_engine.cache
+
+    def optimize(self, probabilities: Dict[int, float], objective: str = "expected_value", top_k: int = 5,
+                 stake_fractions: Sequence[float] = DEFAULT_STAKE_FRACTIONS, max_positions: int = 5,
+                 max_total_fraction: float = DEFAULT_MAX_TOTAL_FRACTION,
+                 confidence: float = DEFAULT_CONFIDENCE) -> OptimizedPortfolios:
+        """Best portfolios for the given probabilities (see optimize_portfolios)."""
+        p = probability_vector(probabilities)
+        levels = tuple(sorted(set(float(f) for f in stake_fractions)))
+        key = ("optimize", objective, top_k, levels, max_positions, max_total_fraction, confidence)
+        return self.cache.get(p, key, lambda: read_only(optimize_portfolios(
+            p, objective, top_k, levels, max_positions, max_total_fraction, confidence)))
+
+
+# Shared by all sessions
+portfolio_optimizer = PortfolioOptimizer()
+
+
+if __name__ == "__main__":
+    import time
+
+    from game_logic import adjust_probabilities
+    from models import TrendType
+    from risk_engine import score_portfolios
+
+    p = probability_vector(adjust_probabilities(TrendType.BEAR, 0.4))
+    stakes = candidate_stakes(DEFAULT_STAKE_FRACTIONS, 5)
+    assert len(stakes) == candidate_count(len(DEFAULT_STAKE_FRACTIONS), 5)
+    assert len(np.unique(stakes, axis=0)) == len(stakes)
+
+    for objective in OBJECTIVES:
+        start = time.perf_counter()
+        result = optimize_portfolios(p, objective, top_k=3)
+        elapsed = time.perf_counter() - start
+        scores = score_portfolios(result.stakes, p)
+        assert np.allclose(scores.expected_return, result.expected_return)
+        assert np.allclose(scores.conditional_value_at_risk, result.conditional_value_at_risk)
+        best = {SUMS[i]: float(f) for i, f in enumerate(result.stakes[0]) if f}
+        print(f"{objective:<15} {elapsed * 1e3:7.1f} ms  best {best}  EV {result.expected_return[0]:+.4f}  "
+              f"log growth {result.log_growth[0]:+.5f}  CVaR {result.conditional_value_at_risk[0]:.4f}")
+
+    # Brute-force check of the log-growth optimum on a small grid
+    small = candidate_stakes((0.02, 0.05), 2)
+    growth = np.log1p(payoff_matrix(small)) @ p
+    result = optimize_portfolios(p, "log_growth", 1, (0.02, 0.05), 2)
+    assert np.isclose(result.log_growth[0], growth.max())
+
+    # Half the bankroll on one sum loses in log terms everywhere, so not betting wins
+    result = optimize_portfolios(p, "log_growth", 3, (0.5,), 1, 1.0)
+    assert not result.stakes[0].any() and result.log_growth[0] == 0 and result.log_growth[1] < 0
+
+    optimizer = PortfolioOptimizer(RegimeCache())
+    probabilities = dict(zip(SUMS, p))
+    start = time.perf_counter()
+    optimizer.optimize(probabilities)
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    optimizer.optimize(probabilities)
+    print(f"Cached search: {cold * 1e3:.1f} ms cold, {(time.perf_counter() - start) * 1e6:.1f} us warm")
@@ -0,0 +1,314 @@
+"""
+Exact risk metrics for bet portfolios.
+
+A roll produces exactly one of the 11 sums, so a portfolio's profit/loss is a
+discrete distribution over those 11 outcomes: a position on the rolled sum
+wins amount * payout and every other position loses its amount. Portfolios
+are stake vectors over the sums 2-12, one row per portfolio, so any number
+of candidates is scored with a few array operations.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from game_logic import PAYOUTS
+from models import Portfolio, Position, RiskMetrics
+
+SUMS = tuple(range(2, 13))
+PAYOUT_VECTOR = np.array([PAYOUTS[s] for s in SUMS], dtype=np.float64)
+
+# Confidence level of VaR and CVaR unless a caller asks for another one
+DEFAULT_CONFIDENCE = 0.95
+
+# Probability vectors (market regimes) memoized, and entries kept per regime
+RISK_CACHE_REGIMES = int(os.getenv("RISK_CACHE_REGIMES", "32"))
+RISK_CACHE_ENTRIES = int(os.getenv("RISK_CACHE_ENTRIES", "1024"))
+
+# Largest batch RiskEngine.score memoizes; bigger client batches are rarely repeated
+RISK_CACHE_MAX_ROWS = int(os.getenv("RISK_CACHE_MAX_ROWS", "16"))
+
+
+class RiskScores(NamedTuple):
+    """Metrics of a batch of portfolios, one array entry per portfolio."""
+    expected_return: np.ndarray
+    std_dev: np.ndarray
+    win_probability: np.ndarray
+    max_loss: np.ndarray
+    max_gain: np.ndarray
+    value_at_risk: np.ndarray
+    conditional_value_at_risk: np.ndarray
+
+
+def read_only(arrays: NamedTuple) -> NamedTuple:
+    """Mark every array of a result tuple read-only, so a memoized result can be shared."""
+    for values in arrays:
+        values.flags.writeable = False
+    return arrays
+
+
+def probability_vector(probabilities: Dict[int, float]) -> np.ndarray:
+    """Probabilities of the sums 2-12 as an array, in SUMS order."""
+    return np.array([probabilities[s] for s in SUMS], dtype=np.float64)
+
+
+def stake_vector(positions: Sequence[Position]) -> np.ndarray:
+    """Stake on each of the sums 2-12 (positions on the same sum add up)."""
+    stakes = np.zeros(len(SUMS))
+    for position in positions:
+        stakes[position.bet_sum - 2] += position.amount
+    return stakes
+
+
+def stake_matrix(portfolios: Sequence[Sequence[Position]]) -> np.ndarray:
+    """(n, 11) stakes of several portfolios, each given as its positions."""
+    stakes = np.zeros((len(portfolios), len(SUMS)))
+    for row, positions in zip(stakes, portfolios):
+        for position in positions:
+            row[position.bet_sum - 2] += position.amount
+    return stakes
+
+
+def payoff_matrix(stakes: np.ndarray) -> np.ndarray:
+    """
+    Profit/loss of every portfolio for every outcome.
+
+    Args:
+        stakes: (n, 11) stakes, or a single (11,) stake vector
+
+    Returns:
+        (n, 11) array; entry [i, j] is portfolio i's profit/loss if sum j + 2 is rolled
+    """
+    stakes = np.atleast_2d(np.asarray(stakes, dtype=np.float64))
+    return stakes * (PAYOUT_VECTOR + 1) - stakes.sum(axis=1, keepdims=True)
+
+
+def tail_risk(pnl: np.ndarray, probabilities: np.ndarray,
+              confidence: float = DEFAULT_CONFIDENCE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Value at risk and conditional value at risk of discrete P&L distributions.
+
+    VaR is the loss exceeded with probability at most 1 - confidence; CVaR is
+    the expected loss over that worst 1 - confidence of probability mass,
+    splitting the outcome at the VaR boundary where needed. Both are reported
+    as losses (positive means money lost).
+
+    Args:
+        pnl: (n, 11) profit/loss per outcome
+        probabilities: (11,) or (n, 11) outcome probabilities
+        confidence: Confidence level, e.g. 0.95
+
+    Returns:
+        (VaR, CVaR) arrays of length n
+    """
+    tail = 1 - confidence
+    order = np.argsort(pnl, axis=1)
+    sorted_pnl = np.take_along_axis(pnl, order, axis=1)
+    sorted_p = np.take_along_axis(np.broadcast_to(probabilities, pnl.shape), order, axis=1)
+    cumulative = np.cumsum(sorted_p, axis=1)
+
+    # First outcome (from the worst) at which the tail mass is reached
+    boundary = np.argmax(cumulative >= tail - 1e-12, axis=1)
+    rows = np.arange(len(pnl))
+    var_pnl = sorted_pnl[rows, boundary]
+    mass_before = cumulative[rows, boundary] - sorted_p[rows, boundary]
+
+    before = np.arange(pnl.shape[1]) < boundary[:, None]
+    tail_pnl = (sorted_pnl * sorted_p * before).sum(axis=1) + var_pnl * (tail - mass_before)
+    return -var_pnl, -tail_pnl / tail
+
+
+def score_portfolios(stakes: np.ndarray, probabilities: np.ndarray,
+                     confidence: float = DEFAULT_CONFIDENCE) -> RiskScores:
+    """
+    Exact risk metrics of many portfolios in one vectorized pass.
+
+    Args:
+        stakes: (n, 11) stakes on the sums 2-12
+        probabilities: (11,) outcome probabilities, or (n, 11) for one vector per portfolio
+        confidence: Confidence level of VaR and CVaR
+
+    Returns:
+        RiskScores with arrays of length n
+    """
+    pnl = payoff_matrix(stakes)
+    p = np.asarray(probabilities, dtype=np.float64)
+    expected = (pnl * p).sum(axis=1)
+    variance = (((pnl - expected[:, None]) ** 2) * p).sum(axis=1)
+    var, cvar = tail_risk(pnl, p, confidence)
+    return RiskScores(
+        expected_return=expected,
+        std_dev=np.sqrt(variance),
+        win_probability=((pnl > 0) * p).sum(axis=1),
+        max_loss=pnl.min(axis=1),
+        max_gain=pnl.max(axis=1),
+        value_at_risk=var,
+        conditional_value_at_risk=cvar
+    )
+
+
+class RegimeCache:
+    """
+    Memo tables keyed by probability vector.
+
+    Probabilities only change when the market trend does, and the same few
+    vectors recur, so anything derived from a vector is worth keeping until
+    the vector falls out of the least-recently-used set of regimes.
+    """
+
+    def __init__(self, max_regimes: int = RISK_CACHE_REGIMES, max_entries: int = RISK_CACHE_ENTRIES):
+        """
+        Args:
+            max_regimes: Probability vectors kept
+            max_entries: Entries kept per probability vector
+        """
+        self.max_regimes = max_regimes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._regimes: "OrderedDict[bytes, OrderedDict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, probabilities: np.ndarray, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Return the memoized value for (probabilities, key), computing it on a miss.
+
+        Args:
+            probabilities: (11,) probability vector
+            key: What is being memoized under this vector
+            compute: Zero-argument function producing the value
+        """
+        regime_key = np.ascontiguousarray(probabilities, dtype=np.float64).tobytes()
+        with self._lock:
+            entries = self._regimes.get(regime_key)
+            if entries is not None:
+                self._regimes.move_to_end(regime_key)
+                if key in entries:
+                    entries.move_to_end(key)
+                    self.hits += 1
+                    return entries[key]
+            self.misses += 1
+
+        # Computed outside the lock; a concurrent miss just computes it twice
+        value = compute()
+        with self._lock:
+            entries = self._regimes.get(regime_key)
+            if entries is None:
+                entries = self._regimes[regime_key] = OrderedDict()
+                if len(self._regimes) > self.max_regimes:
+                    self._regimes.popitem(last=False)
+            entries[key] = value
+            if len(entries) > self.max_entries:
+                entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._regimes.clear()
+
+
+class RiskEngine:
+    """Exact portfolio risk metrics, memoized per probability vector."""
+
+    def __init__(self, cache: Optional[RegimeCache] = None):
+        """
+        Args:
+            cache: Memo tables to use (shared with the optimizers)
+        """
+        self.cache = cache or RegimeCache()
+
+    def score(self, stakes: np.ndarray, probabilities: Dict[int, float],
+              confidence: float = DEFAULT_CONFIDENCE) -> RiskScores:
+        """
+        Metrics of a batch of portfolios (see score_portfolios).
+
+        Batches of up to RISK_CACHE_MAX_ROWS portfolios are memoized and
+        their arrays are read-only; larger ones are scored afresh.
+
+        Args:
+            stakes: (n, 11) stakes on the sums 2-12
+            probabilities: Current probabilities for each sum
+            confidence: Confidence level of VaR and CVaR
+        """
+        p = probability_vector(probabilities)
+        stakes = np.atleast_2d(np.asarray(stakes, dtype=np.float64))
+        if len(stakes) > RISK_CACHE_MAX_ROWS:
+            return score_portfolios(stakes, p, confidence)
+        key = ("score", stakes.shape, stakes.tobytes(), confidence)
+        return self.cache.get(p, key, lambda: read_only(score_portfolios(stakes, p, confidence)))
+
+    def metrics(self, portfolio: Portfolio, probabilities: Dict[int, float],
+                confidence: float = DEFAULT_CONFIDENCE) -> RiskMetrics:
+        """
+        Risk metrics of a single portfolio.
+
+        Args:
+            portfolio: Betting portfolio
+            probabilities: Current probabilities for each sum
+            confidence: Confidence level of VaR and CVaR
+        """
+        if not portfolio.positions:
+            return RiskMetrics(expected_return=0, max_loss=0, max_gain=0, win_probability=0)
+
+        stakes = stake_vector(portfolio.positions)
+        scores = self.score(stakes, probabilities, confidence)
+        pnl = payoff_matrix(stakes)[0]
+        return RiskMetrics(
+            expected_return=float(scores.expected_return[0]),
+            max_loss=float(scores.max_loss[0]),
+            max_gain=float(scores.max_gain[0]),
+            win_probability=float(scores.win_probability[0]),
+            std_dev=float(scores.std_dev[0]),
+            value_at_risk=float(scores.value_at_risk[0]),
+            conditional_value_at_risk=float(scores.conditional_value_at_risk[0]),
+            confidence=confidence,
+            pnl_by_sum={s: float(v) for s, v in zip(SUMS, pnl)}
+        )
+
+
+# Shared by all sessions; the memo tables are thread-safe
+risk_engine = RiskEngine()
+
+
+if __name__ == "__main__":
+    import random
+
+    from game_logic import adjust_probabilities
+    from models import TrendType
+
+    # Compare against enumerating the 11 outcomes one portfolio at a time
+    rng = random.Random(3)
+    probabilities = adjust_probabilities(TrendType.BULL, 0.5)
+    p = probability_vector(probabilities)
+    stakes = np.zeros((2000, len(SUMS)))
+    for row in stakes:
+        for s in rng.sample(range(len(SUMS)), rng.randint(1, 5)):
+            row[s] = rng.choice([1, 2.5, 10, 40])
+    scores = score_portfolios(stakes, p, 0.9)
+
+    for i, row in enumerate(stakes):
+        outcomes = sorted((row[j] * (PAYOUT_VECTOR[j] + 1) - row.sum(), p[j]) for j in range(len(SUMS)))
+        expected = sum(v * q for v, q in outcomes)
+        assert np.isclose(scores.expected_return[i], expected)
+        assert np.isclose(scores.win_probability[i], sum(q for v, q in outcomes if v > 0))
+        # Tail of 10% probability mass, the boundary outcome only partly
+        remaining, tail = 0.1, 0.0
+        for v, q in outcomes:
+            take = min(q, remaining)
+            tail += v * take
+            remaining -= take
+            if remaining <= 1e-12:
+                break
+        assert np.isclose(scores.conditional_value_at_risk[i], -tail / 0.1)
+        assert scores.value_at_risk[i] <= scores.conditional_value_at_risk[i] + 1e-9
+    print(f"Exact metrics match outcome enumeration on {len(stakes)} portfolios")
+
+    portfolio = Portfolio(positions=[Position(bet_sum=s, amount=5) for s in (6, 7, 8)])
+    first = risk_engine.metrics(portfolio, probabilities)
+    assert risk_engine.metrics(portfolio, probabilities) == first and risk_engine.cache.hits == 1
+    assert not risk_engine.score(stake_vector(portfolio.positions), probabilities).expected_return.flags.writeable
+    risk_engine.score(stakes, probabilities)
+    assert risk_engine.cache.misses == 1, "large batches are not memoized"
+    print(first)
@@ -0,0 +1,396 @@
+"""
+Offline pretraining of the advisor's Q-table from simulated rounds.
+
+Run from the backend directory:
+
+    python -m rl_system.offline_trainer --episodes 200000 --workers 4
+
+Every worker plays a batch of episodes in lockstep against the same
+regime-biased dice as /bet (see dice_sampler and game_logic.update_market),
+sizing stakes with one of the seven strategies per episode and choosing the
+sum epsilon-greedily from a frozen snapshot of the Q-table. Workers return
+the Q-learning targets aggregated per (state, action); the parent applies
+them as one batched update per generation and periodically writes the table
+to the same .npz checkpoint the advisor loads on startup.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Make the backend modules importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import game_logic
+from dice_sampler import SUMS, get_sampler
+from simulation import PAYOUT_TABLE, TREND_CODES, TREND_NAMES
+from rl_system.q_store import QTableStore, write_table
+from strategies.vectorized import STRATEGY_NAMES, strategy_stakes
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+DEFAULT_OUTPUT = os.path.join(DATA_DIR, 'q_values.npz')
+
+# State encoding matching AIStrategyAdvisor.get_state:
+# f"{bankroll_state}_{trend}_{streak_state}_{int(win_rate * 10)}"
+BANKROLL_STATES = ("low", "medium", "high")
+STREAK_STATES = ("none_0", "win_1", "win_2", "win_3", "loss_1", "loss_2", "loss_3")
+N_STATES = len(BANKROLL_STATES) * len(TREND_CODES) * len(STREAK_STATES) * 11
+N_ACTIONS = len(SUMS)
+WINDOW = 10
+
+STREAK_NONE, STREAK_WIN, STREAK_LOSS = 0, 1, 2
+
+
+def state_names():
+    """Advisor state string for every encoded state id, in id order."""
+    return [f"{bankroll}_{TREND_NAMES[code].value}_{streak}_{decile}"
+            for bankroll in BANKROLL_STATES
+            for code in range(len(TREND_CODES))
+            for streak in STREAK_STATES
+            for decile in range(11)]
+
+
+def encode_states(money, trend, streak_type, streak_len, window_wins, window_len):
+    """
+    Vectorized equivalent of AIStrategyAdvisor.get_state, returning integer ids.
+
+    Parameters:
+        money (array): Bankroll per environment
+        trend (array): Trend code per environment (see TREND_CODES)
+        streak_type (array): STREAK_NONE, STREAK_WIN or STREAK_LOSS
+        streak_len (array): Length of the current streak
+        window_wins (array): Wins among the last WINDOW results
+        window_len (array): Number of results in the window (0-WINDOW)
+
+    Returns:
+        array: State ids indexing state_names()
+    """
+    bankroll = (money >= 50).astype(np.int64) + (money >= 150)
+    streak = np.where(streak_type == STREAK_NONE, 0,
+                      np.minimum(streak_len, 3) + 3 * (streak_type == STREAK_LOSS))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Same float expression as int(win_rate * 10) in get_state
+        decile = np.where(window_len > 0, np.floor(window_wins / np.maximum(window_len, 1) * 10), 0)
+    return ((bankroll * 2 + trend) * 7 + streak) * 11 + decile.astype(np.int64)
+
+
+class _EnvironmentBatch:
+    """A set of simulated tables played in lockstep, one episode each."""
+
+    def __init__(self, n, rng, initial_bankroll):
+        self.rng = rng
+        self.initial_bankroll = initial_bankroll
+        self.money = np.empty(n)
+        self.trend = np.empty(n, dtype=np.int64)
+        self.round_count = np.empty(n, dtype=np.int64)
+        self.strategy = np.empty(n, dtype=np.int64)
+        self.streak_type = np.empty(n, dtype=np.int64)
+        self.streak_len = np.empty(n, dtype=np.int64)
+        self.window = np.empty((n, WINDOW), dtype=np.int64)
+        self.window_pos = np.empty(n, dtype=np.int64)
+        self.window_len = np.empty(n, dtype=np.int64)
+        self.window_wins = np.empty(n, dtype=np.int64)
+        self.reset(np.arange(n))
+
+    def reset(self, idx):
+        """Start new episodes in the given slots."""
+        n = len(idx)
+        self.money[idx] = self.initial_bankroll
+        # Same 50/50 regime draw as /init, and a random strategy per episode
+        self.trend[idx] = (self.rng.random(n) <= 0.5).astype(np.int64)
+        self.round_count[idx] = 0
+        self.strategy[idx] = self.rng.integers(len(STRATEGY_NAMES), size=n)
+        self.streak_type[idx] = STREAK_NONE
+        self.streak_len[idx] = 0
+        self.window[idx] = 0
+        self.window_pos[idx] = 0
+        self.window_len[idx] = 0
+        self.window_wins[idx] = 0
+
+    def keep(self, mask):
+        """Drop the slots where mask is False."""
+        for name, value in vars(self).items():
+            if isinstance(value, np.ndarray):
+                setattr(self, name, value[mask])
+
+    def __len__(self):
+        return len(self.money)
+
+    def states(self):
+        return encode_states(self.money, self.trend, self.streak_type, self.streak_len,
+                             self.window_wins, self.window_len)
+
+    def record(self, win):
+        """Append one result per slot to the streak and the win-rate window."""
+        outcome = np.where(win, STREAK_WIN, STREAK_LOSS)
+        self.streak_len = np.where(outcome == self.streak_type, self.streak_len + 1, 1)
+        self.streak_type = outcome
+
+        rows = np.arange(len(self))
+        full = self.window_len == WINDOW
+        self.window_wins -= np.where(full, self.window[rows, self.window_pos], 0)
+        self.window[rows, self.window_pos] = win
+        self.window_wins += win
+        self.window_pos = (self.window_pos + 1) % WINDOW
+        self.window_len = np.minimum(self.window_len + 1, WINDOW)
+
+    def update_market(self):
+        """Advance the regime exactly like game_logic.update_market."""
+        self.round_count += 1
+        duration = self.rng.integers(3, 8, size=len(self))
+        flip = (self.round_count % duration == 0) & (self.rng.random(len(self)) < 0.7)
+        self.trend ^= flip
+
+
+def _stakes(env, bet_sums, probabilities):
+    """Stake per slot from its strategy, with the same guards as game.py."""
+    streak = np.where(env.streak_type == STREAK_WIN, env.streak_len,
+                      np.where(env.streak_type == STREAK_LOSS, -env.streak_len, 0))
+    stakes = strategy_stakes(env.strategy, env.money, streak,
+                             probabilities[env.trend, bet_sums], PAYOUT_TABLE[bet_sums])
+    stakes = np.where(stakes <= 0, np.maximum(1, env.money * 0.05), stakes)
+    return np.minimum(stakes, env.money * 0.25)
+
+
+def _run_worker(task):
+    """
+    Play a batch of episodes against a frozen Q-table.
+
+    Parameters:
+        task (dict): Q-table snapshot, episode count and simulation settings
+
+    Returns:
+        tuple: (visit counts, summed targets, stats) where the first two are
+            N_STATES x N_ACTIONS arrays
+    """
+    rng = np.random.default_rng(task["seed"])
+    q = task["q"]
+    gamma = task["gamma"]
+    epsilon = task["epsilon"]
+    max_rounds = task["max_rounds"]
+    ruin_threshold = task["ruin_threshold"]
+
+    sampler = get_sampler()
+    trends = [TREND_NAMES[0], TREND_NAMES[1]]
+    probabilities = np.zeros((len(trends), 13))
+    for code, trend in enumerate(trends):
+        for dice_sum, p in game_logic.adjust_probabilities(trend, task["volatility"]).items():
+            probabilities[code, dice_sum] = p
+
+    counts = np.zeros(N_STATES * N_ACTIONS, dtype=np.int64)
+    target_sums = np.zeros(N_STATES * N_ACTIONS)
+    transitions = 0
+    total_reward = 0.0
+    ruined = 0
+
+    pending = task["episodes"]
+    env = _EnvironmentBatch(min(task["n_envs"], pending), rng, task["initial_bankroll"])
+    pending -= len(env)
+
+    while len(env):
+        states = env.states()
+
+        # Epsilon-greedy with ties broken uniformly at random, as in the agents
+        rows = q[states]
+        is_best = rows == rows.max(axis=1, keepdims=True)
+        greedy = np.argmax(is_best * rng.random(rows.shape), axis=1)
+        explore = rng.random(len(env)) < epsilon
+        actions = np.where(explore, rng.integers(N_ACTIONS, size=len(env)), greedy)
+        bet_sums = actions + SUMS[0]
+
+        stakes = _stakes(env, bet_sums, probabilities)
+        dice_sums = sampler.sample_regimes(env.trend, trends, task["volatility"], rng)
+        win = dice_sums == bet_sums
+        rewards = np.where(win, stakes * PAYOUT_TABLE[bet_sums], -stakes)
+
+        env.money += rewards
+        env.record(win)
+        # game.py computes the next state before the market moves
+        next_states = env.states()
+        env.update_market()
+
+        terminal = env.money < ruin_threshold
+        targets = rewards + gamma * np.where(terminal, 0.0, q[next_states].max(axis=1))
+
+        flat = states * N_ACTIONS + actions
+        counts += np.bincount(flat, minlength=counts.size)
+        target_sums += np.bincount(flat, weights=targets, minlength=counts.size)
+        transitions += len(env)
+        total_reward += float(rewards.sum())
+        ruined += int(terminal.sum())
+
+        done = terminal | (env.round_count >= max_rounds)
+        if done.any():
+            finished = np.flatnonzero(done)
+            restart = finished[:pending]
+            pending -= len(restart)
+            env.reset(restart)
+            if len(restart) < len(finished):
+                mask = np.ones(len(env), dtype=bool)
+                mask[finished[len(restart):]] = False
+                env.keep(mask)
+
+    stats = {"transitions": transitions, "total_reward": total_reward, "ruined": ruined}
+    return counts.reshape(N_STATES, N_ACTIONS), target_sums.reshape(N_STATES, N_ACTIONS), stats
+
+
+def apply_batch(q, counts, target_sums, alpha):
+    """
+    Apply many Q-learning updates at once.
+
+    k sequential updates Q <- Q + alpha * (t_i - Q) towards targets with mean
+    m leave Q at m + (1 - alpha)^k * (Q - m) when the targets are taken as
+    their mean, so each visited (state, action) is updated in closed form.
+
+    Parameters:
+        q (array): N_STATES x N_ACTIONS table, updated in place
+        counts (array): Number of targets per (state, action)
+        target_sums (array): Sum of the targets per (state, action)
+        alpha (float): Learning rate
+    """
+    visited = counts > 0
+    mean_target = target_sums[visited] / counts[visited]
+    q[visited] = mean_target + (1 - alpha) ** counts[visited] * (q[visited] - mean_target)
+
+
+def load_initial_table(path):
+    """Return the saved table mapped onto the encoded states, or zeros."""
+    q = np.zeros((N_STATES, N_ACTIONS))
+    if not os.path.exists(path):
+        return q
+    states, actions, values = QTableStore(path).load()
+    state_index = {name: i for i, name in enumerate(state_names())}
+    for i, state in enumerate(states):
+        sid = state_index.get(state)
+        if sid is None:
+            continue
+        for j, action in enumerate(actions):
+            if action in SUMS:
+                q[sid, SUMS.index(action)] = values[i, j]
+    return q
+
+
+def train(episodes=100000, workers=None, episodes_per_generation=20000, envs_per_worker=2048,
+          max_rounds=200, checkpoint_every=5, output=DEFAULT_OUTPUT, resume=False,
+          alpha=0.1, gamma=0.95, epsilon_start=1.0, epsilon_end=0.05, volatility=0.2,
+          initial_bankroll=100.0, ruin_threshold=1.0, seed=None, verbose=True):
+    """
+    Pretrain the advisor's Q-table on simulated episodes.
+
+    Parameters:
+        episodes (int): Total number of episodes to play
+        workers (int): Worker processes (defaults to the CPU count; 1 runs inline)
+        episodes_per_generation (int): Episodes played against each frozen table
+        envs_per_worker (int): Episodes each worker simulates in lockstep
+        max_rounds (int): Rounds after which an episode is cut off
+        checkpoint_every (int): Generations between checkpoints (0 only writes at the end)
+        output (str): Checkpoint path; the advisor reads data/q_values.npz
+        resume (bool): Start from the existing checkpoint instead of zeros
+        alpha (float): Learning rate
+        gamma (float): Discount factor
+        epsilon_start (float): Exploration rate for the first generation
+        epsilon_end (float): Exploration rate for the last generation
+        volatility (float): Market volatility (the /init endpoint uses 0.2)
+        initial_bankroll (float): Bankroll at the start of every episode
+        ruin_threshold (float): Bankroll below which an episode ends as ruined
+        seed (int): Seed for reproducible runs
+        verbose (bool): Print progress
+
+    Returns:
+        dict: Training statistics
+    """
+    workers = workers or os.cpu_count() or 1
+    generations = max(1, -(-episodes // episodes_per_generation))
+    q = load_initial_table(output) if resume else np.zeros((N_STATES, N_ACTIONS))
+    names = state_names()
+    seeds = np.random.SeedSequence(seed)
+
+    stats = {"episodes": 0, "transitions": 0, "total_reward": 0.0, "ruined": 0, "checkpoints": 0}
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    start = time.perf_counter()
+    try:
+        remaining = episodes
+        for generation in range(generations):
+            batch = min(episodes_per_generation, remaining)
+            remaining -= batch
+            progress = generation / (generations - 1) if generations > 1 else 1.0
+            epsilon = epsilon_start + (epsilon_end - epsilon_start) * progress
+
+            shares = [batch // workers + (1 if w < batch % workers else 0) for w in range(workers)]
+            tasks = [{
+                "q": q, "episodes": share, "n_envs": envs_per_worker, "max_rounds": max_rounds,
+                "epsilon": epsilon, "gamma": gamma, "volatility": volatility,
+                "initial_bankroll": initial_bankroll, "ruin_threshold": ruin_threshold,
+                "seed": child
+            } for share, child in zip(shares, seeds.spawn(workers)) if share]
+
+            results = executor.map(_run_worker, tasks) if executor else map(_run_worker, tasks)
+            counts = np.zeros((N_STATES, N_ACTIONS), dtype=np.int64)
+            target_sums = np.zeros((N_STATES, N_ACTIONS))
+            for worker_counts, worker_targets, worker_stats in results:
+                counts += worker_counts
+                target_sums += worker_targets
+                for key, value in worker_stats.items():
+                    stats[key] += value
+            apply_batch(q, counts, target_sums, alpha)
+            stats["episodes"] += batch
+
+            last = generation == generations - 1
+            if last or (checkpoint_every and (generation + 1) % checkpoint_every == 0):
+                write_table(output, names, list(SUMS), q)
+                stats["checkpoints"] += 1
+
+            if verbose:
+                elapsed = time.perf_counter() - start
+                print(f"Generation {generation + 1}/{generations}: {stats['episodes']:,} episodes, "
+                      f"{stats['transitions']:,} transitions ({stats['transitions'] / elapsed:,.0f}/sec), "
+                      f"epsilon {epsilon:.3f}")
+    finally:
+        if executor:
+            executor.shutdown()
+
+    stats["elapsed"] = time.perf_counter() - start
+    stats["mean_reward"] = stats["total_reward"] / stats["transitions"] if stats["transitions"] else 0.0
+    stats["output"] = output
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pretrain the AI advisor's Q-table on simulated rounds")
+    parser.add_argument("--episodes", type=int, default=100000, help="Total episodes to simulate")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--episodes-per-generation", type=int, default=20000,
+                        help="Episodes played between batched Q-table updates")
+    parser.add_argument("--envs-per-worker", type=int, default=2048,
+                        help="Episodes each worker simulates in lockstep")
+    parser.add_argument("--max-rounds", type=int, default=200, help="Maximum rounds per episode")
+    parser.add_argument("--checkpoint-every", type=int, default=5,
+                        help="Generations between checkpoints (0: only at the end)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Checkpoint path")
+    parser.add_argument("--resume", action="store_true", help="Continue from the existing checkpoint")
+    parser.add_argument("--alpha", type=float, default=0.1, help="Learning rate")
+    parser.add_argument("--gamma", type=float, default=0.95, help="Discount factor")
+    parser.add_argument("--epsilon-start", type=float, default=1.0, help="Initial exploration rate")
+    parser.add_argument("--epsilon-end", type=float, default=0.05, help="Final exploration rate")
+    parser.add_argument("--volatility", type=float, default=0.2, help="Market volatility")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+    args = parser.parse_args(argv)
+
+    stats = train(episodes=args.episodes, workers=args.workers,
+                  episodes_per_generation=args.episodes_per_generation,
+                  envs_per_worker=args.envs_per_worker, max_rounds=args.max_rounds,
+                  checkpoint_every=args.checkpoint_every, output=args.output, resume=args.resume,
+                  alpha=args.alpha, gamma=args.gamma, epsilon_start=args.epsilon_start,
+                  epsilon_end=args.epsilon_end, volatility=args.volatility, seed=args.seed)
+
+    print(f"Trained on {stats['transitions']:,} transitions from {stats['episodes']:,} episodes "
+          f"in {stats['elapsed']:.1f}s; mean reward {stats['mean_reward']:.3f}, "
+          f"{stats['ruined']:,} episodes ruined")
+    print(f"Q-table written to {stats['output']}")
+
+
+if __name__ == "__main__":
+    main()
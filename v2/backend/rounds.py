@@ -0,0 +1,180 @@
+import os
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+import game_logic
+from models import BatchBetResponse, BetResult, DiceRoll, TrendChange, TrendType
+from sessions import GameSession
+
+# Most rounds a single /bet/batch request may play, overridable from the environment
+BATCH_MAX_ROUNDS = int(os.getenv("BATCH_MAX_ROUNDS", "100000"))
+
+# Most recent results kept in GameState.bet_history; the full record is in session.history
+BET_HISTORY_ROUNDS = int(os.getenv("BET_HISTORY_ROUNDS", "100"))
+
+
+class RoundOutcome(NamedTuple):
+    """Everything a single settled round produced."""
+    dice_roll: DiceRoll
+    profit_loss: float
+    winning_positions: List[Tuple[int, float]]
+    result: BetResult
+    trend_changed: bool
+    new_trend: TrendType
+    market_news: Optional[str]
+
+
+def validate_bet(session: GameSession, bet_sum: int, amount: float) -> None:
+    """Raise ValueError with the /bet error message if the bet cannot be placed."""
+    if amount > session.game_state.money:
+        raise ValueError("Not enough money to place bet")
+    if bet_sum < 2 or bet_sum > 12:
+        raise ValueError("Invalid bet sum. Must be between 2 and 12")
+
+
+def play_round(session: GameSession, bet_sum: int, amount: float, publish: bool = True) -> RoundOutcome:
+    """
+    Play one single-position round against a session.
+
+    The caller must hold session.lock and have validated the bet. Settles the
+    bet like game_logic.calculate_portfolio_return on a one-position
+    portfolio, moves the market with game_logic.update_market and records the
+    round in the (bounded) bet history, strategies, analytics and event stream.
+
+    Args:
+        session: Session to play in
+        bet_sum: Sum bet on
+        amount: Stake
+        publish: Push round/trend events to the session's stream
+
+    Returns:
+        The outcome of the round
+    """
+    game_state = session.game_state
+
+    # Single bets replace whatever was in the portfolio
+    if game_state.portfolio.positions:
+        game_state.portfolio.positions = []
+
+    # Roll the dice using the current market-adjusted probabilities
+    dice_roll = game_logic.roll_dice(game_state.probabilities)
+
+    # Same settlement as calculate_portfolio_return for one position
+    if dice_roll.dice_sum == bet_sum:
+        profit_loss = amount * game_logic.PAYOUTS[bet_sum]
+        winning_positions = [(bet_sum, profit_loss)]
+    else:
+        profit_loss = -amount
+        winning_positions = []
+
+    game_state.money += profit_loss
+    result = BetResult.WIN if profit_loss > 0 else BetResult.LOSS
+    game_state.bet_history.append(result)
+    if len(game_state.bet_history) > BET_HISTORY_ROUNDS:
+        del game_state.bet_history[:-BET_HISTORY_ROUNDS]
+    session.strategies.record(result)
+
+    # Update market based on dice roll
+    new_trend, trend_changed, market_news = game_logic.update_market(dice_roll.dice_sum, game_state)
+    if trend_changed:
+        game_state.trend = new_trend
+        # Update probabilities when trend changes
+        game_state.probabilities = game_logic.adjust_probabilities(game_state.trend, game_state.volatility)
+
+    # Update analytics
+    win = result == BetResult.WIN
+    session.history.append(game_state.money, win, amount, bet_sum, dice_roll.dice_sum, game_state.trend)
+    session.analytics_tracker.update(game_state.money, win, amount)
+
+    if publish:
+        session.events.publish("round", {
+            "round": session.history.total_rounds - 1,
+            "dice": [dice_roll.dice1, dice_roll.dice2],
+            "sum": dice_roll.dice_sum,
+            "bet_sum": bet_sum,
+            "amount": amount,
+            "pl": profit_loss,
+            "win": int(win),
+            "bankroll": game_state.money
+        })
+        if trend_changed:
+            session.events.publish("trend", {"trend": new_trend.value, "news": market_news})
+
+    return RoundOutcome(dice_roll, profit_loss, winning_positions, result,
+                        trend_changed, new_trend, market_news)
+
+
+def play_batch(session: GameSession, bets: Iterable[Tuple[int, float]]) -> BatchBetResponse:
+    """
+    Play a sequence of bets against a session in one go.
+
+    Every round goes through play_round, so the market, strategies and
+    analytics see exactly what the same bets sent to /bet would produce. The
+    batch stops early, keeping the rounds already played, at the first bet the
+    session cannot afford. Instead of one stream event per round a single
+    "batch" event summarizes the rounds, followed by a "trend" event if the
+    trend at the end differs from the one at the start.
+
+    Args:
+        session: Session to play in; the caller must hold session.lock
+        bets: (bet_sum, amount) of every round, in order
+
+    Returns:
+        Columnar results of the rounds played
+    """
+    game_state = session.game_state
+    start_round = session.history.total_rounds
+    start_trend = game_state.trend
+    dice_sums: List[int] = []
+    profits: List[float] = []
+    wins: List[int] = []
+    bankrolls: List[float] = []
+    trend_changes: List[TrendChange] = []
+    stopped_reason = None
+    last_news = None
+
+    for bet_sum, amount in bets:
+        try:
+            validate_bet(session, bet_sum, amount)
+        except ValueError as e:
+            stopped_reason = str(e)
+            break
+        outcome = play_round(session, bet_sum, amount, publish=False)
+        dice_sums.append(outcome.dice_roll.dice_sum)
+        profits.append(outcome.profit_loss)
+        wins.append(int(outcome.result == BetResult.WIN))
+        bankrolls.append(game_state.money)
+        if outcome.trend_changed:
+            last_news = outcome.market_news
+            trend_changes.append(TrendChange.model_construct(
+                round=start_round + len(dice_sums) - 1, trend=outcome.new_trend, news=outcome.market_news))
+
+    # Clear portfolio after the last bet, as /bet does
+    game_state.portfolio.positions = []
+
+    rounds_played = len(dice_sums)
+    total_profit_loss = sum(profits)
+    win_count = sum(wins)
+    if rounds_played:
+        session.events.publish("batch", {
+            "start_round": start_round,
+            "rounds": rounds_played,
+            "wins": win_count,
+            "pl": total_profit_loss,
+            "bankroll": game_state.money
+        })
+        if game_state.trend != start_trend:
+            session.events.publish("trend", {"trend": game_state.trend.value, "news": last_news})
+
+    return BatchBetResponse.model_construct(
+        start_round=start_round,
+        rounds_played=rounds_played,
+        dice_sum=dice_sums,
+        profit_loss=profits,
+        win=wins,
+        bankroll=bankrolls,
+        trend_changes=trend_changes,
+        total_profit_loss=total_profit_loss,
+        wins=win_count,
+        new_bankroll=game_state.money,
+        stopped_reason=stopped_reason
+    )
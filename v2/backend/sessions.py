@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+from models import GameState
+from analytics_engine import AnalyticsAccumulator
+from analytics_store import AnalyticsHistory
+from events import EventChannel
+from strategies.stateful import StrategyRegistry
+
+# Limits for the in-memory session store, overridable from the environment
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "10000"))
+SESSION_IDLE_TIMEOUT = float(os.getenv("SESSION_IDLE_TIMEOUT", "3600"))
+
+
+class GameSession:
+    """Everything the backend keeps for one table."""
+
+    def __init__(self, session_id: str, game_state: GameState, initial_bankroll: float):
+        """
+        Args:
+            session_id: Identifier clients send in the X-Session-ID header
+            game_state: Freshly initialized game state
+            initial_bankroll: Bankroll at the start of the session
+        """
+        self.session_id = session_id
+        # Distinguishes this game from an earlier one re-initialized under the same id
+        self.instance_id = uuid.uuid4().hex[:12]
+        self.game_state = game_state
+        self.history = AnalyticsHistory(initial_bankroll)
+        self.analytics_tracker = AnalyticsAccumulator(initial_bankroll)
+        self.strategies = StrategyRegistry(game_state.bet_history)
+        self.events = EventChannel()
+        # Background autoplay job (autoplay.AutoplayJob), if one was started
+        self.autoplay = None
+
+        # Endpoints run in a threadpool, so requests for one session are serialized here
+        self.lock = threading.RLock()
+        self.last_access = time.monotonic()
+
+    def touch(self) -> None:
+        """Mark the session as recently used."""
+        self.last_access = time.monotonic()
+
+    def close(self) -> None:
+        """Release resources tied to the session (autoplay job, open event streams)."""
+        if self.autoplay is not None:
+            self.autoplay.cancel()
+        self.events.close()
+
+
+class SessionStore:
+    """
+    In-memory store of game sessions keyed by session id.
+
+    Sessions are kept in least-recently-used order. Sessions idle for longer
+    than idle_timeout are dropped, and the least recently used ones are
+    evicted once more than max_sessions are live, which bounds memory.
+    """
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS, idle_timeout: float = SESSION_IDLE_TIMEOUT):
+        """
+        Args:
+            max_sessions: Maximum number of live sessions
+            idle_timeout: Seconds of inactivity before a session is dropped
+        """
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.evictions = 0
+        self._sessions: "OrderedDict[str, GameSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def new_session_id() -> str:
+        """Generate an unguessable session id."""
+        return uuid.uuid4().hex
+
+    def get(self, session_id: Optional[str]) -> Optional[GameSession]:
+        """Return the session with this id (and mark it used), or None."""
+        if not session_id:
+            return None
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if time.monotonic() - session.last_access > self.idle_timeout:
+                del self._sessions[session_id]
+                self.evictions += 1
+                session.close()
+                return None
+            session.touch()
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def touch(self, session_id: str) -> None:
+        """Mark a session used without looking it up, e.g. from a background job."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.touch()
+                self._sessions.move_to_end(session_id)
+
+    def put(self, session: GameSession) -> None:
+        """Add or replace a session, evicting idle and excess sessions."""
+        with self._lock:
+            session.touch()
+            previous = self._sessions.get(session.session_id)
+            if previous is not None and previous is not session:
+                previous.close()
+            self._sessions[session.session_id] = session
+            self._sessions.move_to_end(session.session_id)
+            self._evict()
+
+    def remove(self, session_id: str) -> bool:
+        """Delete a session. Returns True if it existed."""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        session.close()
+        return True
+
+    def _evict(self) -> None:
+        """Drop idle sessions, then the least recently used beyond the cap."""
+        now = time.monotonic()
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest.last_access <= self.idle_timeout and len(self._sessions) <= self.max_sessions:
+                break
+            _, session = self._sessions.popitem(last=False)
+            session.close()
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._sessions)
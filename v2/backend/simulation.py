@@ -0,0 +1,257 @@
+import numpy as np
+from typing import Dict, Optional, Union
+
+from models import TrendType
+from game_logic import PAYOUTS
+from dice_sampler import get_sampler
+
+# Payout multiplier indexed directly by dice sum (indices 0 and 1 are unused)
+PAYOUT_TABLE = np.zeros(13)
+for _dice_sum, _payout in PAYOUTS.items():
+    PAYOUT_TABLE[_dice_sum] = _payout
+
+# Integer codes used for trends in the simulation arrays
+TREND_CODES = {TrendType.BULL: 0, TrendType.BEAR: 1}
+TREND_NAMES = {code: trend for trend, code in TREND_CODES.items()}
+
+ArrayLike = Union[int, float, np.ndarray]
+
+
+def _make_rng(seed: Optional[Union[int, np.random.Generator]]) -> np.random.Generator:
+    """Return a NumPy generator from a seed or an existing generator."""
+    if isinstance(seed, np.random.Generator):
+        return seed
+    return np.random.default_rng(seed)
+
+
+def simulate_trends(n_sessions: int, n_rounds: int,
+                    initial_trends: Optional[np.ndarray] = None,
+                    seed: Optional[Union[int, np.random.Generator]] = None) -> np.ndarray:
+    """
+    Simulate market regimes for many sessions at once.
+
+    Mirrors game_logic.update_market: in every round a trend duration is
+    drawn from 3-7 and, when the round count is a multiple of it, the trend
+    flips with a 70% chance. Because the regime never depends on the dice,
+    the whole path can be built from a cumulative count of flips.
+
+    Args:
+        n_sessions: Number of independent sessions
+        n_rounds: Number of rounds per session
+        initial_trends: Optional trend codes (see TREND_CODES) for each session
+        seed: Seed or generator for reproducible draws
+
+    Returns:
+        uint8 array of shape (n_sessions, n_rounds) with the trend code in
+        effect while each round's dice are rolled
+    """
+    rng = _make_rng(seed)
+
+    if initial_trends is None:
+        # Same 50/50 draw as the /init endpoint
+        initial_trends = (rng.random(n_sessions) <= 0.5).astype(np.uint8)
+    else:
+        initial_trends = np.asarray(initial_trends, dtype=np.uint8)
+
+    round_numbers = np.arange(1, n_rounds + 1, dtype=np.int64)
+    durations = rng.integers(3, 8, size=(n_sessions, n_rounds), dtype=np.int8)
+    flips = (round_numbers % durations == 0) & (rng.random((n_sessions, n_rounds), dtype=np.float32) < 0.7)
+
+    # The trend during round t only reflects flips from rounds before t
+    trends = np.empty((n_sessions, n_rounds), dtype=np.uint8)
+    trends[:, 0] = initial_trends
+    if n_rounds > 1:
+        flip_parity = (np.cumsum(flips[:, :-1], axis=1, dtype=np.int32) & 1).astype(np.uint8)
+        trends[:, 1:] = initial_trends[:, None] ^ flip_parity
+
+    return trends
+
+
+def roll_dice_batch(n_sessions: int, n_rounds: int, trends: Optional[np.ndarray] = None,
+                    volatility: float = 0.2,
+                    seed: Optional[Union[int, np.random.Generator]] = None) -> np.ndarray:
+    """
+    Roll the dice for every session and round.
+
+    Args:
+        n_sessions: Number of independent sessions
+        n_rounds: Number of rounds per session
+        trends: Optional trend codes from simulate_trends; when given, each
+            sum is drawn from the adjusted probabilities of its regime,
+            otherwise two fair dice are rolled
+        volatility: Market volatility used to adjust the probabilities
+        seed: Seed or generator for reproducible draws
+
+    Returns:
+        uint8 array of dice sums with shape (n_sessions, n_rounds)
+    """
+    rng = _make_rng(seed)
+    if trends is not None:
+        return get_sampler().sample_regimes(trends, [TREND_NAMES[0], TREND_NAMES[1]], volatility, rng)
+    dice1 = rng.integers(1, 7, size=(n_sessions, n_rounds), dtype=np.uint8)
+    dice2 = rng.integers(1, 7, size=(n_sessions, n_rounds), dtype=np.uint8)
+    return dice1 + dice2
+
+
+def settle_rounds(dice_sums: np.ndarray, bet_sum: ArrayLike, stake: ArrayLike,
+                  initial_bankroll: ArrayLike = 100.0,
+                  stake_mode: str = "fixed") -> Dict[str, np.ndarray]:
+    """
+    Settle a matrix of rounds and build the bankroll paths.
+
+    Uses the same rule as game_logic.calculate_portfolio_return for a single
+    position: a hit pays stake * PAYOUTS[sum], a miss loses the stake.
+
+    Args:
+        dice_sums: Dice sums with shape (n_sessions, n_rounds)
+        bet_sum: Sum bet on, scalar or one per session
+        stake: Amount bet ("fixed") or fraction of bankroll ("fraction"),
+            scalar or one per session
+        initial_bankroll: Starting bankroll, scalar or one per session
+        stake_mode: "fixed" or "fraction"
+
+    Returns:
+        Dictionary with the bankroll paths, per-round profit/loss, wins and
+        a mask of the rounds that were actually played
+    """
+    n_sessions, n_rounds = dice_sums.shape
+    bet_sum = np.broadcast_to(np.asarray(bet_sum, dtype=np.int64), (n_sessions,))
+    stake = np.broadcast_to(np.asarray(stake, dtype=np.float64), (n_sessions,))
+    initial_bankroll = np.broadcast_to(np.asarray(initial_bankroll, dtype=np.float64), (n_sessions,))
+
+    if np.any((bet_sum < 2) | (bet_sum > 12)):
+        raise ValueError("Invalid bet sum. Must be between 2 and 12")
+
+    wins = dice_sums == bet_sum[:, None]
+    payout = PAYOUT_TABLE[bet_sum][:, None]
+    bankroll = np.empty((n_sessions, n_rounds + 1))
+    bankroll[:, 0] = initial_bankroll
+
+    if stake_mode == "fixed":
+        profit_loss = np.where(wins, stake[:, None] * payout, -stake[:, None])
+
+        # A session stops once it can no longer cover the stake (same check as /bet).
+        # Before that point the unmasked and masked paths are identical.
+        running = initial_bankroll[:, None] + np.cumsum(profit_loss, axis=1)
+        bankroll_before = np.concatenate([initial_bankroll[:, None], running[:, :-1]], axis=1)
+        active = np.logical_and.accumulate(bankroll_before >= stake[:, None], axis=1)
+
+        profit_loss *= active
+        np.cumsum(profit_loss, axis=1, out=bankroll[:, 1:])
+        bankroll[:, 1:] += initial_bankroll[:, None]
+    elif stake_mode == "fraction":
+        if np.any((stake <= 0) | (stake > 1)):
+            raise ValueError("Fractional stakes must be in (0, 1]")
+        growth = np.where(wins, 1 + stake[:, None] * payout, 1 - stake[:, None])
+        np.cumprod(growth, axis=1, out=bankroll[:, 1:])
+        bankroll[:, 1:] *= initial_bankroll[:, None]
+
+        # Bankroll only reaches zero after betting everything and losing
+        active = np.logical_and.accumulate(bankroll[:, :-1] > 0, axis=1)
+        profit_loss = np.diff(bankroll, axis=1)
+    else:
+        raise ValueError(f"Unknown stake mode: {stake_mode}")
+
+    return {
+        "bankroll": bankroll,
+        "profit_loss": profit_loss,
+        "wins": wins & active,
+        "active": active
+    }
+
+
+def summarize_sessions(bankroll: np.ndarray, wins: np.ndarray, active: np.ndarray) -> Dict[str, float]:
+    """
+    Compute summary statistics over a batch of bankroll paths.
+
+    Args:
+        bankroll: Bankroll paths with shape (n_sessions, n_rounds + 1)
+        wins: Boolean matrix of winning rounds
+        active: Boolean matrix of rounds that were played
+
+    Returns:
+        Dictionary of summary statistics
+    """
+    final = bankroll[:, -1]
+    initial = bankroll[:, 0]
+    rounds_played = int(active.sum())
+
+    # Maximum drawdown per session, measured from the running peak
+    peak = np.maximum.accumulate(bankroll, axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drawdown = np.where(peak > 0, (peak - bankroll) / peak, 0.0)
+    max_drawdown = drawdown.max(axis=1)
+
+    return {
+        "sessions": int(bankroll.shape[0]),
+        "rounds": int(bankroll.shape[1] - 1),
+        "rounds_played": rounds_played,
+        "mean_final_bankroll": float(final.mean()),
+        "median_final_bankroll": float(np.median(final)),
+        "std_final_bankroll": float(final.std()),
+        "p5_final_bankroll": float(np.percentile(final, 5)),
+        "p95_final_bankroll": float(np.percentile(final, 95)),
+        "mean_profit": float((final - initial).mean()),
+        "profitable_rate": float((final > initial).mean()),
+        "ruin_rate": float((~active[:, -1]).mean()) if active.shape[1] else 0.0,
+        "win_rate": float(wins.sum() / rounds_played) if rounds_played else 0.0,
+        "mean_max_drawdown": float(max_drawdown.mean()),
+        "worst_max_drawdown": float(max_drawdown.max())
+    }
+
+
+def simulate_sessions(n_sessions: int, n_rounds: int, bet_sum: ArrayLike = 7,
+                      stake: ArrayLike = 1.0, initial_bankroll: ArrayLike = 100.0,
+                      stake_mode: str = "fixed", volatility: float = 0.2, biased: bool = True,
+                      seed: Optional[Union[int, np.random.Generator]] = None) -> Dict[str, object]:
+    """
+    Simulate many independent sessions of single-position bets.
+
+    Every array has one row per session, so memory grows with
+    n_sessions * n_rounds; split very large runs into several calls.
+
+    Args:
+        n_sessions: Number of independent sessions
+        n_rounds: Number of rounds per session
+        bet_sum: Sum bet on, scalar or one per session
+        stake: Amount bet ("fixed") or fraction of bankroll ("fraction")
+        initial_bankroll: Starting bankroll, scalar or one per session
+        stake_mode: "fixed" or "fraction"
+        volatility: Market volatility (the /init endpoint uses 0.2)
+        biased: Draw sums from the regime-adjusted probabilities like /bet;
+            False rolls two fair dice
+        seed: Seed or generator for reproducible draws
+
+    Returns:
+        Dictionary with bankroll paths (n_sessions, n_rounds + 1), dice sums,
+        trend codes, per-round profit/loss, wins, active mask and a summary
+    """
+    rng = _make_rng(seed)
+
+    trends = simulate_trends(n_sessions, n_rounds, seed=rng)
+    dice_sums = roll_dice_batch(n_sessions, n_rounds, trends if biased else None, volatility, seed=rng)
+    settled = settle_rounds(dice_sums, bet_sum, stake, initial_bankroll, stake_mode)
+
+    return {
+        "bankroll": settled["bankroll"],
+        "dice_sums": dice_sums,
+        "trends": trends,
+        "profit_loss": settled["profit_loss"],
+        "wins": settled["wins"],
+        "active": settled["active"],
+        "summary": summarize_sessions(settled["bankroll"], settled["wins"], settled["active"])
+    }
+
+
+if __name__ == "__main__":
+    import time
+
+    start = time.perf_counter()
+    result = simulate_sessions(1000, 1000, bet_sum=7, stake=0.02, stake_mode="fraction", seed=42)
+    elapsed = time.perf_counter() - start
+
+    summary = result["summary"]
+    print(f"Simulated {summary['sessions'] * summary['rounds']:,} rounds in {elapsed:.2f}s "
+          f"({summary['sessions'] * summary['rounds'] / elapsed:,.0f} rounds/sec)")
+    for key, value in summary.items():
+        print(f"{key}: {value}")
@@ -1,88 +1,98 @@
 import os
 import numpy as np
 import random
-import json
 import re
 import sys
-import time
+from collections import deque
 
 # Relative import for RL agent
 sys.path.append("..")  # Add the parent directory to the path
-from rl_system.RL_agent import RLAgent
+from rl_system.dense_agent import DenseRLAgent
+from rl_system.q_store import QTableStore
+from ai_services.advice_cache import LOCAL_ADVICE_TTL, AdviceCache, probability_regime
+from ai_services.single_flight import SingleFlight
 
 # Import the AI clients
 try:
     from ai_services.openrouter_client import OpenRouterClient, DeepSeekClient
+    from ai_services.provider_router import ProviderRouter, ProvidersUnavailable
     API_CLIENTS_AVAILABLE = True
 except ImportError:
     print("Warning: AI API clients not available. Using local predictions only.")
     API_CLIENTS_AVAILABLE = False
 
+# Recent predictions kept for evaluation
+PREDICTION_HISTORY = int(os.getenv("AI_PREDICTION_HISTORY", "100"))
+
 class AIStrategyAdvisor:
-    def __init__(self):
+    # Most recent bet results the state and the provider prompts look at
+    RECENT_RESULTS = 10
+
+    def __init__(self, providers=None):
+        """
+        Parameters:
+            providers (list): Prediction providers to use instead of the
+                configured API clients, e.g. provider_router.FakeProvider instances
+        """
         # Define possible actions (betting on different sums)
         self.actions = list(range(2, 13))  # Sums 2-12
         
-        # Initialize the RL agent for local learning
-        self.agent = RLAgent(self.actions, alpha_rl=0.1, gamma_rl=0.95, delta=1.0)
+        # Initialize the RL agent for local learning (array-backed Q-table)
+        self.agent = DenseRLAgent(self.actions, alpha_rl=0.1, gamma_rl=0.95, delta=1.0)
+        
+        # Q-values are checkpointed in the background instead of after every bet
+        data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+        self.q_store = QTableStore(os.path.join(data_dir, 'q_values.npz'),
+                                   legacy_json_path=os.path.join(data_dir, 'q_values.json'))
         
         # Load saved Q-values if they exist
         self.load_q_values()
+        self.q_store.attach(self.agent)
         
-        # Initialize the AI clients with fallback mechanism if available
+        # Initialize the AI clients if available. They sit behind circuit breakers,
+        # with hedged requests between them; clients without an API key are left out
+        self.router = None
+        self.last_successful_api = None
         if API_CLIENTS_AVAILABLE:
-            self.openrouter = OpenRouterClient()
-            self.deepseek = DeepSeekClient()
-            self.last_successful_api = None
-            
-            # Cache for AI advice to reduce API calls
-            self.advice_cache = {}
-            self.cache_ttl = 600  # Cache valid for 10 minutes (600 seconds)
-            self.last_cache_time = 0
+            if providers is None:
+                self.openrouter = OpenRouterClient()
+                self.deepseek = DeepSeekClient()
+                providers = [client for client in (self.openrouter, self.deepseek) if client.api_key]
+            if providers:
+                self.router = ProviderRouter(providers)
+        
+        # Advice per quantized state, so providers are only asked when the state changes,
+        # and one provider call shared by concurrent lookups of the same state
+        self.advice_cache = AdviceCache()
+        self.single_flight = SingleFlight()
         
         # Track performance metrics
         self.win_count = 0
         self.loss_count = 0
         self.total_profit = 0
         
-        # Track prediction accuracy
-        self.predictions = []
+        # Track prediction accuracy (the advisor is shared, so only recent ones are kept)
+        self.predictions = deque(maxlen=PREDICTION_HISTORY)
         
     def save_q_values(self):
-        """Save the Q-values to a file for persistence between sessions."""
-        save_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
-        save_path = os.path.join(save_dir, 'q_values.json')
-        
-        # Create directory if it doesn't exist
-        os.makedirs(save_dir, exist_ok=True)
-        
-        # Convert tuple keys to strings for JSON serialization
-        serializable_q_values = {str(k): v for k, v in self.agent.Q.items()}
-        
-        # Save Q-values
+        """Write the Q-values to disk now (normally done in the background by q_store)."""
         try:
-            with open(save_path, 'w') as f:
-                json.dump(serializable_q_values, f)
-            print(f"AI model saved to {save_path}")
+            if self.q_store.flush():
+                print(f"AI model saved to {self.q_store.path}")
         except Exception as e:
             print(f"Error saving AI model: {e}")
     
     def load_q_values(self):
-        """Load Q-values from file if it exists."""
-        load_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
-        load_path = os.path.join(load_dir, 'q_values.json')
-        
-        if os.path.exists(load_path):
-            try:
-                with open(load_path, 'r') as f:
-                    q_values = json.load(f)
-                    # Convert string keys back to tuples
-                    self.agent.Q = {eval(k): v for k, v in q_values.items()}
-                print(f"AI model loaded from {load_path}")
-            except (json.JSONDecodeError, SyntaxError, Exception) as e:
-                print(f"Error loading AI model: {e}")
-                # If file is corrupted, start with fresh Q-values
-                pass
+        """Load Q-values from the checkpoint (or a legacy q_values.json) if it exists."""
+        try:
+            table = self.q_store.load()
+            if table is not None:
+                self.agent.load_table(*table)
+                print(f"AI model loaded from {self.q_store.loaded_from}")
+        except Exception as e:
+            print(f"Error loading AI model: {e}")
+            # If file is corrupted, start with fresh Q-values
+            pass
         
     def get_state(self, money, bet_history, trend):
         """
@@ -98,7 +108,8 @@ class AIStrategyAdvisor:
         """
         # Calculate win rate
         if bet_history:
-            win_rate = bet_history[-10:].count("win") / len(bet_history[-10:]) if bet_history[-10:] else 0
+            recent = bet_history[-self.RECENT_RESULTS:]
+            win_rate = recent.count("win") / len(recent)
         else:
             win_rate = 0
             
@@ -163,95 +174,117 @@ class AIStrategyAdvisor:
         Returns:
             dict: Prediction including recommended sum and strategy
         """
-        if not API_CLIENTS_AVAILABLE:
+        if self.router is None:
             return self._local_prediction(game_state)
         
         # Check cache first
-        cache_key = f"{game_state['money']}_{game_state['trend']}_{len(game_state['bet_history'])}"
-        current_time = time.time()
-        
-        # Return cached result if valid
-        if cache_key in self.advice_cache and (current_time - self.advice_cache[cache_key]['timestamp'] < self.cache_ttl):
+        cache_key = self._advice_key(game_state)
+        cached = self.advice_cache.get(cache_key)
+        if cached is not None:
             print("Using cached AI advice")
-            return self.advice_cache[cache_key]['prediction']
+            return cached
+        
+        # Identical lookups already in flight wait for that one's provider call
+        return self.single_flight.do(cache_key, lambda: self._fetch_prediction(game_state, cache_key))
+    
+    def _fetch_prediction(self, game_state, cache_key):
+        """
+        Ask the providers (the local RL agent if they fail) and cache the answer.
+        
+        Parameters:
+            game_state (dict): Current game state
+            cache_key (tuple): Key to cache the prediction under
             
-        # Try the last successful API first if available
-        if self.last_successful_api == "openrouter":
-            try:
-                prediction = self.openrouter.get_prediction(game_state)
-                print("Successfully used OpenRouter API")
-                self.last_successful_api = "openrouter"
-                
-                # Cache the prediction
-                self.advice_cache[cache_key] = {
-                    'prediction': prediction,
-                    'timestamp': current_time
-                }
-                
-                return prediction
-            except Exception as e:
-                print(f"OpenRouter API failed: {e}")
-                # Don't return here, continue to try DeepSeek
-        elif self.last_successful_api == "deepseek":
-            try:
-                prediction = self.deepseek.get_prediction(game_state)
-                print("Successfully used DeepSeek API")
-                self.last_successful_api = "deepseek"
-                
-                # Cache the prediction
-                self.advice_cache[cache_key] = {
-                    'prediction': prediction,
-                    'timestamp': current_time
-                }
-                
-                return prediction
-            except Exception as e:
-                print(f"DeepSeek API failed: {e}")
-                # Don't return here, continue to try other services
-        
-        # If no last successful API or it failed, try both in sequence
-        # First try OpenRouter, then DeepSeek as fallback
+        Returns:
+            dict: Prediction including recommended sum and strategy
+        """
         try:
-            prediction = self.openrouter.get_prediction(game_state)
-            self.last_successful_api = "openrouter"
-            print("Successfully used OpenRouter API")
+            name, prediction = self.router.request(game_state)
+        except ProvidersUnavailable as e:
+            print(f"AI APIs unavailable: {e}")
+            return self._cache_local_prediction(game_state, cache_key)
+        
+        self.last_successful_api = name
+        print(f"Successfully used {name} API")
+        self.advice_cache.put(cache_key, prediction)
+        return prediction
+    
+    async def _get_api_prediction_async(self, game_state):
+        """
+        Async variant of _get_api_prediction that awaits the API clients
+        instead of blocking the calling thread.
+        
+        Parameters:
+            game_state (dict): Current game state
             
-            # Cache the prediction
-            self.advice_cache[cache_key] = {
-                'prediction': prediction,
-                'timestamp': current_time
-            }
+        Returns:
+            dict: Prediction including recommended sum and strategy
+        """
+        if self.router is None:
+            return self._local_prediction(game_state)
+        
+        # Check cache first
+        cache_key = self._advice_key(game_state)
+        cached = self.advice_cache.get(cache_key)
+        if cached is not None:
+            print("Using cached AI advice")
+            return cached
+        
+        # Identical lookups already in flight await that one's provider call
+        return await self.single_flight.do_async(
+            cache_key, lambda: self._fetch_prediction_async(game_state, cache_key))
+    
+    async def _fetch_prediction_async(self, game_state, cache_key):
+        """
+        Async variant of _fetch_prediction.
+        
+        Parameters:
+            game_state (dict): Current game state
+            cache_key (tuple): Key to cache the prediction under
             
-            return prediction
-        except Exception as e:
-            print(f"OpenRouter API failed: {e}")
+        Returns:
+            dict: Prediction including recommended sum and strategy
+        """
+        # Hedged across the providers; raises at once if every circuit is open
+        try:
+            name, prediction = await self.router.request_async(game_state)
+        except ProvidersUnavailable as e:
+            print(f"AI APIs unavailable: {e}")
+            return self._cache_local_prediction(game_state, cache_key)
+        
+        self.last_successful_api = name
+        print(f"Successfully used {name} API")
+        self.advice_cache.put(cache_key, prediction)
+        return prediction
+    
+    def _cache_local_prediction(self, game_state, cache_key):
+        """
+        Fall back to the local RL agent and cache its prediction briefly.
+        
+        Parameters:
+            game_state (dict): Current game state
+            cache_key (tuple): Key to cache the prediction under
             
-            try:
-                prediction = self.deepseek.get_prediction(game_state)
-                self.last_successful_api = "deepseek"
-                print("Successfully used DeepSeek API")
-                
-                # Cache the prediction
-                self.advice_cache[cache_key] = {
-                    'prediction': prediction,
-                    'timestamp': current_time
-                }
-                
-                return prediction
-            except Exception as e:
-                print(f"DeepSeek API failed: {e}")
-                
-                # If both APIs fail, use local RL agent
-                print("Using local RL agent for prediction")
-                local_prediction = self._local_prediction(game_state)
-                
-                # Cache the local prediction too
-                self.advice_cache[cache_key] = {
-                    'prediction': local_prediction,
-                    'timestamp': current_time
-                }
-                
-                return local_prediction
+        Returns:
+            dict: Prediction including recommended sum and strategy
+        """
+        print("Using local RL agent for prediction")
+        local_prediction = self._local_prediction(game_state)
+        self.advice_cache.put(cache_key, local_prediction, ttl=LOCAL_ADVICE_TTL)
+        return local_prediction
+    
+    def _advice_key(self, game_state):
+        """
+        Cache key of a game state: the quantized RL state plus the probability regime.
+        
+        Parameters:
+            game_state (dict): Current game state
+            
+        Returns:
+            tuple: Hashable key that only changes when the decision-relevant state does
+        """
+        state = self.get_state(game_state['money'], game_state['bet_history'], game_state['trend'])
+        return state, probability_regime(game_state.get('probabilities'))
     
     def _local_prediction(self, game_state):
         """
@@ -317,7 +350,8 @@ class AIStrategyAdvisor:
             new_state (str): State after the bet
         """
         # Update local RL agent
-        self.agent.update(old_state, action, reward, new_state)
+        with self.q_store.lock:
+            self.agent.update(old_state, action, reward, new_state)
         
         # Update performance metrics
         if reward > 0:
@@ -334,16 +368,15 @@ class AIStrategyAdvisor:
                 'reward': reward
             }
         
-        # Save Q-values after update
-        self.save_q_values()
+        # Schedule a background checkpoint of the Q-values
+        self.q_store.mark_dirty()
         
-        # Clear prediction cache when model is updated
-        if hasattr(self, 'advice_cache'):
-            self.advice_cache = {}
+        # The advice cache is left alone: provider advice does not depend on the
+        # Q-values, and cached local predictions expire after LOCAL_ADVICE_TTL
     
     def update_q_values(self, old_state, action, reward, new_state):
         """
-        Update Q-values based on the outcome and save to disk.
+        Update Q-values based on the outcome and schedule a checkpoint.
         
         Parameters:
             old_state (str): State before the bet
@@ -352,10 +385,11 @@ class AIStrategyAdvisor:
             new_state (str): State after the bet
         """
         # Update the agent's Q-values
-        self.agent.update(old_state, action, reward, new_state)
+        with self.q_store.lock:
+            self.agent.update(old_state, action, reward, new_state)
         
-        # Save Q-values to disk
-        self.save_q_values()
+        # Written to disk by the background checkpoint writer
+        self.q_store.mark_dirty()
     
     def get_strategy_advice(self, money, bet_history, trend, probabilities=None):
         """
@@ -388,3 +422,33 @@ class AIStrategyAdvisor:
         })
         
         return prediction
+    
+    async def get_strategy_advice_async(self, money, bet_history, trend, probabilities=None):
+        """
+        Async variant of get_strategy_advice for use inside an event loop.
+        
+        Parameters:
+            money (float): Current bankroll
+            bet_history (list): History of wins and losses
+            trend (str): Current market trend
+            probabilities (dict): Current probabilities for each sum
+            
+        Returns:
+            dict: Advice including recommended bet and reasoning
+        """
+        game_state = {
+            'money': money,
+            'bet_history': bet_history,
+            'trend': trend,
+            'probabilities': probabilities
+        }
+        
+        prediction = await self._get_api_prediction_async(game_state)
+        
+        # Store the prediction for later evaluation
+        self.predictions.append({
+            'state': game_state,
+            'prediction': prediction
+        })
+        
+        return prediction
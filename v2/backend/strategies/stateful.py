@@ -0,0 +1,236 @@
+from typing import Callable, Dict, List, Optional
+
+from strategies.dalembert import dalembert
+from strategies.fibonacci import fibonacci
+from strategies.fixed import fixed
+from strategies.kelly import kelly
+from strategies.martingale import martingale
+from strategies.masaniello import masaniello
+from strategies.percentage import percentage
+
+
+class StatefulStrategy:
+    """
+    Base class for strategies that follow a session incrementally.
+
+    Instead of receiving the whole bet history on every call, the strategy is
+    told about each result once through record() and keeps whatever counters
+    it needs, so computing a stake is O(1) however long the session runs.
+    """
+
+    name = ""
+
+    def __init__(self):
+        self.rounds = 0
+
+    def record(self, result: str) -> None:
+        """
+        Update the state with the result of one bet.
+
+        Args:
+            result: "win" or "loss" (BetResult values compare equal)
+        """
+        self.rounds += 1
+
+    def reset(self) -> None:
+        """Forget all recorded results."""
+        self.rounds = 0
+
+    def replay(self, bet_history: List[str]) -> "StatefulStrategy":
+        """Reset and record every result of an existing history."""
+        self.reset()
+        for result in bet_history:
+            self.record(result)
+        return self
+
+    def stake(self, bankroll: float, **kwargs) -> float:
+        """
+        Stake for the next bet.
+
+        Args:
+            bankroll: Current amount of money available.
+
+        Returns:
+            Stake for the next bet.
+        """
+        raise NotImplementedError
+
+
+class LossStreakStrategy(StatefulStrategy):
+    """Tracks the number of consecutive losses."""
+
+    def __init__(self):
+        super().__init__()
+        self.consecutive_losses = 0
+
+    def record(self, result: str) -> None:
+        super().record(result)
+        self.consecutive_losses = self.consecutive_losses + 1 if result == "loss" else 0
+
+    def reset(self) -> None:
+        super().reset()
+        self.consecutive_losses = 0
+
+
+class MartingaleStrategy(LossStreakStrategy):
+    """Stateful counterpart of strategies.martingale.martingale."""
+
+    name = "martingale"
+
+    def __init__(self, base_stake: float = 1):
+        """
+        Args:
+            base_stake: Base stake to start with (default: 1).
+        """
+        super().__init__()
+        self.base_stake = base_stake
+
+    def stake(self, bankroll: float, **kwargs) -> float:
+        if not self.rounds:
+            return self.base_stake
+        return min(self.base_stake * (2 ** self.consecutive_losses), bankroll)
+
+
+class FibonacciStrategy(LossStreakStrategy):
+    """Stateful counterpart of strategies.fibonacci.fibonacci."""
+
+    name = "fibonacci"
+
+    # Shared by all instances and only ever extended
+    _sequence = [1, 1]
+
+    def stake(self, bankroll: float, **kwargs) -> float:
+        if not self.rounds:
+            return 1
+
+        sequence = self._sequence
+        while len(sequence) <= self.consecutive_losses + 1:
+            sequence.append(sequence[-1] + sequence[-2])
+        return min(sequence[self.consecutive_losses + 1], bankroll)
+
+
+class DalembertStrategy(StatefulStrategy):
+    """Stateful counterpart of strategies.dalembert.dalembert."""
+
+    name = "dalembert"
+
+    def __init__(self, base_unit: float = 1):
+        """
+        Args:
+            base_unit: Base betting unit (default: 1).
+        """
+        super().__init__()
+        self.base_unit = base_unit
+        self.last_result = None
+        self.consecutive_count = 0
+
+    def record(self, result: str) -> None:
+        super().record(result)
+        if result == self.last_result:
+            self.consecutive_count += 1
+        else:
+            self.last_result = result
+            self.consecutive_count = 1
+
+    def reset(self) -> None:
+        super().reset()
+        self.last_result = None
+        self.consecutive_count = 0
+
+    def stake(self, bankroll: float, **kwargs) -> float:
+        if not self.rounds:
+            return self.base_unit
+        if self.last_result == "win":
+            return max(self.base_unit, self.base_unit + self.consecutive_count - 1)
+        return self.base_unit + self.consecutive_count
+
+
+class HistoryFreeStrategy(StatefulStrategy):
+    """Adapter for the strategies whose stake does not depend on the history."""
+
+    def __init__(self, name: str, function: Callable[..., float]):
+        """
+        Args:
+            name: Strategy name
+            function: Scalar strategy function taking (bankroll, bet_history, ...)
+        """
+        super().__init__()
+        self.name = name
+        self.function = function
+
+    def stake(self, bankroll: float, **kwargs) -> float:
+        return self.function(bankroll, [], **kwargs)
+
+
+def _history_free(name: str, function: Callable[..., float]) -> Callable[[], StatefulStrategy]:
+    return lambda: HistoryFreeStrategy(name, function)
+
+
+# Factory for each strategy name, matching models.Strategy values
+STRATEGY_FACTORIES: Dict[str, Callable[[], StatefulStrategy]] = {
+    "masaniello": _history_free("masaniello", masaniello),
+    "martingale": MartingaleStrategy,
+    "fibonacci": FibonacciStrategy,
+    "dalembert": DalembertStrategy,
+    "percentage": _history_free("percentage", percentage),
+    "kelly": _history_free("kelly", kelly),
+    "fixed": _history_free("fixed", fixed),
+}
+
+
+class StrategyRegistry:
+    """
+    One instance of every strategy for a single game session.
+
+    All strategies see every result, so switching strategies mid-session
+    gives the same stake the scalar functions would compute from the full
+    bet history.
+    """
+
+    def __init__(self, bet_history: Optional[List[str]] = None):
+        """
+        Args:
+            bet_history: Results to replay if the session already has some
+        """
+        self._strategies = {name: factory() for name, factory in STRATEGY_FACTORIES.items()}
+        if bet_history:
+            for result in bet_history:
+                self.record(result)
+
+    def get(self, name: str) -> StatefulStrategy:
+        """Return the session's instance of a strategy (Strategy enums are accepted)."""
+        try:
+            return self._strategies[getattr(name, "value", name)]
+        except KeyError:
+            raise ValueError(f"Unknown strategy: {name}")
+
+    def stake(self, name: str, bankroll: float, **kwargs) -> float:
+        """Stake for the next bet with the named strategy."""
+        return self.get(name).stake(bankroll, **kwargs)
+
+    def record(self, result: str) -> None:
+        """Record the result of a bet for every strategy."""
+        for strategy in self._strategies.values():
+            strategy.record(result)
+
+    def reset(self) -> None:
+        for strategy in self._strategies.values():
+            strategy.reset()
+
+
+if __name__ == "__main__":
+    import random
+
+    # The stateful strategies must match the scalar functions on any history
+    registry = StrategyRegistry()
+    history = []
+    for _ in range(5000):
+        bankroll = random.uniform(0, 500)
+        assert registry.stake("martingale", bankroll) == martingale(bankroll, history)
+        assert registry.stake("fibonacci", bankroll) == fibonacci(bankroll, history)
+        assert registry.stake("dalembert", bankroll) == dalembert(bankroll, history)
+        assert registry.stake("kelly", bankroll, probability=0.2, payout=5) == kelly(bankroll, history, 0.2, 5)
+        result = "win" if random.random() < 0.3 else "loss"
+        history.append(result)
+        registry.record(result)
+    print("Stateful strategies match the scalar functions on 5000 rounds")
@@ -0,0 +1,188 @@
+"""
+Array versions of the seven betting strategies.
+
+Each kernel takes arrays of bankrolls and streaks (plus the strategy's usual
+parameters, scalars or arrays that broadcast) and returns one stake per
+element, with the same caps and minimums as the scalar function of the same
+name. Every strategy only looks at the current run of identical results, so
+a session's history is summarized as one signed streak:
+
+    +n  the last n bets were wins
+    -n  the last n bets were losses
+     0  no bets yet
+"""
+import numpy as np
+from typing import List, Optional, Union
+
+ArrayLike = Union[float, np.ndarray]
+
+STRATEGY_NAMES = ("masaniello", "martingale", "fibonacci", "dalembert", "percentage", "kelly", "fixed")
+
+# Fibonacci numbers as floats; beyond the last one the stake is always capped by the bankroll
+_FIBONACCI = [1.0, 1.0]
+while np.isfinite(_FIBONACCI[-1]):
+    _FIBONACCI.append(_FIBONACCI[-1] + _FIBONACCI[-2])
+_FIBONACCI = np.array(_FIBONACCI)
+
+
+def streak_from_history(bet_history: List[str]) -> int:
+    """Signed streak of a bet history (see the module docstring)."""
+    if not bet_history:
+        return 0
+    last = bet_history[-1]
+    count = 0
+    for result in reversed(bet_history):
+        if result != last:
+            break
+        count += 1
+    return count if last == "win" else -count
+
+
+def _loss_streak(streak: np.ndarray) -> np.ndarray:
+    return np.maximum(-np.asarray(streak), 0)
+
+
+def masaniello(bankroll: ArrayLike, streak: Optional[np.ndarray] = None,
+               preset_percentage: float = 0.05) -> np.ndarray:
+    """Masaniello stakes: a preset percentage of the bankroll."""
+    return np.asarray(bankroll, dtype=np.float64) * preset_percentage
+
+
+def martingale(bankroll: ArrayLike, streak: np.ndarray, base_stake: float = 1) -> np.ndarray:
+    """Martingale stakes: base_stake doubled for every consecutive loss."""
+    bankroll = np.asarray(bankroll, dtype=np.float64)
+    streak = np.asarray(streak)
+    # ldexp overflows to inf instead of wrapping, and the bankroll cap then applies
+    stake = np.minimum(np.ldexp(float(base_stake), _loss_streak(streak)), bankroll)
+    return np.where(streak == 0, base_stake, stake)
+
+
+def fibonacci(bankroll: ArrayLike, streak: np.ndarray) -> np.ndarray:
+    """Fibonacci stakes: the sequence advances one step per consecutive loss."""
+    bankroll = np.asarray(bankroll, dtype=np.float64)
+    streak = np.asarray(streak)
+    position = np.minimum(_loss_streak(streak) + 1, len(_FIBONACCI) - 1)
+    stake = np.minimum(_FIBONACCI[position], bankroll)
+    return np.where(streak == 0, 1.0, stake)
+
+
+def dalembert(bankroll: ArrayLike, streak: np.ndarray, base_unit: float = 1) -> np.ndarray:
+    """D'Alembert stakes: one unit more per consecutive loss."""
+    streak = np.asarray(streak)
+    after_win = np.maximum(base_unit, base_unit + streak - 1)
+    after_loss = base_unit - streak
+    stake = np.where(streak > 0, after_win, after_loss)
+    stake = np.where(streak == 0, base_unit, stake).astype(np.float64)
+    return np.broadcast_to(stake, np.broadcast(stake, np.asarray(bankroll)).shape).copy()
+
+
+def percentage(bankroll: ArrayLike, streak: Optional[np.ndarray] = None,
+               percentage: float = 0.05) -> np.ndarray:
+    """Percentage stakes with a minimum bet of 1."""
+    return np.maximum(1, np.asarray(bankroll, dtype=np.float64) * percentage)
+
+
+def kelly(bankroll: ArrayLike, streak: Optional[np.ndarray], probability: ArrayLike,
+          payout: ArrayLike, fraction: float = 0.5) -> np.ndarray:
+    """Fractional Kelly stakes with a minimum bet of 1."""
+    b = np.asarray(payout, dtype=np.float64) - 1
+    p = np.asarray(probability, dtype=np.float64)
+    q = 1 - p
+    with np.errstate(divide="ignore", invalid="ignore"):
+        kelly_percentage = np.where(b * p > q, (b * p - q) / b, 0.01)
+    return np.maximum(1, np.asarray(bankroll, dtype=np.float64) * kelly_percentage * fraction)
+
+
+def fixed(bankroll: ArrayLike, streak: Optional[np.ndarray] = None, amount: float = 5) -> np.ndarray:
+    """Fixed stakes, capped by the bankroll."""
+    return np.minimum(amount, np.asarray(bankroll, dtype=np.float64))
+
+
+# Kernel for each strategy name, matching models.Strategy values
+KERNELS = {
+    "masaniello": masaniello,
+    "martingale": martingale,
+    "fibonacci": fibonacci,
+    "dalembert": dalembert,
+    "percentage": percentage,
+    "kelly": kelly,
+    "fixed": fixed,
+}
+
+
+def strategy_stakes(strategies: np.ndarray, bankroll: np.ndarray, streak: np.ndarray,
+                    probability: Optional[ArrayLike] = None,
+                    payout: Optional[ArrayLike] = None) -> np.ndarray:
+    """
+    Stakes for sessions that each use a different strategy.
+
+    Args:
+        strategies: Index into STRATEGY_NAMES for every session
+        bankroll: Bankroll of every session
+        streak: Signed streak of every session
+        probability: Win probability of the chosen sum, needed for kelly
+        payout: Payout multiplier of the chosen sum, needed for kelly
+
+    Returns:
+        Stake of every session, using each strategy's default parameters
+    """
+    strategies = np.asarray(strategies)
+    bankroll = np.asarray(bankroll, dtype=np.float64)
+    streak = np.asarray(streak)
+
+    stakes = np.empty(strategies.shape)
+    for code, name in enumerate(STRATEGY_NAMES):
+        mask = strategies == code
+        if not mask.any():
+            continue
+        if name == "kelly":
+            if probability is None or payout is None:
+                raise ValueError("kelly requires probability and payout")
+            p = np.broadcast_to(probability, strategies.shape)[mask]
+            b = np.broadcast_to(payout, strategies.shape)[mask]
+            stakes[mask] = kelly(bankroll[mask], streak[mask], p, b)
+        else:
+            stakes[mask] = KERNELS[name](bankroll[mask], streak[mask])
+    return stakes
+
+
+if __name__ == "__main__":
+    import random
+
+    from strategies.dalembert import dalembert as scalar_dalembert
+    from strategies.fibonacci import fibonacci as scalar_fibonacci
+    from strategies.fixed import fixed as scalar_fixed
+    from strategies.kelly import kelly as scalar_kelly
+    from strategies.martingale import martingale as scalar_martingale
+    from strategies.masaniello import masaniello as scalar_masaniello
+    from strategies.percentage import percentage as scalar_percentage
+
+    # Random histories, including long losing runs and empty ones
+    rng = random.Random(7)
+    histories = [[] for _ in range(50)]
+    for _ in range(5000):
+        length = rng.randint(1, 40)
+        p_win = rng.choice([0.05, 0.3, 0.7])
+        histories.append(["win" if rng.random() < p_win else "loss" for _ in range(length)])
+    histories.append(["loss"] * 1000)
+
+    n = len(histories)
+    bankroll = np.array([rng.choice([0.0, 0.5, 3.0, rng.uniform(0, 2000)]) for _ in range(n)])
+    streak = np.array([streak_from_history(h) for h in histories])
+    probability = np.array([rng.uniform(0, 0.5) for _ in range(n)])
+    payout = np.array([rng.choice([1.5, 2, 3, 5, 8, 35]) for _ in range(n)])
+
+    scalar = {
+        "masaniello": lambda i: scalar_masaniello(bankroll[i], histories[i]),
+        "martingale": lambda i: scalar_martingale(bankroll[i], histories[i]),
+        "fibonacci": lambda i: scalar_fibonacci(bankroll[i], histories[i]),
+        "dalembert": lambda i: scalar_dalembert(bankroll[i], histories[i]),
+        "percentage": lambda i: scalar_percentage(bankroll[i], histories[i]),
+        "kelly": lambda i: scalar_kelly(bankroll[i], histories[i], probability[i], payout[i]),
+        "fixed": lambda i: scalar_fixed(bankroll[i], histories[i]),
+    }
+    for code, name in enumerate(STRATEGY_NAMES):
+        expected = np.array([float(scalar[name](i)) for i in range(n)])
+        actual = strategy_stakes(np.full(n, code), bankroll, streak, probability, payout)
+        assert np.allclose(actual, expected, rtol=1e-12, atol=0), name
+    print(f"Vectorized kernels match the scalar strategies on {n} histories")
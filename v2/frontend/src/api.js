@@ -9,9 +9,22 @@ const api = axios.create({
   },
 });
 
+// Every request after /init addresses the session id the backend handed out
+const setSessionId = (sessionId) => {
+  if (sessionId) {
+    api.defaults.headers.common['X-Session-ID'] = sessionId;
+  }
+};
+
+// Analytics already fetched for the current game, extended with deltas on each poll
+const MAX_ANALYTICS_ROUNDS = 10000;
+let analyticsCache = null;
+
 export const initializeGame = async (initialBankroll = 100, strategy = 'percentage') => {
   try {
     const response = await api.post('/init', { initial_bankroll: initialBankroll, strategy });
+    setSessionId(response.headers['x-session-id']);
+    analyticsCache = null;
     return response.data;
   } catch (error) {
     console.error('Error initializing game:', error);
@@ -109,14 +122,85 @@ export const changeStrategy = async (strategy) => {
   }
 };
 
+const mergeAnalyticsDelta = (data, delta) => {
+  const merged = {
+    ...data,
+    bankroll_history: data.bankroll_history.concat(delta.bankroll),
+    win_history: data.win_history.concat(delta.win),
+    bet_amounts: data.bet_amounts.concat(delta.bet_amount),
+    bet_sums: data.bet_sums.concat(delta.bet_sum),
+    dice_results: data.dice_results.concat(delta.dice_result),
+    trends: data.trends.concat(delta.trend),
+    total_rounds: delta.total_rounds,
+    win_rate: delta.win_rate,
+    avg_win: delta.avg_win,
+    avg_loss: delta.avg_loss,
+    sharpe_ratio: delta.sharpe_ratio,
+    max_drawdown: delta.max_drawdown,
+  };
+
+  // Keep the client-side history bounded like the server's
+  const excess = merged.win_history.length - MAX_ANALYTICS_ROUNDS;
+  if (excess > 0) {
+    ['bankroll_history', 'win_history', 'bet_amounts', 'bet_sums', 'dice_results', 'trends'].forEach((key) => {
+      merged[key] = merged[key].slice(excess);
+    });
+    merged.first_round = (merged.first_round || 0) + excess;
+  }
+  return merged;
+};
+
 export const getAnalytics = async () => {
   try {
-    const response = await api.get('/analytics');
-    return response.data;
+    const sessionId = api.defaults.headers.common['X-Session-ID'];
+    if (!analyticsCache || analyticsCache.sessionId !== sessionId) {
+      const response = await api.get('/analytics');
+      analyticsCache = { sessionId, data: response.data, cursor: response.data.total_rounds, etag: response.headers.etag };
+      return response.data;
+    }
+
+    // Only ask for rounds played since the last poll; 304 means nothing changed
+    const response = await api.get('/analytics', {
+      params: { since: analyticsCache.cursor },
+      headers: analyticsCache.etag ? { 'If-None-Match': analyticsCache.etag } : {},
+      validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+    });
+    if (response.status === 304) {
+      return analyticsCache.data;
+    }
+
+    const delta = response.data;
+    if (delta.truncated || delta.cursor < analyticsCache.cursor) {
+      // Missed rounds were already downsampled, or the game was restarted
+      analyticsCache = null;
+      return getAnalytics();
+    }
+    analyticsCache = {
+      sessionId,
+      data: mergeAnalyticsDelta(analyticsCache.data, delta),
+      cursor: delta.cursor,
+      etag: response.headers.etag,
+    };
+    return analyticsCache.data;
   } catch (error) {
     console.error('Error getting analytics:', error);
     throw error;
   }
 };
 
+// Server-Sent Events for the current session: state, round, trend and advice.
+// Returns a function that closes the stream.
+export const subscribeToEvents = (handlers) => {
+  const sessionId = api.defaults.headers.common['X-Session-ID'];
+  if (!sessionId || typeof EventSource === 'undefined') {
+    return null;
+  }
+
+  const source = new EventSource(`${API_URL}/events?session_id=${encodeURIComponent(sessionId)}`);
+  Object.entries(handlers).forEach(([event, handler]) => {
+    source.addEventListener(event, (message) => handler(JSON.parse(message.data)));
+  });
+  return () => source.close();
+};
+
 export default api;
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { Paper, Typography, Box, Grid, CircularProgress, Divider } from '@mui/material';
-import { getAnalytics } from '../api';
+import { getAnalytics, subscribeToEvents } from '../api';
 import BankrollChart from './analytics/BankrollChart';
 import WinLossDistribution from './analytics/WinLossDistribution';
 import TrendAnalysis from './analytics/TrendAnalysis';
@@ -27,9 +27,28 @@ const AnalyticsDashboard = () => {
 
     fetchAnalytics();
     
-    // Set up polling to refresh analytics
-    const intervalId = setInterval(fetchAnalytics, 30000);
-    return () => clearInterval(intervalId);
+    // Refresh when the server reports new rounds, batching bursts of rounds into one delta request
+    let refreshTimer = null;
+    const scheduleRefresh = () => {
+      if (!refreshTimer) {
+        refreshTimer = setTimeout(() => {
+          refreshTimer = null;
+          getAnalytics().then(setAnalytics).catch((err) => console.error("Failed to refresh analytics:", err));
+        }, 1000);
+      }
+    };
+    const unsubscribe = subscribeToEvents({
+      round: scheduleRefresh,
+      batch: scheduleRefresh,
+    });
+    
+    // Fall back to polling if the event stream is unavailable
+    const intervalId = unsubscribe ? null : setInterval(fetchAnalytics, 30000);
+    return () => {
+      if (unsubscribe) unsubscribe();
+      if (intervalId) clearInterval(intervalId);
+      if (refreshTimer) clearTimeout(refreshTimer);
+    };
   }, []);
 
   if (loading) {
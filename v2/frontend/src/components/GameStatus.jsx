@@ -160,7 +160,7 @@ const GameStatus = ({ gameState, lastBet, loading }) => {
             </Grid>
             <Grid item xs={6}>
               <Typography variant="body2" color="text.secondary">
-                Win Rate
+                Recent Win Rate
               </Typography>
               <Typography variant="h6" color={winRate >= 50 ? "success.main" : "error.main"}>
                 {winRate.toFixed(1)}%